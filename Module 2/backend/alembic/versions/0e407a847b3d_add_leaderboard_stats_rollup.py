@@ -0,0 +1,42 @@
+"""Add leaderboard stats rollup
+
+Revision ID: 0e407a847b3d
+Revises: 4f2d12b05f8c
+Create Date: 2026-10-17 10:03:27.904115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0e407a847b3d'
+down_revision: Union[str, None] = '4f2d12b05f8c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('leaderboard_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('total_players', sa.Integer(), nullable=False),
+    sa.Column('total_scores', sa.Integer(), nullable=False),
+    sa.Column('score_sum', sa.BigInteger(), nullable=False),
+    sa.Column('top_score', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # Backfill from existing users and scores
+    op.execute(
+        "INSERT INTO leaderboard_stats (id, total_players, total_scores, score_sum, top_score) "
+        "SELECT 1, "
+        "(SELECT COUNT(*) FROM users WHERE is_active), "
+        "COUNT(*), COALESCE(SUM(score), 0), COALESCE(MAX(score), 0) "
+        "FROM scores"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('leaderboard_stats')
@@ -0,0 +1,55 @@
+"""Add maintained score counters
+
+Revision ID: 4f2d12b05f8c
+Revises: 7698f86de515
+Create Date: 2026-10-17 09:12:41.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f2d12b05f8c'
+down_revision: Union[str, None] = '7698f86de515'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Reuse the enum type created by the initial migration
+game_mode = sa.Enum('WALLS', 'WALLS_THROUGH', name='gamemodeenum').with_variant(
+    postgresql.ENUM('WALLS', 'WALLS_THROUGH', name='gamemodeenum', create_type=False),
+    'postgresql',
+)
+
+
+def upgrade() -> None:
+    op.create_table('mode_score_counts',
+    sa.Column('mode', game_mode, nullable=False),
+    sa.Column('score_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('mode')
+    )
+    op.create_table('user_score_counts',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('mode', game_mode, nullable=False),
+    sa.Column('score_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'mode')
+    )
+
+    # Backfill from existing scores
+    op.execute(
+        "INSERT INTO mode_score_counts (mode, score_count) "
+        "SELECT mode, COUNT(*) FROM scores GROUP BY mode"
+    )
+    op.execute(
+        "INSERT INTO user_score_counts (user_id, mode, score_count) "
+        "SELECT user_id, mode, COUNT(*) FROM scores GROUP BY user_id, mode"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_score_counts')
+    op.drop_table('mode_score_counts')
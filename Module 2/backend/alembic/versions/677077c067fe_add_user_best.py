@@ -0,0 +1,54 @@
+"""Add personal-best table
+
+Revision ID: 677077c067fe
+Revises: 0e407a847b3d
+Create Date: 2026-10-17 11:21:05.337410
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '677077c067fe'
+down_revision: Union[str, None] = '0e407a847b3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Reuse the enum type created by the initial migration
+game_mode = sa.Enum('WALLS', 'WALLS_THROUGH', name='gamemodeenum').with_variant(
+    postgresql.ENUM('WALLS', 'WALLS_THROUGH', name='gamemodeenum', create_type=False),
+    'postgresql',
+)
+
+
+def upgrade() -> None:
+    op.create_table('user_best',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('mode', game_mode, nullable=False),
+    sa.Column('score_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Integer(), nullable=False),
+    sa.Column('date', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['score_id'], ['scores.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'mode')
+    )
+    op.create_index('idx_best_mode_score_date', 'user_best', ['mode', sa.literal_column('score DESC'), sa.literal_column('date DESC')], unique=False)
+
+    # Backfill with each user's first score that reached their best, per mode
+    op.execute(
+        "INSERT INTO user_best (user_id, mode, score_id, score, date) "
+        "SELECT user_id, mode, id, score, date FROM ("
+        "SELECT user_id, mode, id, score, date, ROW_NUMBER() OVER ("
+        "PARTITION BY user_id, mode ORDER BY score DESC, date ASC, id ASC"
+        ") AS position FROM scores"
+        ") AS ranked WHERE position = 1"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_best_mode_score_date', table_name='user_best')
+    op.drop_table('user_best')
@@ -0,0 +1,122 @@
+"""Partition scores by month (PostgreSQL)
+
+Revision ID: b3e91f4c2d7a
+Revises: 677077c067fe
+Create Date: 2026-10-17 15:02:44.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e91f4c2d7a'
+down_revision: Union[str, None] = '677077c067fe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Reuse the enum type created by the initial migration
+game_mode = postgresql.ENUM('WALLS', 'WALLS_THROUGH', name='gamemodeenum', create_type=False)
+
+# Monthly partitions from the oldest score through two months ahead (UTC)
+CREATE_MONTHLY_PARTITIONS = """
+DO $$
+DECLARE
+    first_month timestamp := date_trunc(
+        'month', COALESCE((SELECT min(date) FROM scores_unpartitioned), now()) AT TIME ZONE 'UTC'
+    );
+    last_month timestamp := date_trunc('month', now() AT TIME ZONE 'UTC') + interval '2 months';
+    partition_month timestamp := first_month;
+BEGIN
+    WHILE partition_month <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF scores FOR VALUES FROM (%L) TO (%L)',
+            'scores_p' || to_char(partition_month, 'YYYYMM'),
+            partition_month AT TIME ZONE 'UTC',
+            (partition_month + interval '1 month') AT TIME ZONE 'UTC'
+        );
+        partition_month := partition_month + interval '1 month';
+    END LOOP;
+END $$
+"""
+
+
+def create_indexes() -> None:
+    op.create_index('idx_date_desc', 'scores', [sa.literal_column('date DESC')], unique=False)
+    op.create_index('idx_mode_score_date', 'scores', ['mode', sa.literal_column('score DESC'), sa.literal_column('date DESC')], unique=False)
+    op.create_index('idx_user_mode_score', 'scores', ['user_id', 'mode', sa.literal_column('score DESC')], unique=False)
+    op.create_index(op.f('ix_scores_created_at'), 'scores', ['created_at'], unique=False)
+    op.create_index(op.f('ix_scores_date'), 'scores', ['date'], unique=False)
+    op.create_index(op.f('ix_scores_id'), 'scores', ['id'], unique=False)
+    op.create_index(op.f('ix_scores_mode'), 'scores', ['mode'], unique=False)
+    op.create_index(op.f('ix_scores_score'), 'scores', ['score'], unique=False)
+    op.create_index(op.f('ix_scores_user_id'), 'scores', ['user_id'], unique=False)
+
+
+def score_columns() -> list:
+    return [
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('scores_id_seq')"), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Integer(), nullable=False),
+        sa.Column('mode', game_mode, nullable=False),
+        sa.Column('date', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    ]
+
+
+def upgrade() -> None:
+    # Native partitioning is PostgreSQL only; elsewhere period queries use
+    # date predicates on the single scores table
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # A partitioned table's primary key must include the partition key, so
+    # user_best can no longer reference scores.id
+    op.drop_constraint('user_best_score_id_fkey', 'user_best', type_='foreignkey')
+
+    op.rename_table('scores', 'scores_unpartitioned')
+    op.execute('ALTER TABLE scores_unpartitioned RENAME CONSTRAINT scores_pkey TO scores_unpartitioned_pkey')
+    op.create_table('scores',
+    *score_columns(),
+    sa.PrimaryKeyConstraint('id', 'date'),
+    postgresql_partition_by='RANGE (date)',
+    )
+    op.execute('CREATE TABLE scores_default PARTITION OF scores DEFAULT')
+    op.execute(CREATE_MONTHLY_PARTITIONS)
+
+    op.execute(
+        'INSERT INTO scores (id, user_id, score, mode, date, created_at, updated_at) '
+        'SELECT id, user_id, score, mode, date, created_at, updated_at FROM scores_unpartitioned'
+    )
+    op.execute('ALTER SEQUENCE scores_id_seq OWNED BY scores.id')
+    op.drop_table('scores_unpartitioned')
+    create_indexes()
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.rename_table('scores', 'scores_partitioned')
+    op.execute('ALTER TABLE scores_partitioned RENAME CONSTRAINT scores_pkey TO scores_partitioned_pkey')
+    op.create_table('scores',
+    *score_columns(),
+    sa.PrimaryKeyConstraint('id'),
+    )
+    op.execute(
+        'INSERT INTO scores (id, user_id, score, mode, date, created_at, updated_at) '
+        'SELECT id, user_id, score, mode, date, created_at, updated_at FROM scores_partitioned'
+    )
+    op.execute('ALTER SEQUENCE scores_id_seq OWNED BY scores.id')
+    # Dropping the parent drops every partition
+    op.drop_table('scores_partitioned')
+    create_indexes()
+
+    op.create_foreign_key(
+        'user_best_score_id_fkey', 'user_best', 'scores', ['score_id'], ['id'], ondelete='CASCADE'
+    )
@@ -0,0 +1,59 @@
+"""Store SQLite score dates in one format
+
+Revision ID: c5a8d2e1f930
+Revises: b3e91f4c2d7a
+Create Date: 2026-10-18 09:12:37.520481
+
+SQLite keeps datetimes as text. Rows that took the CURRENT_TIMESTAMP server
+default are stored as 'YYYY-MM-DD HH:MM:SS', while SQLAlchemy writes
+'YYYY-MM-DD HH:MM:SS.ffffff'; keyset cursors compare those as strings, so a
+short value sorts before the cursor it equals. Pad the short values and
+make the server default write the long format. Other databases store real
+timestamps and are left alone.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a8d2e1f930'
+down_revision: Union[str, None] = 'b3e91f4c2d7a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SQLITE_UTC_NOW = "(strftime('%Y-%m-%d %H:%M:%f000', 'now'))"
+
+
+def set_date_default(default: str) -> None:
+    """Rebuild scores with a new date default (SQLite can't alter a column)."""
+    with op.batch_alter_table('scores') as batch_op:
+        batch_op.alter_column(
+            'date',
+            existing_type=sa.DateTime(timezone=True),
+            existing_nullable=False,
+            server_default=sa.text(default),
+        )
+    # The rebuild reflects the indexes without their DESC columns
+    op.drop_index('idx_date_desc', table_name='scores')
+    op.drop_index('idx_mode_score_date', table_name='scores')
+    op.drop_index('idx_user_mode_score', table_name='scores')
+    op.create_index('idx_date_desc', 'scores', [sa.literal_column('date DESC')], unique=False)
+    op.create_index('idx_mode_score_date', 'scores', ['mode', sa.literal_column('score DESC'), sa.literal_column('date DESC')], unique=False)
+    op.create_index('idx_user_mode_score', 'scores', ['user_id', 'mode', sa.literal_column('score DESC')], unique=False)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    set_date_default(SQLITE_UTC_NOW)
+    op.execute("UPDATE scores SET date = date || '.000000' WHERE length(date) = 19")
+    op.execute("UPDATE user_best SET date = date || '.000000' WHERE length(date) = 19")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    # The padded values stay: they are valid in either format
+    set_date_default('(CURRENT_TIMESTAMP)')
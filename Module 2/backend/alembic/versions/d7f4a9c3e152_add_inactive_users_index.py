@@ -0,0 +1,35 @@
+"""Add a partial index of inactive users
+
+Revision ID: d7f4a9c3e152
+Revises: c5a8d2e1f930
+Create Date: 2026-10-18 11:40:05.903114
+
+Score totals subtract inactive users' counters; the partial index keeps
+finding those users independent of the size of the users table.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f4a9c3e152'
+down_revision: Union[str, None] = 'c5a8d2e1f930'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'idx_users_inactive',
+        'users',
+        ['id'],
+        unique=False,
+        sqlite_where=sa.text('is_active = 0'),
+        postgresql_where=sa.text('is_active = false'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_users_inactive', table_name='users')
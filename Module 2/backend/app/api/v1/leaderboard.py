@@ -1,96 +1,282 @@
 """Leaderboard API endpoints."""
-from fastapi import APIRouter, Query, Path, Depends, Request
+import json
+from fastapi import APIRouter, Query, Path, Depends, Request, Response
+from fastapi.responses import StreamingResponse
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import (
     LeaderboardEntry,
     ScoreSubmission,
+    BatchScoreSubmission,
+    BatchSubmissionResponse,
     PaginatedResponse,
     PaginationMeta,
+    PlayerRank,
     GameMode,
 )
 from app.services import create_leaderboard_service, LeaderboardService
 from app.repository_db import DatabaseLeaderboardRepository
-from app.database import get_db
-from app.exceptions import NotFoundError
-from app.rate_limit import score_submission_limit
+from app.repository_sorted_set import (
+    SortedSetLeaderboardRepository,
+    leaderboard_index,
+    sorted_set_engine_enabled,
+)
+from app.config import settings
+from app.database import get_read_db, get_write_db
+from app.cache import leaderboard_cache, response_cache
+from app.broadcast import leaderboard_broadcaster
+from app.exceptions import NotFoundError, NotModified
+from app.pagination import encode_cursor
+from app.partitions import period_key
+from app.rate_limit import score_submission_limit, general_api_limit
+from app.versioning import leaderboard_version
+from app.write_behind import write_behind_buffer
 
 router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
 
 
 def get_leaderboard_service(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_write_db),
 ) -> LeaderboardService:
-    """Dependency to get leaderboard service with database repository."""
+    """Dependency to get leaderboard service with database repository (primary)."""
     repository = DatabaseLeaderboardRepository(db)
-    return create_leaderboard_service(repository)
+    if sorted_set_engine_enabled():
+        repository = SortedSetLeaderboardRepository(repository, leaderboard_index)
+    return create_leaderboard_service(
+        repository,
+        cache=leaderboard_cache,
+        version=leaderboard_version,
+        buffer=write_behind_buffer if settings.write_behind_enabled else None,
+    )
+
+
+def get_read_leaderboard_service(
+    db: AsyncSession = Depends(get_read_db),
+) -> LeaderboardService:
+    """Dependency to get leaderboard service on a read-only session (replica if configured)."""
+    return get_leaderboard_service(db)
+
+
+def check_not_modified(request: Request, response: Response) -> dict[str, str]:
+    """Dependency adding ETag/Last-Modified; raises NotModified if the client is current.
+    
+    Declare it before the service so a 304 is answered without a DB session.
+    Returns the validator headers for routes that build their own Response.
+    """
+    headers = leaderboard_version.headers()
+    if leaderboard_version.is_not_modified(request.headers):
+        raise NotModified(headers)
+    response.headers.update(headers)
+    return headers
+
+
+def rendered_response(
+    request: Request,
+    rendered: tuple[bytes, Optional[bytes]],
+    headers: dict[str, str],
+) -> Response:
+    """Send a pre-rendered JSON body, gzipped if the client accepts it."""
+    body, gzipped = rendered
+    headers = {**headers, "Vary": "Accept-Encoding"}
+    if gzipped is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        body = gzipped
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def build_pagination_meta(
+    entries: list[LeaderboardEntry],
+    total: Optional[int],
+    limit: int,
+    offset: int,
+    cursor: Optional[str],
+) -> PaginationMeta:
+    """Build pagination metadata, including the cursor for the next page."""
+    if cursor or total is None:
+        # Position or total is unknown; a full page means there may be more
+        has_more = len(entries) == limit
+    else:
+        has_more = (offset + limit) < total
+    
+    return PaginationMeta(
+        total=total,
+        limit=limit,
+        offset=offset,
+        has_more=has_more,
+        next_cursor=encode_cursor(entries[-1]) if has_more and entries else None,
+    )
 
 
 @router.get("", response_model=PaginatedResponse)
+@general_api_limit
 async def get_leaderboard(
+    request: Request,
     limit: int = Query(default=10, ge=1, le=100, description="Number of results"),
     offset: int = Query(default=0, ge=0, description="Offset for pagination"),
     mode: Optional[GameMode] = Query(default=None, description="Filter by game mode"),
     sort: str = Query(default="score", pattern="^(score|date)$", description="Sort order"),
-    service: LeaderboardService = Depends(get_leaderboard_service),
+    cursor: Optional[str] = Query(default=None, description="Cursor from meta.next_cursor"),
+    include_total: bool = Query(default=True, description="Include meta.total"),
+    distinct_players: bool = Query(
+        default=False, description="One entry per player (their personal best)"
+    ),
+    period: str = Query(
+        default="all", pattern="^(day|week|all)$", description="Time period (UTC)"
+    ),
+    validators: dict[str, str] = Depends(check_not_modified),
+    service: LeaderboardService = Depends(get_read_leaderboard_service),
 ):
     """Get leaderboard entries with pagination and filtering."""
-    entries, total = await service.get_leaderboard(limit, offset, mode, sort)
+    # First pages are the hot ones; serve them as pre-rendered bytes
+    first_page = offset == 0 and not cursor
+    key = ("leaderboard", mode, sort, limit, include_total, distinct_players, period_key(period))
+    if first_page:
+        rendered = response_cache.get(key, validators["ETag"])
+        if rendered is not None:
+            return rendered_response(request, rendered, validators)
     
-    return PaginatedResponse(
+    entries, total = await service.get_leaderboard(
+        limit, offset, mode, sort, cursor, include_total, distinct_players, period
+    )
+    
+    page = PaginatedResponse(
         data=entries,
-        meta=PaginationMeta(
-            total=total,
-            limit=limit,
-            offset=offset,
-            has_more=(offset + limit) < total,
-        ),
+        meta=build_pagination_meta(entries, total, limit, offset, cursor),
     )
+    if not first_page:
+        return page
+    
+    rendered = response_cache.set(key, validators["ETag"], page.model_dump_json().encode())
+    return rendered_response(request, rendered, validators)
 
 
 @router.post("", response_model=LeaderboardEntry, status_code=201)
 @score_submission_limit  # Rate limit score submissions
 async def submit_score(
     request: Request,
+    response: Response,
     submission: ScoreSubmission,
     service: LeaderboardService = Depends(get_leaderboard_service),
 ):
-    """Submit a new score to the leaderboard."""
+    """Submit a new score to the leaderboard.
+    
+    With write-behind enabled the score is stored shortly after the response,
+    which is then 202 Accepted and carries no id.
+    """
     entry = await service.submit_score(submission)
+    if service.buffer is not None:
+        response.status_code = 202
     return entry
 
 
+@router.post("/batch", response_model=BatchSubmissionResponse)
+@score_submission_limit  # One hit per batch; size is capped by batch_max_submissions
+async def submit_scores(
+    request: Request,
+    batch: BatchScoreSubmission,
+    service: LeaderboardService = Depends(get_leaderboard_service),
+):
+    """Submit several scores at once, e.g. games queued while offline."""
+    results = await service.submit_scores(batch.submissions)
+    created = sum(1 for result in results if result.status == "created")
+    
+    return BatchSubmissionResponse(
+        created=created,
+        rejected=len(results) - created,
+        results=results,
+    )
+
+
+@router.get("/stream")
+@general_api_limit
+async def stream_leaderboard(
+    request: Request,
+    mode: Optional[GameMode] = Query(default=None, description="Filter by game mode"),
+):
+    """Stream live top-N changes as server-sent events.
+    
+    The first event is a ``snapshot`` of the top entries; each ``diff`` event
+    lists the entries that entered the top (with their rank) and the ids that
+    left it.
+    """
+    return StreamingResponse(
+        leaderboard_broadcaster.events(
+            mode, settings.stream_keepalive_seconds, request.is_disconnected
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/stats/summary", response_model=dict)
+@general_api_limit
 async def get_stats(
-    service: LeaderboardService = Depends(get_leaderboard_service),
+    request: Request,
+    validators: dict[str, str] = Depends(check_not_modified),
+    service: LeaderboardService = Depends(get_read_leaderboard_service),
 ):
     """Get aggregate statistics."""
-    stats = await service.get_stats()
-    return stats
+    rendered = response_cache.get("stats", validators["ETag"])
+    if rendered is None:
+        stats = await service.get_stats()
+        body = json.dumps(stats, separators=(",", ":")).encode()
+        rendered = response_cache.set("stats", validators["ETag"], body)
+    return rendered_response(request, rendered, validators)
+
+
+@router.get("/rank", response_model=PlayerRank)
+@general_api_limit
+async def get_score_rank(
+    request: Request,
+    score: int = Query(..., ge=0, description="Score to rank"),
+    mode: Optional[GameMode] = Query(default=None, description="Filter by game mode"),
+    service: LeaderboardService = Depends(get_read_leaderboard_service),
+):
+    """Get the rank and percentile a score would have."""
+    return await service.get_score_rank(score, mode)
+
+
+@router.get("/{username}/rank", response_model=PlayerRank)
+@general_api_limit
+async def get_user_rank(
+    request: Request,
+    username: str = Path(..., description="Username to rank"),
+    mode: Optional[GameMode] = Query(default=None, description="Filter by game mode"),
+    service: LeaderboardService = Depends(get_read_leaderboard_service),
+):
+    """Get the rank and percentile of a user's best score."""
+    rank = await service.get_user_rank(username, mode)
+    
+    if rank is None:
+        raise NotFoundError(f"No scores found for user: {username}")
+    
+    return rank
 
 
 @router.get("/{username}", response_model=PaginatedResponse)
+@general_api_limit
 async def get_user_scores(
+    request: Request,
     username: str = Path(..., description="Username to get scores for"),
     limit: int = Query(default=10, ge=1, le=100, description="Number of results"),
     offset: int = Query(default=0, ge=0, description="Offset for pagination"),
     mode: Optional[GameMode] = Query(default=None, description="Filter by game mode"),
-    service: LeaderboardService = Depends(get_leaderboard_service),
+    cursor: Optional[str] = Query(default=None, description="Cursor from meta.next_cursor"),
+    include_total: bool = Query(default=True, description="Include meta.total"),
+    service: LeaderboardService = Depends(get_read_leaderboard_service),
 ):
     """Get scores for a specific user."""
-    entries, total = await service.get_user_scores(username, limit, offset, mode)
+    entries, total = await service.get_user_scores(
+        username, limit, offset, mode, cursor, include_total
+    )
     
-    if total == 0:
+    first_page = offset == 0 and not cursor
+    if total == 0 or (total is None and first_page and not entries):
         raise NotFoundError(f"No scores found for user: {username}")
     
     return PaginatedResponse(
         data=entries,
-        meta=PaginationMeta(
-            total=total,
-            limit=limit,
-            offset=offset,
-            has_more=(offset + limit) < total,
-        ),
+        meta=build_pagination_meta(entries, total, limit, offset, cursor),
     )
 
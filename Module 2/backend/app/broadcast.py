@@ -0,0 +1,244 @@
+"""Live leaderboard updates pushed to stream subscribers.
+
+One broadcaster per process queries the top of the leaderboard once per
+change (coalescing bursts) and fans the difference out to every subscriber,
+so idle clients cost no database work. Changes are signalled when a session
+that added scores commits; a periodic refresh picks up scores stored by
+other worker processes.
+"""
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import ReadSessionLocal
+from app.models import LeaderboardEntry, GameMode
+from app.repository_db import SCORES_ADDED_KEY, DatabaseLeaderboardRepository
+
+logger = logging.getLogger(__name__)
+
+# Events a subscriber may fall behind by before it is resynced with a snapshot
+SUBSCRIBER_QUEUE_SIZE = 16
+
+# Queued in place of an event to end a subscriber's stream
+END_OF_STREAM = None
+
+
+def format_event(name: str, data: dict) -> str:
+    """Encode one server-sent event."""
+    return f"event: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def ranked(entries: List[LeaderboardEntry]) -> List[dict]:
+    """Entries as JSON with their 1-based rank."""
+    return [
+        {"rank": rank, **entry.model_dump(mode="json")}
+        for rank, entry in enumerate(entries, start=1)
+    ]
+
+
+class Subscription:
+    """One subscriber's queue of encoded events for a game mode (None = all)."""
+
+    def __init__(self, mode: Optional[GameMode]):
+        self.mode = mode
+        self.queue: asyncio.Queue[Optional[str]] = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def end(self) -> None:
+        """Make the subscriber's stream finish after the events it already has."""
+        while self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(END_OF_STREAM)
+
+
+class LeaderboardBroadcaster:
+    """Single fan-out of top-N leaderboard changes to stream subscribers.
+
+    A ``diff`` event lists the entries that entered the top N (with their
+    rank) and the ids that left it; clients keep the list ordered by score,
+    so surviving entries are never re-sent. Slow subscribers whose queue
+    fills up get a fresh ``snapshot`` instead of the backlog.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        top_n: int,
+        debounce: float,
+        refresh_interval: float,
+    ):
+        self.session_factory = session_factory
+        self.top_n = top_n
+        self.debounce = debounce
+        self.refresh_interval = refresh_interval
+        self._subscriptions: set[Subscription] = set()
+        self._tops: Dict[Optional[GameMode], List[LeaderboardEntry]] = {}
+        self._changed: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+    async def subscribe(self, mode: Optional[GameMode]) -> Subscription:
+        """Register a subscriber; its first event is a snapshot of the top N."""
+        if not self.running:
+            self._changed = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+        subscription = Subscription(mode)
+        if mode not in self._tops:
+            self._tops[mode] = await self._fetch(mode)
+        subscription.queue.put_nowait(self._snapshot(mode))
+        if self._closing:
+            subscription.end()
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Stop delivering events to a subscriber."""
+        self._subscriptions.discard(subscription)
+
+    async def events(
+        self,
+        mode: Optional[GameMode],
+        keepalive: float,
+        disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    ) -> AsyncIterator[str]:
+        """Encoded events for one subscriber, with keepalive comments when idle.
+
+        Ends once ``close_streams`` is called, or when ``disconnected`` reports
+        at a keepalive that the client (or the server) closed the connection.
+        """
+        subscription = await self.subscribe(mode)
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    if disconnected is not None and await disconnected():
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                if message is END_OF_STREAM:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscription)
+
+    def close_streams(self) -> None:
+        """End every open and future event stream."""
+        self._closing = True
+        for subscription in self._subscriptions:
+            subscription.end()
+
+    def notify(self) -> None:
+        """Signal that scores were added; the refresh runs after the debounce."""
+        if self._changed is not None:
+            self._changed.set()
+
+    async def stop(self) -> None:
+        """End the streams, stop the refresh task and forget every subscriber."""
+        self.close_streams()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._changed = None
+        self._subscriptions.clear()
+        self._tops.clear()
+        self._closing = False
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._changed.wait(), self.refresh_interval)
+            except asyncio.TimeoutError:
+                pass
+            # Let a burst of submissions settle into one refresh
+            await asyncio.sleep(self.debounce)
+            self._changed.clear()
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Failed to refresh the live leaderboard")
+
+    async def refresh(self) -> None:
+        """Re-read the top N of every subscribed mode and push the differences."""
+        modes = {subscription.mode for subscription in self._subscriptions}
+        for mode in list(self._tops):
+            if mode not in modes:
+                del self._tops[mode]
+
+        for mode in modes:
+            previous = self._tops.get(mode, [])
+            current = await self._fetch(mode)
+            self._tops[mode] = current
+
+            previous_ids = {entry.id for entry in previous}
+            current_ids = {entry.id for entry in current}
+            added = [item for item in ranked(current) if item["id"] not in previous_ids]
+            removed = [entry.id for entry in previous if entry.id not in current_ids]
+            if added or removed:
+                diff = {"mode": mode.value if mode else None, "added": added, "removed": removed}
+                self._publish(mode, format_event("diff", diff))
+
+    async def _fetch(self, mode: Optional[GameMode]) -> List[LeaderboardEntry]:
+        async with self.session_factory() as session:
+            repository = DatabaseLeaderboardRepository(session)
+            entries, _ = await repository.get_leaderboard(
+                limit=self.top_n, mode=mode, include_total=False
+            )
+        return entries
+
+    def _snapshot(self, mode: Optional[GameMode]) -> str:
+        return format_event(
+            "snapshot", {"mode": mode.value if mode else None, "entries": ranked(self._tops[mode])}
+        )
+
+    def _publish(self, mode: Optional[GameMode], message: str) -> None:
+        if self._closing:
+            return
+        for subscription in self._subscriptions:
+            if subscription.mode != mode:
+                continue
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Too far behind for diffs to apply; start it over
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.queue.put_nowait(self._snapshot(mode))
+
+
+# Global broadcaster; its refresh task starts with the first subscriber
+leaderboard_broadcaster = LeaderboardBroadcaster(
+    ReadSessionLocal,
+    top_n=settings.stream_top_n,
+    debounce=settings.stream_debounce_ms / 1000,
+    refresh_interval=settings.stream_refresh_seconds,
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_scores_added(session: Session) -> None:
+    if session.info.pop(SCORES_ADDED_KEY, False):
+        leaderboard_broadcaster.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_scores_added(session: Session) -> None:
+    session.info.pop(SCORES_ADDED_KEY, None)
@@ -0,0 +1,166 @@
+"""In-process caching for hot leaderboard pages."""
+import gzip
+import time
+from collections import OrderedDict
+from typing import Hashable, List, Optional
+
+from app.config import settings
+from app.models import LeaderboardEntry, GameMode
+from app.partitions import period_key
+
+
+# Cache key: (mode, sort, limit, offset, distinct_players, period key)
+CacheKey = tuple[Optional[str], str, int, int, bool, str]
+
+
+class LeaderboardCache:
+    """TTL + LRU cache of leaderboard pages with score-aware invalidation.
+
+    Each entry holds the page rows and the total row count for its filter.
+    Writes invalidate only the pages a new score can actually change; every
+    other page of the same mode is kept and has its total bumped in place.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[CacheKey, tuple[float, List[LeaderboardEntry], int]] = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    @staticmethod
+    def make_key(
+        mode: Optional[GameMode],
+        sort: str,
+        limit: int,
+        offset: int,
+        distinct_players: bool = False,
+        period: str = "all",
+    ) -> CacheKey:
+        """Build the cache key for a leaderboard page.
+
+        Day and week pages are keyed by the period's start, so a new period
+        never serves the previous one's page.
+        """
+        return (
+            mode.value if mode else None, sort, limit, offset, distinct_players,
+            period_key(period),
+        )
+
+    def get(self, key: CacheKey) -> Optional[tuple[List[LeaderboardEntry], int]]:
+        """Return a cached page, or None if missing or expired."""
+        cached = self._entries.get(key)
+        if cached is None:
+            self.misses += 1
+            return None
+
+        expires_at, entries, total = cached
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return list(entries), total
+
+    def set(self, key: CacheKey, entries: List[LeaderboardEntry], total: int) -> None:
+        """Store a page, evicting the least recently used entries if full."""
+        if not self.enabled:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, list(entries), total)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_for_score(self, mode: GameMode, score: int) -> None:
+        """Drop the pages a newly inserted score can change.
+
+        A new row has the newest date, so it lands at the top of every
+        date-sorted page and, among equal scores, first in score order.
+        A score-sorted page is therefore unchanged only when it is full and
+        its last row scores strictly higher than the new one. Per-player pages
+        are always dropped, since their total depends on who submitted.
+        """
+        for key in list(self._entries):
+            key_mode, sort, limit, _offset, distinct_players, _period = key
+            if key_mode is not None and key_mode != mode.value:
+                continue
+
+            expires_at, entries, total = self._entries[key]
+            unaffected = (
+                sort == "score"
+                and not distinct_players
+                and len(entries) == limit
+                and entries[-1].score > score
+            )
+            if unaffected:
+                self._entries[key] = (expires_at, entries, total + 1)
+            else:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """Drop every cached page."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_SIZE = 500
+
+
+class ResponseCache:
+    """LRU cache of ready-to-send JSON bodies and their gzip variants.
+
+    Entries are tagged with the leaderboard ETag they were rendered at and
+    are ignored once it changes, so each body is rendered once per version.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[str, bytes, Optional[bytes]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, etag: str) -> Optional[tuple[bytes, Optional[bytes]]]:
+        """Return (body, gzipped body or None) rendered at this ETag, if any."""
+        cached = self._entries.get(key)
+        if cached is None or cached[0] != etag:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return cached[1], cached[2]
+
+    def set(self, key: Hashable, etag: str, body: bytes) -> tuple[bytes, Optional[bytes]]:
+        """Store a rendered body, compressing it once; return (body, gzipped)."""
+        gzipped = gzip.compress(body, mtime=0) if len(body) >= GZIP_MIN_SIZE else None
+        if self.max_entries > 0:
+            self._entries[key] = (etag, body, gzipped)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body, gzipped
+
+    def clear(self) -> None:
+        """Drop every cached body."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Global cache instances shared by all requests in this process
+leaderboard_cache = LeaderboardCache(
+    ttl_seconds=settings.cache_ttl_seconds,
+    max_entries=settings.cache_max_entries,
+)
+response_cache = ResponseCache(max_entries=settings.response_cache_max_entries)
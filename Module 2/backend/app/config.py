@@ -34,6 +34,35 @@ class Settings(BaseSettings):
         return v
     database_pool_size_min: int = 5
     database_pool_size_max: int = 20
+    # Optional read replica for GET routes (own pool, same sizes); empty reads the primary.
+    # Pages cached from a lagging replica can stay stale for up to cache_ttl_seconds
+    read_database_url: str = ""
+    
+    @field_validator('read_database_url')
+    @classmethod
+    def validate_read_database_url(cls, v: str) -> str:
+        """Validate read replica URL format."""
+        return cls.validate_database_url(v) if v else v
+    
+    # SQLite profile: "development" shares one connection; "production" enables
+    # WAL, a pool of read-only connections for reads and one serialized writer
+    sqlite_profile: str = "development"
+    
+    @field_validator('sqlite_profile')
+    @classmethod
+    def validate_sqlite_profile(cls, v: str) -> str:
+        """Validate SQLite profile name."""
+        if v not in ("development", "production"):
+            raise ValueError("sqlite_profile must be 'development' or 'production'")
+        return v
+    sqlite_read_pool_size: int = 4
+    sqlite_busy_timeout_ms: int = 5000  # Wait for a lock held by another connection
+    sqlite_cache_size_kib: int = 65536  # Page cache per connection
+    sqlite_mmap_size: int = 268435456  # Bytes of the file memory-mapped (256 MiB)
+    
+    # Worker processes serving the app (read by uvicorn and gunicorn as well);
+    # above 1, per-process indexes stop treating a miss as conclusive
+    web_concurrency: int = 1
     
     # CORS
     cors_origins: List[str] = ["http://localhost:8080", "http://localhost:5173"]
@@ -42,15 +71,64 @@ class Settings(BaseSettings):
     # Logging
     log_level: str = "INFO"  # DEBUG, INFO, WARNING, ERROR
     log_format: str = "text"  # text for development (readable), json for production
+    # Records buffered for a background writer thread (0 writes synchronously);
+    # records arriving while the buffer is full are dropped
+    log_queue_size: int = 0
+    # Share of successful requests whose start/completion is logged (errors always are)
+    log_sample_rate: float = 1.0
     
     # Security
     rate_limit_per_minute: int = 60
+    # Rate limit counters shared by all workers: "redis://..." or "memory://";
+    # empty uses redis_url when set, else a local SQLite file
+    rate_limit_storage_uri: str = ""
     max_score: int = 999999
     min_score: int = 0
+    batch_max_submissions: int = 100  # Submissions accepted per batch request
     
-    # Optional: Redis for caching
-    redis_url: str = ""
+    # Caching (in-process leaderboard pages; set cache_ttl_seconds=0 to disable)
     cache_ttl_seconds: int = 30
+    cache_max_entries: int = 256
+    # Pre-rendered JSON/gzip bodies of first pages and stats (0 disables)
+    response_cache_max_entries: int = 64
+    user_cache_max_entries: int = 10000  # username -> user id
+    
+    # Write-behind submissions: acknowledge once journaled, insert in background batches
+    write_behind_enabled: bool = False
+    write_behind_journal_path: str = "./submissions.journal"  # Suffixed per process (.<pid>)
+    write_behind_queue_size: int = 10000  # Pending submissions before answering 503
+    write_behind_batch_size: int = 200
+    write_behind_flush_interval_ms: int = 50
+    write_behind_fsync: bool = True
+    # Storage attempts per batch, then per record, before moving it to <journal>.rejected
+    write_behind_max_attempts: int = 5
+    
+    # Live leaderboard stream (/leaderboard/stream)
+    stream_top_n: int = 10  # Entries pushed to subscribers
+    stream_debounce_ms: int = 250  # Bursts of submissions within this window push once
+    stream_refresh_seconds: float = 5.0  # Re-check for scores stored by other workers
+    stream_keepalive_seconds: float = 15.0
+    
+    # Hours between checks for upcoming monthly score partitions (PostgreSQL; 0 disables)
+    partition_maintenance_hours: float = 6.0
+    
+    # Leaderboard engine: "sql" queries the database, "sorted_set" serves ranked
+    # reads from per-mode sorted sets (Redis when redis_url is set, else in-process).
+    # The in-process sets only see their own worker's writes: with web_concurrency > 1
+    # and no redis_url reads stay on SQL. Writes made outside the app (seed_db) are
+    # picked up at the next start.
+    leaderboard_engine: str = "sql"
+    
+    @field_validator('leaderboard_engine')
+    @classmethod
+    def validate_leaderboard_engine(cls, v: str) -> str:
+        """Validate leaderboard engine name."""
+        if v not in ("sql", "sorted_set"):
+            raise ValueError("leaderboard_engine must be 'sql' or 'sorted_set'")
+        return v
+    
+    # Optional: Redis
+    redis_url: str = ""
     
     def get_cors_origins(self) -> List[str]:
         """Get CORS origins, handling comma-separated string."""
@@ -1,5 +1,14 @@
 """Database configuration and session management."""
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+import asyncio
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
+)
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.pool import StaticPool
 from app.config import settings
@@ -7,27 +16,139 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-# Create async engine
-# Convert sqlite:// to sqlite+aiosqlite:// for async support
-database_url = settings.database_url
-if database_url.startswith("sqlite"):
-    database_url = database_url.replace("sqlite://", "sqlite+aiosqlite://", 1)
-    # SQLite doesn't support connection pooling - use StaticPool
-    engine = create_async_engine(
-        database_url,
-        echo=settings.environment == "development",  # Log SQL queries in development
+
+@dataclass
+class QueryStats:
+    """Statements executed and time spent in the database by one request."""
+    request_id: str
+    count: int = 0
+    duration: float = 0.0
+
+
+# Stats of the request being handled (set by the request middleware)
+query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def track_queries(request_id: str) -> QueryStats:
+    """Start counting statements for the current request's context."""
+    stats = QueryStats(request_id)
+    query_stats.set(stats)
+    return stats
+
+
+# Sync engine events run in the caller's context (SQLAlchemy's greenlets share
+# it), so statements are attributed to the request that issued them
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if query_stats.get() is not None:
+        context.query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    stats = query_stats.get()
+    started = getattr(context, "query_started", None)
+    if stats is not None and started is not None:
+        stats.count += 1
+        stats.duration += time.perf_counter() - started
+
+
+def sqlite_pragmas(read_only: bool) -> list[str]:
+    """PRAGMAs of the production SQLite profile, run on every new connection."""
+    pragmas = [
+        f"PRAGMA busy_timeout = {settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA cache_size = -{settings.sqlite_cache_size_kib}",
+        f"PRAGMA mmap_size = {settings.sqlite_mmap_size}",
+    ]
+    if read_only:
+        return pragmas + ["PRAGMA query_only = ON"]
+    # WAL persists in the file; readers then never block on the writer
+    return pragmas + ["PRAGMA journal_mode = WAL", "PRAGMA synchronous = NORMAL"]
+
+
+def _sqlite_engine(url: str, echo: bool, pool_size: int, read_only: bool) -> AsyncEngine:
+    sqlite_engine = create_async_engine(
+        url,
+        echo=echo,
         connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
+        pool_size=pool_size,
+        max_overflow=0,
+    )
+    pragmas = sqlite_pragmas(read_only)
+    
+    @event.listens_for(sqlite_engine.sync_engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+    return sqlite_engine
+
+
+def create_sqlite_engines(url: str, echo: bool = False) -> tuple[AsyncEngine, AsyncEngine]:
+    """Writer and reader engines of the production SQLite profile.
+    
+    SQLite allows one writer at a time, so the writer pool holds a single
+    connection and writes queue for it in-process instead of retrying on
+    SQLITE_BUSY. Reads use a separate pool of read-only connections.
+    """
+    writer = _sqlite_engine(url, echo, pool_size=1, read_only=False)
+    return writer, create_read_engine(url, echo)
+
+
+def create_read_engine(url: str, echo: bool = False) -> AsyncEngine:
+    """Engine with its own pool for read-only sessions, e.g. on a replica."""
+    url = async_url(url)
+    if url.startswith("sqlite"):
+        return _sqlite_engine(url, echo, pool_size=settings.sqlite_read_pool_size, read_only=True)
+    return create_async_engine(
+        url,
+        echo=echo,
+        pool_size=settings.database_pool_size_min,
+        max_overflow=settings.database_pool_size_max - settings.database_pool_size_min,
+        pool_pre_ping=True,
     )
+
+
+def async_url(url: str) -> str:
+    """Convert sqlite:// to sqlite+aiosqlite:// for async support."""
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url.removeprefix("sqlite://")
+    return url
+
+
+# Create async engine
+database_url = async_url(settings.database_url)
+echo = settings.environment == "development"  # Log SQL queries in development
+# Engine for read-only work: the replica if configured, else the primary
+read_engine: Optional[AsyncEngine] = None
+if settings.read_database_url:
+    read_engine = create_read_engine(settings.read_database_url, echo)
+if database_url.startswith("sqlite"):
+    if settings.sqlite_profile == "production" and ":memory:" not in database_url:
+        # The local readers connect lazily, so they cost nothing beside a replica
+        engine, local_readers = create_sqlite_engines(database_url, echo)
+        if read_engine is None:
+            read_engine = local_readers
+    else:
+        # One shared connection - use StaticPool
+        engine = create_async_engine(
+            database_url,
+            echo=echo,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
 else:
     # PostgreSQL/MySQL support connection pooling
     engine = create_async_engine(
         database_url,
-        echo=settings.environment == "development",
+        echo=echo,
         pool_size=settings.database_pool_size_min,
         max_overflow=settings.database_pool_size_max - settings.database_pool_size_min,
         pool_pre_ping=True,  # Verify connections before using
     )
+if read_engine is None:
+    read_engine = engine
 
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
@@ -38,12 +159,21 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
+# Sessions for reads only (never committed)
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+)
+
 # Base class for models
 Base = declarative_base()
 
 
-async def get_db() -> AsyncSession:
-    """Dependency for getting database session."""
+async def get_write_db() -> AsyncSession:
+    """Dependency for getting a read-write session on the primary, committed on success."""
     async with AsyncSessionLocal() as session:
         try:
             yield session
@@ -55,16 +185,48 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+# Former name of get_write_db (overriding either overrides both)
+get_db = get_write_db
+
+
+async def get_read_db() -> AsyncSession:
+    """Dependency for getting a read-only session (replica if configured); never committed."""
+    async with ReadSessionLocal() as session:
+        yield session
+
+
 async def init_db():
-    """Initialize database (create tables)."""
+    """Initialize database (create tables and upcoming score partitions)."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    await create_partitions()
     logger.info("Database initialized")
 
 
+async def create_partitions() -> None:
+    """Create the upcoming monthly score partitions that don't exist yet."""
+    from app.partitions import ensure_partitions
+    async with engine.begin() as conn:
+        created = await conn.run_sync(ensure_partitions)
+    if created:
+        logger.info(f"Created score partitions: {', '.join(created)}")
+
+
+async def maintain_partitions(interval_seconds: float) -> None:
+    """Keep creating upcoming partitions for as long as the process runs."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await create_partitions()
+        except Exception:
+            logger.exception("Score partition maintenance failed")
+
+
 async def close_db():
     """Close database connections."""
     await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
     logger.info("Database connections closed")
 
 
@@ -0,0 +1,84 @@
+"""Dialect-aware SQL helpers."""
+from typing import Any, Callable
+
+from sqlalchemy import DateTime, Table, case
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+# SQLite expression for the current UTC time in the format SQLAlchemy writes
+# datetimes in ('YYYY-MM-DD HH:MM:SS.ffffff'); CURRENT_TIMESTAMP has no
+# fraction, and mixing both formats breaks string comparison on equal seconds
+SQLITE_UTC_NOW = "(strftime('%Y-%m-%d %H:%M:%f000', 'now'))"
+
+
+class utcnow(FunctionElement):
+    """Current timestamp as a server default, stored like Python-side datetimes."""
+
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _utcnow(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utcnow, "sqlite")
+def _utcnow_sqlite(element, compiler, **kw):
+    return SQLITE_UTC_NOW
+
+
+def dialect_insert(dialect_name: str, table: Table):
+    """Return an INSERT construct that supports the dialect's upsert clause."""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+def upsert(
+    dialect_name: str,
+    table: Table,
+    values: list[dict] | dict,
+    index_elements: list[str],
+    set_: Callable[[Any], dict],
+    where: Callable[[Any], Any] | None = None,
+):
+    """Build an INSERT ... ON CONFLICT DO UPDATE statement.
+
+    Args:
+        dialect_name: Name of the connection's dialect.
+        table: Target table.
+        values: Row(s) to insert.
+        index_elements: Columns of the conflicting unique key.
+        set_: Called with the proposed row (``excluded`` / ``inserted``) and
+            returns the column assignments applied on conflict.
+        where: Optional condition, built the same way, that the existing row
+            must meet to be updated.
+    """
+    stmt = dialect_insert(dialect_name, table).values(values)
+    if dialect_name == "mysql":
+        assignments = set_(stmt.inserted)
+        if where is not None:
+            condition = where(stmt.inserted)
+            assignments = {
+                column: case((condition, value), else_=table.c[column])
+                for column, value in assignments.items()
+            }
+        return stmt.on_duplicate_key_update(assignments)
+    return stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_=set_(stmt.excluded),
+        where=where(stmt.excluded) if where is not None else None,
+    )
+
+
+def insert_ignore(dialect_name: str, table: Table, values: list[dict] | dict):
+    """Build an INSERT that skips rows conflicting with an existing unique key."""
+    stmt = dialect_insert(dialect_name, table).values(values)
+    if dialect_name == "mysql":
+        return stmt.prefix_with("IGNORE")
+    return stmt.on_conflict_do_nothing()
@@ -1,6 +1,6 @@
 """Custom exceptions and error handling."""
 from fastapi import Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
@@ -58,6 +58,13 @@ class RateLimitError(APIException):
         super().__init__("RATE_LIMIT_EXCEEDED", message, 429)
 
 
+class ServiceUnavailableError(APIException):
+    """Service temporarily unavailable error (503)."""
+    
+    def __init__(self, message: str = "Service temporarily unavailable"):
+        super().__init__("SERVICE_UNAVAILABLE", message, 503)
+
+
 class NotFoundError(APIException):
     """Resource not found error (404)."""
     
@@ -79,6 +86,19 @@ class DatabaseError(APIException):
         super().__init__("DATABASE_ERROR", message, 500)
 
 
+class NotModified(Exception):
+    """Raised to answer a conditional GET with 304 Not Modified."""
+    
+    def __init__(self, headers: dict[str, str]):
+        self.headers = headers
+        super().__init__("Not modified")
+
+
+async def not_modified_handler(request: Request, exc: NotModified) -> Response:
+    """Answer with an empty 304 carrying the current validators."""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=exc.headers)
+
+
 async def api_exception_handler(request: Request, exc: APIException) -> JSONResponse:
     """Handle custom API exceptions."""
     return JSONResponse(
@@ -1,16 +1,36 @@
 """Logging configuration."""
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
+from typing import Optional
 from app.config import settings
 
+try:
+    import orjson
+except ImportError:  # Optional speedup: pip install orjson
+    orjson = None
+
+if orjson is not None:
+    def dumps(data: dict) -> str:
+        """Encode a log record's fields as JSON."""
+        return orjson.dumps(data, default=str).decode()
+else:
+    import json
+
+    _encoder = json.JSONEncoder(separators=(", ", ": "), default=str)
+
+    def dumps(data: dict) -> str:
+        """Encode a log record's fields as JSON."""
+        return _encoder.encode(data)
+
 
 class JSONFormatter(logging.Formatter):
     """JSON formatter for structured logging."""
 
     def format(self, record):
         """Format log record as JSON."""
-        import json
-
         log_data = {
             "timestamp": self.formatTime(record, self.datefmt),
             "level": record.levelname,
@@ -28,10 +48,50 @@ class JSONFormatter(logging.Formatter):
             log_data["status_code"] = record.status_code
         if hasattr(record, "process_time"):
             log_data["process_time"] = record.process_time
+        if hasattr(record, "db_queries"):
+            log_data["db_queries"] = record.db_queries
+        if hasattr(record, "db_time"):
+            log_data["db_time"] = record.db_time
         if record.exc_info:
             log_data["exception"] = self.formatException(record.exc_info)
 
-        return json.dumps(log_data)
+        return dumps(log_data)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hand records to the listener thread without formatting or blocking.
+
+    Records are queued as they are; the listener's handlers format them. When
+    the queue is full (stdout can't keep up) records are dropped and counted
+    rather than stalling the caller.
+    """
+
+    def __init__(self, record_queue: queue.Queue):
+        super().__init__(record_queue)
+        self.dropped = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# Background writer of the queue logging mode (None when logging synchronously)
+queue_handler: Optional[NonBlockingQueueHandler] = None
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def stop_logging() -> None:
+    """Write out the queued records and stop the listener thread, if any."""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+# Registered once; setup_logging may run again and replace the listener
+atexit.register(stop_logging)
 
 
 def setup_logging():
@@ -53,8 +113,6 @@ def setup_logging():
 
     if settings.log_format == "json":
         # JSON logging for production
-        import logging.handlers
-
         formatter = JSONFormatter()
     else:
         # Text logging for development
@@ -67,6 +125,14 @@ def setup_logging():
 
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
+    if settings.log_queue_size > 0:
+        # Format and write on a background thread; the event loop only enqueues
+        global queue_handler, _queue_listener
+        stop_logging()
+        queue_handler = NonBlockingQueueHandler(queue.Queue(settings.log_queue_size))
+        _queue_listener = logging.handlers.QueueListener(queue_handler.queue, handler)
+        _queue_listener.start()
+        handler = queue_handler
     root_logger.addHandler(handler)
 
     # Set specific loggers
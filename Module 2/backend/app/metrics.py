@@ -0,0 +1,199 @@
+"""Process metrics in the Prometheus text exposition format.
+
+Recording happens on the event loop thread only, so counters are plain
+integers and dict entries: no locks on the request path. Gauges that other
+components already track (pool usage, cache hits) are read at scrape time.
+"""
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy.pool import QueuePool
+
+from app import logging_config
+from app.cache import leaderboard_cache, response_cache
+from app.database import engine, read_engine
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Bucketed observations; the last count is the +Inf overflow."""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestMetrics:
+    """Request counts and latencies by route template, plus in-flight requests."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.in_flight = 0
+        self.rate_limited = 0
+
+    def observe(self, method: str, route: str, status: int, duration: float) -> None:
+        """Record a finished request."""
+        key = (method, route, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        histogram = self.latency.get((method, route))
+        if histogram is None:
+            histogram = self.latency[(method, route)] = Histogram()
+        histogram.observe(duration)
+
+
+# Global metrics of this process
+request_metrics = RequestMetrics()
+
+
+def route_template(scope: dict) -> str:
+    """Path template of the route that handled a request.
+
+    E.g. ``/api/v1/leaderboard/{username}`` for ``/api/v1/leaderboard/ALICE``.
+
+    Routes of included routers carry their path relative to the parent
+    router's prefix; the prefix is the request path's leading segments beyond
+    the template's. Requests no route matched share one ``<unmatched>`` label,
+    so raw paths never become labels.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "<unmatched>"
+    if ":path}" in template:
+        return template
+    segments = scope["path"].rstrip("/").split("/")
+    depth = len(segments) - len(template.rstrip("/").split("/"))
+    return "/".join(segments[:depth + 1]) + template if depth > 0 else template
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _metric(name: str, kind: str, help_text: str, samples: Iterable[str]) -> List[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", *samples]
+
+
+def render_metrics() -> str:
+    """Render every metric of this process."""
+    metrics = request_metrics
+    lines = _metric(
+        "http_requests_total",
+        "counter",
+        "Requests handled, by route template and status code.",
+        (
+            f"http_requests_total{_labels(method=m, route=r, status=s)} {n}"
+            for (m, r, s), n in sorted(metrics.requests.items())
+        ),
+    )
+
+    samples = []
+    for (method, route), histogram in sorted(metrics.latency.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), histogram.counts):
+            cumulative += count
+            labels = _labels(method=method, route=route, le=bound)
+            samples.append(f"http_request_duration_seconds_bucket{labels} {cumulative}")
+        labels = _labels(method=method, route=route)
+        samples.append(f"http_request_duration_seconds_sum{labels} {histogram.sum:.6f}")
+        samples.append(f"http_request_duration_seconds_count{labels} {histogram.count}")
+    lines += _metric(
+        "http_request_duration_seconds",
+        "histogram",
+        "Request latency, by route template.",
+        samples,
+    )
+    lines += _metric(
+        "http_requests_in_flight",
+        "gauge",
+        "Requests currently being handled.",
+        [f"http_requests_in_flight {metrics.in_flight}"],
+    )
+    lines += _metric(
+        "rate_limit_rejections_total",
+        "counter",
+        "Requests rejected by the rate limiter.",
+        [f"rate_limit_rejections_total {metrics.rate_limited}"],
+    )
+
+    if logging_config.queue_handler is not None:
+        lines += _metric(
+            "log_records_dropped_total",
+            "counter",
+            "Log records dropped because the logging queue was full.",
+            [f"log_records_dropped_total {logging_config.queue_handler.dropped}"],
+        )
+
+    # The read pool (replica or local readers) when reads have an engine of their own
+    engines = [("write", engine)] + ([("read", read_engine)] if read_engine is not engine else [])
+    pools = [(name, e.pool) for name, e in engines if isinstance(e.pool, QueuePool)]
+    if pools:
+        lines += _metric(
+            "db_pool_size",
+            "gauge",
+            "Connections kept in the pool.",
+            (f"db_pool_size{_labels(pool=name)} {pool.size()}" for name, pool in pools),
+        )
+        lines += _metric(
+            "db_pool_checked_out",
+            "gauge",
+            "Connections currently in use.",
+            (
+                f"db_pool_checked_out{_labels(pool=name)} {pool.checkedout()}"
+                for name, pool in pools
+            ),
+        )
+        lines += _metric(
+            "db_pool_overflow",
+            "gauge",
+            "Connections open beyond the pool size.",
+            (
+                f"db_pool_overflow{_labels(pool=name)} {max(pool.overflow(), 0)}"
+                for name, pool in pools
+            ),
+        )
+
+    caches = (("leaderboard", leaderboard_cache), ("response", response_cache))
+    lines += _metric(
+        "cache_hits_total",
+        "counter",
+        "Cache lookups that found an entry.",
+        (f"cache_hits_total{_labels(cache=name)} {cache.hits}" for name, cache in caches),
+    )
+    lines += _metric(
+        "cache_misses_total",
+        "counter",
+        "Cache lookups that found no usable entry.",
+        (f"cache_misses_total{_labels(cache=name)} {cache.misses}" for name, cache in caches),
+    )
+    lines += _metric(
+        "cache_hit_ratio",
+        "gauge",
+        "Share of cache lookups that hit, since startup.",
+        (
+            f"cache_hit_ratio{_labels(cache=name)} "
+            f"{cache.hits / (cache.hits + cache.misses) if cache.hits + cache.misses else 0:.4f}"
+            for name, cache in caches
+        ),
+    )
+    return "\n".join(lines) + "\n"
@@ -1,78 +1,132 @@
 """Middleware for request/response handling."""
+import random
 import time
 import uuid
 import logging
-from typing import Callable
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from typing import Optional
+from starlette.datastructures import MutableHeaders, QueryParams
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.database import query_stats, track_queries
+from app.metrics import request_metrics, route_template
 
 logger = logging.getLogger(__name__)
 
 
-class RequestIDMiddleware(BaseHTTPMiddleware):
-    """Add request ID to each request for tracing."""
+class RequestContextMiddleware:
+    """Request IDs, SQL statement counts, timing and request logging in one layer.
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        request_id = str(uuid.uuid4())
-        request.state.request_id = request_id
-        
-        # Add request ID to response headers
-        response = await call_next(request)
-        response.headers["X-Request-ID"] = request_id
-        
-        return response
-
-
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Log all requests and responses."""
+    Plain ASGI replacement for the former RequestIDMiddleware +
+    LoggingMiddleware pair (kept in ``benchmarks/middleware.py`` for
+    comparison) with the same headers and log records. Those wrap every
+    request in a task and a response stream each; this only wraps ``send``,
+    and finishes the request's bookkeeping when the response starts.
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        request_id = getattr(request.state, "request_id", "unknown")
-        start_time = time.time()
+    Only ``sample_rate`` of the requests log their start and successful
+    completion; error responses (4xx/5xx) and failures are always logged.
+    """
+    
+    def __init__(self, app: ASGIApp, sample_rate: Optional[float] = None):
+        self.app = app
+        self.sample_rate = settings.log_sample_rate if sample_rate is None else sample_rate
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        # Log request
-        logger.info(
-            "Request started",
-            extra={
-                "request_id": request_id,
-                "method": request.method,
-                "path": request.url.path,
-                "query_params": str(request.query_params),
-            },
-        )
+        request_id = str(uuid.uuid4())
+        scope.setdefault("state", {})["request_id"] = request_id
+        stats = track_queries(request_id)
+        method = scope["method"]
+        path = scope["path"]
+        start_time = time.time()
+        sampled = self.sample_rate >= 1 or random.random() < self.sample_rate
         
-        try:
-            response = await call_next(request)
-            process_time = time.time() - start_time
-            
-            # Log response
+        if sampled and logger.isEnabledFor(logging.INFO):
             logger.info(
-                "Request completed",
+                "Request started",
                 extra={
                     "request_id": request_id,
-                    "method": request.method,
-                    "path": request.url.path,
-                    "status_code": response.status_code,
-                    "process_time": round(process_time, 4),
+                    "method": method,
+                    "path": path,
+                    "query_params": str(QueryParams(scope.get("query_string", b""))),
                 },
             )
-            
-            response.headers["X-Process-Time"] = str(round(process_time, 4))
-            return response
-            
+        
+        async def send_with_context(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                process_time = round(time.time() - start_time, 4)
+                db_time = round(stats.duration, 4)
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-ID"] = request_id
+                headers["X-DB-Queries"] = str(stats.count)
+                headers["X-DB-Time"] = str(db_time)
+                headers["X-Process-Time"] = str(process_time)
+                if sampled or message["status"] >= 400:
+                    logger.info(
+                        "Request completed",
+                        extra={
+                            "request_id": request_id,
+                            "method": method,
+                            "path": path,
+                            "status_code": message["status"],
+                            "process_time": process_time,
+                            "db_queries": stats.count,
+                            "db_time": db_time,
+                        },
+                    )
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_context)
         except Exception as e:
-            process_time = time.time() - start_time
             logger.error(
                 "Request failed",
                 extra={
                     "request_id": request_id,
-                    "method": request.method,
-                    "path": request.url.path,
+                    "method": method,
+                    "path": path,
                     "error": str(e),
-                    "process_time": round(process_time, 4),
+                    "process_time": round(time.time() - start_time, 4),
                 },
                 exc_info=True,
             )
             raise
+        finally:
+            # The server may run the next request in this same context
+            query_stats.set(None)
 
+
+class MetricsMiddleware:
+    """Record request counts, latency and in-flight requests by route template.
+    
+    Plain ASGI middleware (no per-request task), so it can wrap everything.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status = 500
+        
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        request_metrics.in_flight += 1
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_metrics.in_flight -= 1
+            request_metrics.observe(
+                scope["method"], route_template(scope), status, time.perf_counter() - start_time
+            )
@@ -4,6 +4,9 @@ from typing import Optional, Any
 from datetime import datetime, timezone
 from enum import Enum
 
+from app.config import settings
+from app.security import RESERVED_USERNAMES
+
 
 class GameMode(str, Enum):
     """Game mode enumeration."""
@@ -45,6 +48,8 @@ class ScoreSubmission(BaseModel):
         # Allow alphanumeric and underscore only
         if not v.replace("_", "").isalnum():
             raise ValueError("Username must contain only alphanumeric characters and underscores")
+        if v in RESERVED_USERNAMES:
+            raise ValueError(f"Username {v} is reserved")
         return v
     
     class Config:
@@ -57,12 +62,70 @@ class ScoreSubmission(BaseModel):
         }
 
 
+class BatchScoreSubmission(BaseModel):
+    """Batch of score submissions (e.g. games queued while offline).
+    
+    Items are validated one by one by the service, so a malformed item is
+    rejected in its result instead of failing the whole batch.
+    """
+    submissions: list[dict[str, Any]] = Field(
+        ..., min_length=1, max_length=settings.batch_max_submissions
+    )
+
+
+class BatchItemResult(BaseModel):
+    """Outcome of one submission in a batch."""
+    index: int
+    status: str  # "created" or "rejected"
+    entry: Optional[LeaderboardEntry] = None
+    error: Optional[dict[str, Any]] = None
+
+
+class BatchSubmissionResponse(BaseModel):
+    """Per-item results of a batch submission, in request order."""
+    created: int
+    rejected: int
+    results: list[BatchItemResult]
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "created": 1,
+                "rejected": 1,
+                "results": [
+                    {
+                        "index": 0,
+                        "status": "created",
+                        "entry": {
+                            "id": 1,
+                            "username": "PLAYER1",
+                            "score": 250,
+                            "mode": "walls",
+                            "date": "2024-01-15T10:30:00Z",
+                        },
+                        "error": None,
+                    },
+                    {
+                        "index": 1,
+                        "status": "rejected",
+                        "entry": None,
+                        "error": {
+                            "code": "DUPLICATE_SUBMISSION",
+                            "message": "Same score submitted recently",
+                        },
+                    },
+                ],
+            }
+        }
+
+
 class PaginationMeta(BaseModel):
     """Pagination metadata."""
-    total: int
+    total: Optional[int] = None
     limit: int
     offset: int
     has_more: bool
+    next_cursor: Optional[str] = None
 
 
 class PaginatedResponse(BaseModel):
@@ -71,6 +134,28 @@ class PaginatedResponse(BaseModel):
     meta: PaginationMeta
 
 
+class PlayerRank(BaseModel):
+    """Rank of a score (or a player's best score) on the leaderboard."""
+    username: Optional[str] = None
+    score: int
+    mode: Optional[GameMode] = None
+    rank: int
+    total: int
+    percentile: float
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "username": "PLAYER1",
+                "score": 250,
+                "mode": "walls",
+                "rank": 12,
+                "total": 480,
+                "percentile": 97.71,
+            }
+        }
+
+
 class ErrorResponse(BaseModel):
     """Standardized error response model."""
     error: dict[str, Any]
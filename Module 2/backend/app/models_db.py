@@ -1,11 +1,14 @@
 """SQLAlchemy database models."""
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Enum, Index
+from sqlalchemy import (
+    Column, Integer, BigInteger, String, DateTime, Boolean, ForeignKey, Enum, Index,
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from datetime import datetime
+from datetime import datetime, timezone
 import enum
 
 from app.database import Base
+from app.db_utils import utcnow
 
 
 class GameModeEnum(str, enum.Enum):
@@ -24,6 +27,16 @@ class User(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
 
+    # Few users are inactive; lets score totals find and exclude them without a scan
+    __table_args__ = (
+        Index(
+            "idx_users_inactive",
+            "id",
+            sqlite_where=is_active == False,
+            postgresql_where=is_active == False,
+        ),
+    )
+
     # Relationship to scores
     scores = relationship("Score", back_populates="user", cascade="all, delete-orphan")
 
@@ -39,7 +52,15 @@ class Score(Base):
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     score = Column(Integer, nullable=False, index=True)
     mode = Column(Enum(GameModeEnum), nullable=False, index=True)
-    date = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    # Python-side default keeps full precision so keyset cursors can match on date
+    # exactly; the server default writes the same format for rows inserted in SQL
+    date = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        server_default=utcnow(),
+        nullable=False,
+        index=True,
+    )
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
@@ -50,6 +71,65 @@ class Score(Base):
         return f"<Score(id={self.id}, user_id={self.user_id}, score={self.score}, mode='{self.mode}')>"
 
 
+class ModeScoreCount(Base):
+    """Maintained number of scores per game mode."""
+    __tablename__ = "mode_score_counts"
+
+    mode = Column(Enum(GameModeEnum), primary_key=True)
+    score_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ModeScoreCount(mode='{self.mode}', score_count={self.score_count})>"
+
+
+class UserScoreCount(Base):
+    """Maintained number of scores per user and game mode."""
+    __tablename__ = "user_score_counts"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    mode = Column(Enum(GameModeEnum), primary_key=True)
+    score_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return (
+            f"<UserScoreCount(user_id={self.user_id}, mode='{self.mode}', "
+            f"score_count={self.score_count})>"
+        )
+
+
+class UserBest(Base):
+    """Personal best score per user and game mode."""
+    __tablename__ = "user_best"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    mode = Column(Enum(GameModeEnum), primary_key=True)
+    # Not a foreign key: partitioned scores are keyed by (id, date), and
+    # dropping a partition is followed by a rollup rebuild instead
+    score_id = Column(Integer, nullable=False)
+    score = Column(Integer, nullable=False)
+    date = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<UserBest(user_id={self.user_id}, mode='{self.mode}', score={self.score})>"
+
+
+class LeaderboardStats(Base):
+    """Single-row rollup of aggregate leaderboard statistics."""
+    __tablename__ = "leaderboard_stats"
+
+    id = Column(Integer, primary_key=True)  # Always 1
+    total_players = Column(Integer, nullable=False, default=0)
+    total_scores = Column(Integer, nullable=False, default=0)
+    score_sum = Column(BigInteger, nullable=False, default=0)
+    top_score = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return (
+            f"<LeaderboardStats(total_players={self.total_players}, "
+            f"total_scores={self.total_scores}, top_score={self.top_score})>"
+        )
+
+
 # Composite indexes for common queries
 Index(
     "idx_user_mode_score",
@@ -70,3 +150,9 @@ Index(
     Score.date.desc()
 )
 
+Index(
+    "idx_best_mode_score_date",
+    UserBest.mode,
+    UserBest.score.desc(),
+    UserBest.date.desc()
+)
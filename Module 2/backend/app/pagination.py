@@ -0,0 +1,29 @@
+"""Opaque keyset cursors for leaderboard pagination."""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from app.exceptions import ValidationError
+from app.models import LeaderboardEntry
+
+
+def encode_cursor(entry: LeaderboardEntry) -> str:
+    """Encode the sort key of the last entry on a page as an opaque cursor."""
+    payload = {"s": entry.score, "d": entry.date.isoformat(), "i": entry.id}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[int, datetime, int]:
+    """Decode a cursor into its (score, date, id) sort key.
+
+    Raises:
+        ValidationError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return int(payload["s"]), datetime.fromisoformat(payload["d"]), int(payload["i"])
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError):
+        raise ValidationError("Invalid pagination cursor", {"cursor": cursor})
@@ -0,0 +1,168 @@
+"""Time partitioning of scores.
+
+On PostgreSQL the scores table is range-partitioned by month on ``date``
+(see the ``partition_scores_by_month`` migration), so period leaderboards
+only scan recent partitions and old history is dropped a partition at a
+time. Other databases keep a single table; the same date predicates keep
+period queries on the date index, and pruning deletes rows instead.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import delete, text
+from sqlalchemy.engine import Connection
+
+from app.models_db import Score
+from app.rollups import rebuild_rollups
+
+PERIODS = ("day", "week", "all")
+PARTITION_PREFIX = "scores_p"
+DEFAULT_PARTITION = "scores_default"
+
+# pg_advisory_xact_lock key serializing partition maintenance across workers
+MAINTENANCE_LOCK_ID = 7_301_842_516
+
+
+def period_start(period: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """Start (UTC) of the current day or week; None for all time."""
+    if period == "all":
+        return None
+    now = now or datetime.now(timezone.utc)
+    start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "week":
+        start -= timedelta(days=start.weekday())
+    return start
+
+
+def period_key(period: str, now: Optional[datetime] = None) -> str:
+    """Cache key of a period; changes when a new day or week starts."""
+    start = period_start(period, now)
+    return period if start is None else f"{period}:{start.date().isoformat()}"
+
+
+def month_start(moment: datetime) -> datetime:
+    """Start (UTC) of the month containing the given time."""
+    return moment.astimezone(timezone.utc).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+
+
+def next_month(start: datetime) -> datetime:
+    """Start of the month after the given month start."""
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def partition_name(start: datetime) -> str:
+    """Name of the partition holding the month that begins at ``start``."""
+    return f"{PARTITION_PREFIX}{start:%Y%m}"
+
+
+def is_partitioned(connection: Connection) -> bool:
+    """Whether the scores table is natively partitioned."""
+    if connection.dialect.name != "postgresql":
+        return False
+    return connection.execute(
+        text(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = 'scores'"
+        )
+    ).first() is not None
+
+
+def list_partitions(connection: Connection) -> List[str]:
+    """Names of the monthly score partitions (excluding the default one)."""
+    rows = connection.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'scores'"
+        )
+    )
+    return sorted(
+        name for (name,) in rows
+        if name.startswith(PARTITION_PREFIX) and name[len(PARTITION_PREFIX):].isdigit()
+    )
+
+
+def ensure_partitions(connection: Connection, months_ahead: int = 2) -> List[str]:
+    """Create the monthly partitions from this month through ``months_ahead``.
+
+    Safe to run from several workers at once and repeatedly while they run.
+    Returns the names of the partitions created; a no-op unless partitioned.
+    """
+    if not is_partitioned(connection):
+        return []
+
+    # Held until the transaction ends, so concurrent workers take turns
+    connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MAINTENANCE_LOCK_ID})
+    existing = set(list_partitions(connection))
+    created = []
+    start = month_start(datetime.now(timezone.utc))
+    for _ in range(months_ahead + 1):
+        end = next_month(start)
+        name = partition_name(start)
+        if name not in existing:
+            create_partition(connection, name, start, end)
+            created.append(name)
+        start = end
+    return created
+
+
+def create_partition(connection: Connection, name: str, start: datetime, end: datetime) -> None:
+    """Create the partition for [start, end), taking over its rows from the default one.
+
+    A new partition cannot be created over rows the default partition holds
+    for its range, so then the partition is built as a plain table, the rows
+    are moved into it and it is attached.
+    """
+    bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    in_range = {"start": start, "end": end}
+    has_default = connection.execute(
+        text("SELECT to_regclass(:name) IS NOT NULL"), {"name": DEFAULT_PARTITION}
+    ).scalar()
+    stray = has_default and connection.execute(
+        text(
+            f"SELECT 1 FROM {DEFAULT_PARTITION} "
+            "WHERE date >= :start AND date < :end LIMIT 1"
+        ),
+        in_range,
+    ).first() is not None
+    if not stray:
+        connection.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF scores {bounds}"))
+        return
+
+    connection.execute(
+        text(f"CREATE TABLE {name} (LIKE scores INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    )
+    connection.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+            "WHERE date >= :start AND date < :end RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        in_range,
+    )
+    connection.execute(text(f"ALTER TABLE scores ATTACH PARTITION {name} {bounds}"))
+
+
+def prune_scores_before(connection: Connection, cutoff: datetime) -> List[str]:
+    """Remove scores older than ``cutoff`` and rebuild the rollups.
+
+    When partitioned, whole months ending at or before the cutoff are
+    dropped (returned by name); otherwise older rows are deleted.
+    """
+    dropped = []
+    if is_partitioned(connection):
+        for name in list_partitions(connection):
+            start = datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m").replace(
+                tzinfo=timezone.utc
+            )
+            if next_month(start) <= cutoff:
+                connection.execute(text(f"DROP TABLE {name}"))
+                dropped.append(name)
+    else:
+        connection.execute(delete(Score).where(Score.date < cutoff))
+
+    rebuild_rollups(connection)
+    return dropped
@@ -1,14 +1,41 @@
 """Rate limiting middleware."""
+import importlib.util
+import logging
+import os
+import tempfile
+
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from fastapi import Request
 from app.config import settings
+from app.metrics import request_metrics
+from app import rate_limit_storage  # noqa: F401  Registers the sqlite:// storage
+
+logger = logging.getLogger(__name__)
+
+# Local file shared by the worker processes of one host (outside the working directory)
+DEFAULT_STORAGE_PATH = os.path.join(tempfile.gettempdir(), "snake_game_rate_limits.db")
+DEFAULT_STORAGE_URI = f"sqlite:///{DEFAULT_STORAGE_PATH}"
+
+
+def get_storage_uri() -> str:
+    """Storage for rate limit counters, shared across worker processes."""
+    if settings.rate_limit_storage_uri:
+        return settings.rate_limit_storage_uri
+    if settings.redis_url:
+        if importlib.util.find_spec("redis") is not None:
+            return settings.redis_url
+        logger.warning("redis package not installed; using SQLite rate limit storage")
+    return DEFAULT_STORAGE_URI
 
-# Create limiter
+
+# Create limiter (sliding window counter: two counters per key, no per-hit state)
 limiter = Limiter(
     key_func=get_remote_address,
     default_limits=[f"{settings.rate_limit_per_minute}/minute"],
+    storage_uri=get_storage_uri(),
+    strategy="sliding-window-counter",
 )
 
 # Rate limit decorator for score submissions (uses configured rate)
@@ -18,8 +45,13 @@ score_submission_limit = limiter.limit(f"{settings.rate_limit_per_minute}/minute
 general_api_limit = limiter.limit(f"{settings.rate_limit_per_minute * 2}/minute")
 
 
+def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    """Count the rejection, then answer with slowapi's 429 response."""
+    request_metrics.rate_limited += 1
+    return _rate_limit_exceeded_handler(request, exc)
+
+
 def setup_rate_limiting(app):
     """Setup rate limiting for the FastAPI app."""
     app.state.limiter = limiter
-    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
+    app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
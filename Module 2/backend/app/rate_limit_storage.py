@@ -0,0 +1,203 @@
+"""SQLite file storage for rate limits, shared by every worker on a host."""
+import logging
+import math
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+from urllib.parse import urlparse
+
+from limits.storage import MemoryStorage, Storage, SlidingWindowCounterSupport
+
+logger = logging.getLogger(__name__)
+
+# Delete idle keys at most this often (seconds)
+EVICTION_INTERVAL = 60
+
+# slowapi calls the storage on the event loop, so waiting for another
+# process's write lock stalls every request of this worker; give up quickly
+BUSY_TIMEOUT = 0.05
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport):
+    """Rate limit storage in a local SQLite file (``sqlite:///path/to/file.db``).
+
+    Each key is a single row, whatever its traffic: the sliding window counter
+    keeps only the current window's count and the previous window's count.
+    Rows idle for longer than two windows are deleted periodically. Updates
+    run in ``BEGIN IMMEDIATE`` transactions, so processes sharing the file
+    never lose each other's hits. A hit that cannot get the write lock within
+    ``busy_timeout`` seconds is counted in this process only (a per-worker
+    limit) rather than blocking the event loop.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(
+        self,
+        uri: str,
+        wrap_exceptions: bool = False,
+        busy_timeout: float = BUSY_TIMEOUT,
+        **options,
+    ):
+        path = urlparse(uri).path[1:] or ":memory:"
+        self._connection = sqlite3.connect(
+            path, timeout=busy_timeout, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            " key TEXT PRIMARY KEY,"
+            " window_id INTEGER NOT NULL,"
+            " count INTEGER NOT NULL,"
+            " previous_count INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._next_eviction = 0.0
+        self._next_busy_warning = 0.0
+        self._busy_hits = 0
+        self._fallback = MemoryStorage()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self) -> type[Exception]:
+        return sqlite3.Error
+
+    def acquire_sliding_window_entry(
+        self, key: str, limit: int, expiry: int, amount: int = 1
+    ) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        try:
+            with self._transaction(now):
+                previous_count, current_count = self._window_counts(key, expiry, now)
+                weight = 1 - (now % expiry) / expiry
+                if math.floor(previous_count * weight + current_count) + amount > limit:
+                    return False
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO rate_limits VALUES (?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        int(now // expiry),
+                        current_count + amount,
+                        previous_count,
+                        now + 2 * expiry,
+                    ),
+                )
+                return True
+        except sqlite3.OperationalError as exc:
+            self._busy(exc, now)
+            return self._fallback.acquire_sliding_window_entry(key, limit, expiry, amount)
+
+    def get_sliding_window(self, key: str, expiry: int) -> tuple[int, float, int, float]:
+        now = time.time()
+        with self._lock:
+            previous_count, current_count = self._window_counts(key, expiry, now)
+        elapsed = now % expiry
+        previous_ttl = expiry - elapsed if previous_count else 0.0
+        return previous_count, previous_ttl, current_count, 2 * expiry - elapsed
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        self.clear(key)
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        now = time.time()
+        try:
+            with self._transaction(now):
+                row = self._connection.execute(
+                    "SELECT count FROM rate_limits WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row is None:
+                    count, expires_at = amount, now + expiry
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO rate_limits VALUES (?, 0, ?, 0, ?)",
+                        (key, count, expires_at),
+                    )
+                else:
+                    count = row[0] + amount
+                    self._connection.execute(
+                        "UPDATE rate_limits SET count = ? WHERE key = ?", (count, key)
+                    )
+                return count
+        except sqlite3.OperationalError as exc:
+            self._busy(exc, now)
+            return self._fallback.incr(key, expiry, amount)
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT count FROM rate_limits WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT expires_at FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self) -> bool:
+        try:
+            with self._lock:
+                self._connection.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int:
+        with self._lock:
+            return self._connection.execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+    def _window_counts(self, key: str, expiry: int, now: float) -> tuple[int, int]:
+        """(previous, current) window counts of a key at the given time."""
+        row = self._connection.execute(
+            "SELECT window_id, count, previous_count FROM rate_limits WHERE key = ?", (key,)
+        ).fetchone()
+        window = int(now // expiry)
+        if row is None:
+            return 0, 0
+        if row[0] == window:
+            return row[2], row[1]
+        if row[0] == window - 1:
+            return row[1], 0
+        return 0, 0
+
+    def _busy(self, exc: sqlite3.OperationalError, now: float) -> None:
+        """Log a hit moved to the in-process counters; re-raise errors other than a lock."""
+        if "locked" not in str(exc):
+            raise exc
+        self._busy_hits += 1
+        if now >= self._next_busy_warning:
+            logger.warning(
+                f"Rate limit storage busy; {self._busy_hits} hits counted by this worker only"
+            )
+            self._busy_hits = 0
+            self._next_busy_warning = now + EVICTION_INTERVAL
+
+    @contextmanager
+    def _transaction(self, now: float) -> Iterator[None]:
+        """Lock, open a write transaction and evict idle keys if due."""
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                if now >= self._next_eviction:
+                    self._connection.execute(
+                        "DELETE FROM rate_limits WHERE expires_at <= ?", (now,)
+                    )
+                    self._next_eviction = now + EVICTION_INTERVAL
+                yield
+                self._connection.execute("COMMIT")
+            finally:
+                # Also after a failed COMMIT, which leaves the transaction open
+                if self._connection.in_transaction:
+                    self._connection.execute("ROLLBACK")
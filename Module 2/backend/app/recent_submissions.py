@@ -0,0 +1,116 @@
+"""In-memory index of recent score submissions for duplicate detection.
+
+Submissions stored in a transaction are kept on the session and added to the
+index only after it commits, like the user id cache.
+"""
+import time
+from typing import Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import GameMode
+
+# (username, score, mode) of a submission
+SubmissionKey = tuple[str, int, GameMode]
+
+# session.info key of the submissions stored in the current transaction
+PENDING_KEY = "pending_submissions"
+
+
+class RecentSubmissionIndex:
+    """Time-bucketed set of the submissions stored by this process.
+
+    Keys live in buckets of ``bucket_seconds`` (with their exact time) and
+    whole buckets are dropped once older than ``retention_seconds``. The index
+    only knows this process's submissions since it started, so a miss is
+    authoritative only once ``covers`` the window; before that (e.g. right
+    after a restart) callers fall back to the database. When other processes
+    also store submissions (``exclusive=False``) a miss is never
+    authoritative: only hits are.
+    """
+
+    def __init__(
+        self,
+        retention_seconds: int = 120,
+        bucket_seconds: int = 5,
+        exclusive: bool = True,
+    ):
+        self.retention_seconds = retention_seconds
+        self.bucket_seconds = bucket_seconds
+        self.exclusive = exclusive
+        self._buckets: dict[int, dict[SubmissionKey, float]] = {}
+        self.started_at = time.monotonic()
+
+    def add(self, keys: Iterable[SubmissionKey], now: Optional[float] = None) -> None:
+        """Record stored submissions."""
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        bucket = self._buckets.setdefault(int(now // self.bucket_seconds), {})
+        for key in keys:
+            bucket[key] = now
+
+    def seen(self, key: SubmissionKey, within_seconds: float) -> bool:
+        """Whether the submission was stored within the last ``within_seconds``."""
+        now = time.monotonic()
+        cutoff = now - within_seconds
+        newest = int(now // self.bucket_seconds)
+        oldest = int(cutoff // self.bucket_seconds)
+        for bucket_id in range(newest, oldest - 1, -1):
+            stored_at = self._buckets.get(bucket_id, {}).get(key)
+            if stored_at is not None and stored_at >= cutoff:
+                return True
+        return False
+
+    def recent(self, usernames: Iterable[str], within_seconds: float) -> set[SubmissionKey]:
+        """Submissions by the given users stored within the last ``within_seconds``."""
+        usernames = set(usernames)
+        cutoff = time.monotonic() - within_seconds
+        return {
+            key
+            for bucket in self._buckets.values()
+            for key, stored_at in bucket.items()
+            if stored_at >= cutoff and key[0] in usernames
+        }
+
+    def covers(self, within_seconds: float) -> bool:
+        """Whether a miss for this window can be trusted without the database."""
+        return (
+            self.exclusive
+            and within_seconds <= self.retention_seconds
+            and time.monotonic() - self.started_at >= within_seconds
+        )
+
+    def clear(self) -> None:
+        """Forget every submission and restart the coverage window."""
+        self._buckets.clear()
+        self.started_at = time.monotonic()
+
+    def _expire(self, now: float) -> None:
+        oldest = int((now - self.retention_seconds) // self.bucket_seconds)
+        for bucket_id in [b for b in self._buckets if b < oldest]:
+            del self._buckets[bucket_id]
+
+
+# Global index shared by all requests in this process; with several worker
+# processes each sees only its own submissions
+recent_submissions = RecentSubmissionIndex(exclusive=settings.web_concurrency <= 1)
+
+
+def remember_submissions(session: AsyncSession, keys: Iterable[SubmissionKey]) -> None:
+    """Add submissions to the index once the session's transaction commits."""
+    session.info.setdefault(PENDING_KEY, []).extend(keys)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_submissions(session: Session) -> None:
+    keys = session.info.pop(PENDING_KEY, None)
+    if keys:
+        recent_submissions.add(keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_submissions(session: Session) -> None:
+    session.info.pop(PENDING_KEY, None)
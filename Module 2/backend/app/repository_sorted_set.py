@@ -0,0 +1,342 @@
+"""Sorted-set leaderboard repository implementation."""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import LeaderboardEntry, GameMode
+from app.models_db import User, Score
+from app.pagination import decode_cursor
+from app.repository_db import DatabaseLeaderboardRepository
+from app.sorted_set import InMemorySortedSetStore, create_sorted_set_store
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+ENTRIES_KEY = "leaderboard:entries"
+# Held by the process rebuilding the index; LOADED_KEY marks a fresh build to reuse
+LOAD_LOCK_KEY = "leaderboard:load-lock"
+LOADED_KEY = "leaderboard:loaded"
+LOAD_LOCK_SECONDS = 300
+LOAD_REUSE_SECONDS = 60
+STAGING_SUFFIX = ":staging"
+
+
+def zset_key(mode: Optional[GameMode]) -> str:
+    """Key of the sorted set for a mode (or all modes)."""
+    return f"leaderboard:{mode.value if mode else 'all'}"
+
+
+def make_member(date: datetime, score_id: int) -> str:
+    """Encode (date, id) so that equal scores order like the SQL leaderboard.
+
+    Redis orders equal scores by member bytes, so zero-padded microseconds
+    followed by the id give date-then-id order in reverse ranges.
+    """
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    micros = (date - EPOCH) // timedelta(microseconds=1)
+    return f"{micros:017d}:{score_id:010d}"
+
+
+def member_id(member: str) -> str:
+    """Extract the score id (as a hash field) from a member."""
+    return str(int(member.rsplit(":", 1)[1]))
+
+
+class LeaderboardIndex:
+    """Per-mode sorted sets of scores mirrored from the scores table."""
+
+    def __init__(self, store):
+        self.store = store
+        self.ready = False
+        self._tasks: set[asyncio.Task] = set()
+
+    async def add(self, entries: Iterable[LeaderboardEntry], suffix: str = "") -> None:
+        """Add scores to the index (or to its keys with the given suffix)."""
+        payloads: dict[str, str] = {}
+        zsets: dict[str, dict[str, float]] = {}
+        for entry in entries:
+            member = make_member(entry.date, entry.id)
+            payloads[str(entry.id)] = entry.model_dump_json()
+            for key in (zset_key(None), zset_key(GameMode(entry.mode))):
+                zsets.setdefault(key + suffix, {})[member] = entry.score
+
+        if not payloads:
+            return
+        # One MULTI/EXEC, so readers never see a member without its payload
+        async with self.store.pipeline(transaction=True) as pipe:
+            pipe.hset(ENTRIES_KEY + suffix, mapping=payloads)
+            for key, mapping in zsets.items():
+                pipe.zadd(key, mapping)
+            await pipe.execute()
+
+    async def top(self, mode: Optional[GameMode], offset: int, limit: int) -> List[LeaderboardEntry]:
+        """Entries ranked offset .. offset + limit - 1, highest first."""
+        members = await self.store.zrevrange(zset_key(mode), offset, offset + limit - 1)
+        return await self._load_entries(members)
+
+    async def after(
+        self,
+        mode: Optional[GameMode],
+        date: datetime,
+        score_id: int,
+        limit: int,
+    ) -> Optional[List[LeaderboardEntry]]:
+        """Entries ranked right after the given score, or None if it isn't indexed."""
+        rank = await self.store.zrevrank(zset_key(mode), make_member(date, score_id))
+        if rank is None:
+            return None
+        return await self.top(mode, rank + 1, limit)
+
+    async def count(self, mode: Optional[GameMode]) -> int:
+        """Number of indexed scores."""
+        return await self.store.zcard(zset_key(mode))
+
+    async def count_above(self, mode: Optional[GameMode], score: int) -> int:
+        """Number of indexed scores strictly higher than the given score."""
+        return await self.store.zcount(zset_key(mode), f"({score}", "+inf")
+
+    def publish(self, entries: List[LeaderboardEntry]) -> None:
+        """Add committed scores in the background (from a sync after-commit callback)."""
+        task = asyncio.get_running_loop().create_task(self.add(entries))
+        self._tasks.add(task)
+        task.add_done_callback(self._published)
+
+    def _published(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Failed to mirror scores into the index", exc_info=task.exception())
+
+    async def flush(self) -> None:
+        """Wait for scores published so far to be added."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def clear(self) -> None:
+        """Drop every indexed score."""
+        self.ready = False
+        await self.store.delete(*self._keys())
+
+    async def load(self, session: AsyncSession, chunk_size: int = 10000) -> int:
+        """Build the index from the scores table once; return the number of scores.
+
+        Workers sharing a Redis store start together: the first to take the
+        load lock builds the index into staging keys and renames them over the
+        live ones, while the others wait for it and reuse the result (as does
+        any worker starting within ``LOAD_REUSE_SECONDS``). The live keys are
+        never cleared, so nothing serves a half-built index.
+        """
+        token = uuid.uuid4().hex
+        while True:
+            if await self.store.get(LOADED_KEY) is not None:
+                self.ready = True
+                return await self.count(None)
+            if await self.store.set(LOAD_LOCK_KEY, token, ex=LOAD_LOCK_SECONDS, nx=True):
+                break
+            while await self.store.get(LOAD_LOCK_KEY) is not None:
+                await asyncio.sleep(0.1)
+
+        try:
+            loaded = await self._build(session, chunk_size)
+            await self.store.set(LOADED_KEY, token, ex=LOAD_REUSE_SECONDS)
+        finally:
+            if await self.store.get(LOAD_LOCK_KEY) == token:
+                await self.store.delete(LOAD_LOCK_KEY)
+        self.ready = True
+        return loaded
+
+    async def _build(self, session: AsyncSession, chunk_size: int) -> int:
+        await self.store.delete(*(key + STAGING_SUFFIX for key in self._keys()))
+
+        query = (
+            select(Score.id, User.username, Score.score, Score.mode, Score.date)
+            .join(User, Score.user_id == User.id)
+            .where(User.is_active == True)
+        )
+        loaded = 0
+        result = await session.stream(query)
+        async for rows in result.partitions(chunk_size):
+            await self.add(
+                (
+                    LeaderboardEntry(
+                        id=score_id,
+                        username=username,
+                        score=score,
+                        mode=mode.value,
+                        date=date,
+                    )
+                    for score_id, username, score, mode, date in rows
+                ),
+                STAGING_SUFFIX,
+            )
+            loaded += len(rows)
+
+        # Entries first, so every member of a renamed set has its payload
+        built = {ENTRIES_KEY: loaded > 0}
+        for mode in (None, *GameMode):
+            built[zset_key(mode)] = await self.store.zcard(zset_key(mode) + STAGING_SUFFIX) > 0
+        for key, has_rows in built.items():
+            if has_rows:
+                await self.store.rename(key + STAGING_SUFFIX, key)
+            else:
+                await self.store.delete(key)
+        return loaded
+
+    def _keys(self) -> List[str]:
+        return [ENTRIES_KEY, *(zset_key(mode) for mode in (None, *GameMode))]
+
+    async def _load_entries(self, members: List[str]) -> List[LeaderboardEntry]:
+        if not members:
+            return []
+        payloads = await self.store.hmget(ENTRIES_KEY, [member_id(m) for m in members])
+        return [LeaderboardEntry.model_validate_json(p) for p in payloads if p is not None]
+
+
+class SortedSetLeaderboardRepository:
+    """Leaderboard repository that answers ranked reads from sorted sets.
+
+    The database stays the source of truth: scores are written through the
+    database repository first and mirrored into the index once they commit.
+    Reads the index cannot answer (date order, user scores, stats) go to the
+    database.
+    """
+
+    def __init__(self, database: DatabaseLeaderboardRepository, index: LeaderboardIndex):
+        self.database = database
+        self.index = index
+
+    async def get_leaderboard(
+        self,
+        limit: int = 10,
+        offset: int = 0,
+        mode: Optional[GameMode] = None,
+        sort: str = "score",
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+        distinct_players: bool = False,
+        period: str = "all",
+    ) -> tuple[List[LeaderboardEntry], Optional[int]]:
+        """Get leaderboard entries, ranked by score, from the index."""
+        if sort != "score" or distinct_players or period != "all" or not self.index.ready:
+            return await self.database.get_leaderboard(
+                limit, offset, mode, sort, cursor, include_total, distinct_players, period
+            )
+
+        if cursor:
+            _score, date, score_id = decode_cursor(cursor)
+            entries = await self.index.after(mode, date, score_id, limit)
+            if entries is None:
+                return await self.database.get_leaderboard(
+                    limit, offset, mode, sort, cursor, include_total
+                )
+        else:
+            entries = await self.index.top(mode, offset, limit)
+
+        total = await self.index.count(mode) if include_total else None
+        return entries, total
+
+    async def get_user_scores(
+        self,
+        username: str,
+        limit: int = 10,
+        offset: int = 0,
+        mode: Optional[GameMode] = None,
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+    ) -> tuple[List[LeaderboardEntry], Optional[int]]:
+        """Get scores for a specific user."""
+        return await self.database.get_user_scores(
+            username, limit, offset, mode, cursor, include_total
+        )
+
+    async def get_score_rank(self, score: int, mode: Optional[GameMode] = None) -> tuple[int, int]:
+        """Get the 1-based rank of a score and the number of ranked scores."""
+        if not self.index.ready:
+            return await self.database.get_score_rank(score, mode)
+        higher = await self.index.count_above(mode, score)
+        return higher + 1, await self.index.count(mode)
+
+    async def get_user_best_score(
+        self,
+        username: str,
+        mode: Optional[GameMode] = None,
+    ) -> Optional[int]:
+        """Get a user's best score, or None if they have no scores."""
+        return await self.database.get_user_best_score(username, mode)
+
+    async def add_score(
+        self,
+        username: str,
+        score: int,
+        mode: GameMode,
+    ) -> LeaderboardEntry:
+        """Add a new score entry and mirror it into the index on commit."""
+        entry = await self.database.add_score(username, score, mode)
+        self._mirror([entry])
+        return entry
+
+    async def add_scores(
+        self,
+        submissions: List[tuple[str, int, GameMode]],
+        dates: Optional[List[datetime]] = None,
+    ) -> List[LeaderboardEntry]:
+        """Add many score entries and mirror them into the index on commit."""
+        entries = await self.database.add_scores(submissions, dates)
+        self._mirror(entries)
+        return entries
+
+    def _mirror(self, entries: List[LeaderboardEntry]) -> None:
+        # After the commit, so a rolled-back insert never leaves a phantom score
+        if self.index.ready and entries:
+            self.database.after_commit(lambda: self.index.publish(entries))
+    
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """Run a callback once the session's transaction commits (never on rollback)."""
+        self.database.after_commit(callback)
+    
+    async def get_recent_submissions(
+        self,
+        usernames: Iterable[str],
+        within_minutes: int = 1,
+    ) -> set[tuple[str, int, GameMode]]:
+        """Get the (username, score, mode) submissions made recently by these users."""
+        return await self.database.get_recent_submissions(usernames, within_minutes)
+    
+    async def check_duplicate_submission(
+        self,
+        username: str,
+        score: int,
+        mode: GameMode,
+        within_minutes: int = 1,
+    ) -> bool:
+        """Check if the same score was submitted recently."""
+        return await self.database.check_duplicate_submission(
+            username, score, mode, within_minutes
+        )
+
+    async def get_stats(self) -> dict:
+        """Get aggregate statistics."""
+        return await self.database.get_stats()
+
+
+# Global index shared by all requests in this process
+leaderboard_index = LeaderboardIndex(create_sorted_set_store())
+
+
+def sorted_set_engine_enabled() -> bool:
+    """Whether ranked reads are served from the sorted sets.
+
+    An in-process index only mirrors its own worker's commits, so with several
+    workers and no Redis the indexes would drift apart; reads stay on SQL then.
+    """
+    if settings.leaderboard_engine != "sorted_set":
+        return False
+    in_process = isinstance(leaderboard_index.store, InMemorySortedSetStore)
+    return not in_process or settings.web_concurrency <= 1
+
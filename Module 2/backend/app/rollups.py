@@ -0,0 +1,219 @@
+"""Rollups maintained incrementally from inserted users and scores.
+
+ORM inserts are picked up by the ``after_flush`` listener below. Code that
+inserts users or scores with Core statements (bulk paths) must call
+``apply_user_rollups`` / ``apply_score_rollups`` itself, in the same transaction.
+"""
+from collections import Counter
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import event, select, func, delete, insert, case
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.db_utils import upsert
+from app.models_db import (
+    User, Score, GameModeEnum, ModeScoreCount, UserScoreCount, UserBest, LeaderboardStats,
+)
+
+# Primary key of the single leaderboard_stats row
+STATS_ID = 1
+
+# (score_id, user_id, mode, score, date) of a newly inserted score row
+ScoreRow = tuple[int, int, GameModeEnum, int, datetime]
+
+
+def apply_score_rollups(connection: Connection, rows: Iterable[ScoreRow]) -> None:
+    """Update the rollups for newly inserted scores."""
+    rows = list(rows)
+    if not rows:
+        return
+
+    dialect = connection.dialect.name
+    # Rows are upserted in key order so concurrent batches lock them in the same order
+    mode_counts = sorted(Counter(mode for _, _, mode, _, _ in rows).items())
+    user_counts = sorted(Counter((user_id, mode) for _, user_id, mode, _, _ in rows).items())
+
+    mode_table = ModeScoreCount.__table__
+    connection.execute(
+        upsert(
+            dialect,
+            mode_table,
+            [{"mode": mode, "score_count": n} for mode, n in mode_counts],
+            ["mode"],
+            lambda excluded: {"score_count": mode_table.c.score_count + excluded.score_count},
+        )
+    )
+
+    user_table = UserScoreCount.__table__
+    connection.execute(
+        upsert(
+            dialect,
+            user_table,
+            [
+                {"user_id": user_id, "mode": mode, "score_count": n}
+                for (user_id, mode), n in user_counts
+            ],
+            ["user_id", "mode"],
+            lambda excluded: {"score_count": user_table.c.score_count + excluded.score_count},
+        )
+    )
+
+    stats_table = LeaderboardStats.__table__
+    connection.execute(
+        upsert(
+            dialect,
+            stats_table,
+            {
+                "id": STATS_ID,
+                "total_players": 0,
+                "total_scores": len(rows),
+                "score_sum": sum(score for _, _, _, score, _ in rows),
+                "top_score": max(score for _, _, _, score, _ in rows),
+            },
+            ["id"],
+            lambda excluded: {
+                "total_scores": stats_table.c.total_scores + excluded.total_scores,
+                "score_sum": stats_table.c.score_sum + excluded.score_sum,
+                "top_score": case(
+                    (excluded.top_score > stats_table.c.top_score, excluded.top_score),
+                    else_=stats_table.c.top_score,
+                ),
+            },
+        )
+    )
+
+    # Personal bests: keep the first score that reached each user's best
+    best: dict[tuple[int, GameModeEnum], ScoreRow] = {}
+    for row in rows:
+        score_id, user_id, mode, score, date = row
+        current = best.get((user_id, mode))
+        if current is None or score > current[3]:
+            best[(user_id, mode)] = row
+
+    best_table = UserBest.__table__
+    connection.execute(
+        upsert(
+            dialect,
+            best_table,
+            [
+                {
+                    "user_id": user_id,
+                    "mode": mode,
+                    "score_id": score_id,
+                    "score": score,
+                    "date": date,
+                }
+                for _, (score_id, user_id, mode, score, date) in sorted(best.items())
+            ],
+            ["user_id", "mode"],
+            lambda excluded: {
+                "score_id": excluded.score_id,
+                "score": excluded.score,
+                "date": excluded.date,
+            },
+            where=lambda excluded: excluded.score > best_table.c.score,
+        )
+    )
+
+
+def apply_user_rollups(connection: Connection, new_users: int) -> None:
+    """Update the rollups for newly created (active) users."""
+    if not new_users:
+        return
+
+    stats_table = LeaderboardStats.__table__
+    connection.execute(
+        upsert(
+            connection.dialect.name,
+            stats_table,
+            {
+                "id": STATS_ID,
+                "total_players": new_users,
+                "total_scores": 0,
+                "score_sum": 0,
+                "top_score": 0,
+            },
+            ["id"],
+            lambda excluded: {
+                "total_players": stats_table.c.total_players + excluded.total_players,
+            },
+        )
+    )
+
+
+def rebuild_rollups(connection: Connection) -> None:
+    """Recompute every rollup from the scores table (after bulk loads or deletes)."""
+    connection.execute(delete(ModeScoreCount))
+    connection.execute(
+        insert(ModeScoreCount).from_select(
+            ["mode", "score_count"],
+            select(Score.mode, func.count()).group_by(Score.mode),
+        )
+    )
+
+    connection.execute(delete(UserScoreCount))
+    connection.execute(
+        insert(UserScoreCount).from_select(
+            ["user_id", "mode", "score_count"],
+            select(Score.user_id, Score.mode, func.count()).group_by(Score.user_id, Score.mode),
+        )
+    )
+
+    connection.execute(delete(UserBest))
+    ranked = select(
+        Score.user_id,
+        Score.mode,
+        Score.id.label("score_id"),
+        Score.score,
+        Score.date,
+        func.row_number()
+        .over(
+            partition_by=(Score.user_id, Score.mode),
+            order_by=(Score.score.desc(), Score.date.asc(), Score.id.asc()),
+        )
+        .label("position"),
+    ).subquery()
+    connection.execute(
+        insert(UserBest).from_select(
+            ["user_id", "mode", "score_id", "score", "date"],
+            select(
+                ranked.c.user_id, ranked.c.mode, ranked.c.score_id, ranked.c.score, ranked.c.date
+            ).where(ranked.c.position == 1),
+        )
+    )
+
+    connection.execute(delete(LeaderboardStats))
+    total_players = connection.execute(
+        select(func.count(User.id)).where(User.is_active == True)
+    ).scalar()
+    total_scores, score_sum, top_score = connection.execute(
+        select(func.count(Score.id), func.sum(Score.score), func.max(Score.score))
+    ).one()
+    connection.execute(
+        insert(LeaderboardStats).values(
+            id=STATS_ID,
+            total_players=total_players or 0,
+            total_scores=total_scores or 0,
+            score_sum=score_sum or 0,
+            top_score=top_score or 0,
+        )
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_rollups_after_flush(session: Session, flush_context) -> None:
+    """Apply rollups for users and scores inserted through the ORM in this flush."""
+    new_users = sum(
+        1 for obj in session.new if isinstance(obj, User) and obj.is_active is not False
+    )
+    rows = [
+        (obj.id, obj.user_id, GameModeEnum(obj.mode), obj.score, obj.date)
+        for obj in session.new
+        if isinstance(obj, Score)
+    ]
+    if new_users:
+        apply_user_rollups(session.connection(), new_users)
+    if rows:
+        apply_score_rollups(session.connection(), rows)
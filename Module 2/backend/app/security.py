@@ -2,6 +2,9 @@
 import re
 from typing import Optional
 
+# Fixed paths under /leaderboard that would shadow GET /leaderboard/{username}
+RESERVED_USERNAMES = frozenset({"RANK", "STREAM"})
+
 
 def sanitize_username(username: str) -> str:
     """Sanitize username input."""
@@ -36,6 +39,9 @@ def validate_username(username: str) -> tuple[bool, Optional[str]]:
     if not re.match(r'^[A-Za-z0-9_]+$', username):
         return False, "Username must contain only alphanumeric characters and underscores"
     
+    if username.upper() in RESERVED_USERNAMES:
+        return False, f"Username {username.upper()} is reserved"
+    
     return True, None
 
 
@@ -1,7 +1,17 @@
 """Service layer for business logic."""
-from typing import List, Optional, Protocol
-from app.models import LeaderboardEntry, ScoreSubmission, GameMode
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Callable, Iterable, List, Optional, Protocol
+from pydantic import ValidationError as PydanticValidationError
+from app.models import (
+    LeaderboardEntry,
+    ScoreSubmission,
+    GameMode,
+    PlayerRank,
+    BatchItemResult,
+)
 from app.exceptions import (
+    APIException,
+    ValidationError,
     ScoreInvalidError,
     UsernameInvalidError,
     DuplicateSubmissionError,
@@ -9,6 +19,11 @@ from app.exceptions import (
 )
 from app.config import settings
 from app.security import validate_username, validate_score, sanitize_username
+from app.cache import LeaderboardCache
+from app.versioning import LeaderboardVersion
+
+if TYPE_CHECKING:
+    from app.write_behind import WriteBehindBuffer
 
 
 class LeaderboardRepositoryProtocol(Protocol):
@@ -20,7 +35,11 @@ class LeaderboardRepositoryProtocol(Protocol):
         offset: int,
         mode: Optional[GameMode],
         sort: str,
-    ) -> tuple[List[LeaderboardEntry], int]:
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+        distinct_players: bool = False,
+        period: str = "all",
+    ) -> tuple[List[LeaderboardEntry], Optional[int]]:
         ...
     
     async def get_user_scores(
@@ -29,7 +48,23 @@ class LeaderboardRepositoryProtocol(Protocol):
         limit: int,
         offset: int,
         mode: Optional[GameMode],
-    ) -> tuple[List[LeaderboardEntry], int]:
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+    ) -> tuple[List[LeaderboardEntry], Optional[int]]:
+        ...
+    
+    async def get_score_rank(
+        self,
+        score: int,
+        mode: Optional[GameMode],
+    ) -> tuple[int, int]:
+        ...
+    
+    async def get_user_best_score(
+        self,
+        username: str,
+        mode: Optional[GameMode],
+    ) -> Optional[int]:
         ...
     
     async def add_score(
@@ -40,6 +75,13 @@ class LeaderboardRepositoryProtocol(Protocol):
     ) -> LeaderboardEntry:
         ...
     
+    async def add_scores(
+        self,
+        submissions: List[tuple[str, int, GameMode]],
+        dates: Optional[List[datetime]] = None,
+    ) -> List[LeaderboardEntry]:
+        ...
+    
     async def check_duplicate_submission(
         self,
         username: str,
@@ -49,15 +91,34 @@ class LeaderboardRepositoryProtocol(Protocol):
     ) -> bool:
         ...
     
+    async def get_recent_submissions(
+        self,
+        usernames: Iterable[str],
+        within_minutes: int,
+    ) -> set[tuple[str, int, GameMode]]:
+        ...
+    
     async def get_stats(self) -> dict:
         ...
+    
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        ...
 
 
 class LeaderboardService:
     """Service for leaderboard operations."""
     
-    def __init__(self, repository: LeaderboardRepositoryProtocol):
+    def __init__(
+        self,
+        repository: LeaderboardRepositoryProtocol,
+        cache: Optional[LeaderboardCache] = None,
+        version: Optional[LeaderboardVersion] = None,
+        buffer: Optional["WriteBehindBuffer"] = None,
+    ):
         self.repository = repository
+        self.cache = cache
+        self.version = version
+        self.buffer = buffer
     
     async def get_leaderboard(
         self,
@@ -65,15 +126,41 @@ class LeaderboardService:
         offset: int = 0,
         mode: Optional[GameMode] = None,
         sort: str = "score",
-    ) -> tuple[List[LeaderboardEntry], int]:
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+        distinct_players: bool = False,
+        period: str = "all",
+    ) -> tuple[List[LeaderboardEntry], Optional[int]]:
         """Get leaderboard entries."""
         # Validate limit
         if limit < 1 or limit > 100:
             limit = 10
         if offset < 0:
             offset = 0
+        if distinct_players and period != "all":
+            raise ValidationError(
+                "distinct_players is only available for the all-time leaderboard",
+                {"period": period},
+            )
+        
+        # Cursor pages are deep pages; only offset pages are cached
+        if cursor or self.cache is None or not self.cache.enabled:
+            return await self.repository.get_leaderboard(
+                limit, offset, mode, sort, cursor, include_total, distinct_players, period
+            )
+        
+        key = self.cache.make_key(mode, sort, limit, offset, distinct_players, period)
+        cached = self.cache.get(key)
+        if cached is None:
+            # Cache with the total so the page can serve both kinds of request
+            entries, total = await self.repository.get_leaderboard(
+                limit, offset, mode, sort, distinct_players=distinct_players, period=period
+            )
+            self.cache.set(key, entries, total)
+        else:
+            entries, total = cached
         
-        return await self.repository.get_leaderboard(limit, offset, mode, sort)
+        return entries, total if include_total else None
     
     async def get_user_scores(
         self,
@@ -81,17 +168,53 @@ class LeaderboardService:
         limit: int = 10,
         offset: int = 0,
         mode: Optional[GameMode] = None,
-    ) -> tuple[List[LeaderboardEntry], int]:
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+    ) -> tuple[List[LeaderboardEntry], Optional[int]]:
         """Get scores for a specific user."""
         if limit < 1 or limit > 100:
             limit = 10
         if offset < 0:
             offset = 0
         
-        return await self.repository.get_user_scores(username, limit, offset, mode)
+        return await self.repository.get_user_scores(
+            username, limit, offset, mode, cursor, include_total
+        )
     
-    async def submit_score(self, submission: ScoreSubmission) -> LeaderboardEntry:
-        """Submit a new score."""
+    async def get_score_rank(
+        self,
+        score: int,
+        mode: Optional[GameMode] = None,
+        username: Optional[str] = None,
+    ) -> PlayerRank:
+        """Get the rank and percentile a score has on the leaderboard."""
+        rank, total = await self.repository.get_score_rank(score, mode)
+        # Share of ranked scores at or below this one
+        percentile = 100.0 if total == 0 else (total - rank + 1) / total * 100
+        
+        return PlayerRank(
+            username=username,
+            score=score,
+            mode=mode,
+            rank=rank,
+            total=total,
+            percentile=round(percentile, 2),
+        )
+    
+    async def get_user_rank(
+        self,
+        username: str,
+        mode: Optional[GameMode] = None,
+    ) -> Optional[PlayerRank]:
+        """Get the rank of a user's best score, or None if they have no scores."""
+        best_score = await self.repository.get_user_best_score(username, mode)
+        if best_score is None:
+            return None
+        
+        return await self.get_score_rank(best_score, mode, username=username.upper())
+    
+    def _validate_submission(self, submission: ScoreSubmission) -> str:
+        """Validate a submission; return its sanitized username."""
         # Sanitize and validate username
         username = sanitize_username(submission.username)
         is_valid, error_msg = validate_username(username)
@@ -107,15 +230,49 @@ class LeaderboardService:
         if not is_valid:
             raise ScoreInvalidError(error_msg or "Invalid score")
         
+        return username
+    
+    def _is_buffered(self, username: str, submission: ScoreSubmission) -> bool:
+        """Whether an identical submission is waiting in the write-behind buffer."""
+        return self.buffer is not None and self.buffer.is_pending(
+            username, submission.score, submission.mode
+        )
+    
+    def _record_new_scores(self, entries: List[LeaderboardEntry]) -> None:
+        """Invalidate cached pages and validators once added scores commit.
+        
+        Doing it earlier would let a concurrent read re-cache the old page
+        (or revalidate against a bumped version) before the scores are visible.
+        """
+        if entries:
+            self.repository.after_commit(lambda: self._invalidate(entries))
+    
+    def _invalidate(self, entries: List[LeaderboardEntry]) -> None:
+        if self.cache is not None:
+            for entry in entries:
+                self.cache.invalidate_for_score(GameMode(entry.mode), entry.score)
+        if self.version is not None:
+            self.version.bump()
+    
+    async def submit_score(self, submission: ScoreSubmission) -> LeaderboardEntry:
+        """Submit a new score."""
+        username = self._validate_submission(submission)
+        
         # Check for duplicate submission
-        is_duplicate = await self.repository.check_duplicate_submission(
-            username, submission.score, submission.mode, within_minutes=1
+        is_duplicate = self._is_buffered(username, submission) or (
+            await self.repository.check_duplicate_submission(
+                username, submission.score, submission.mode, within_minutes=1
+            )
         )
         if is_duplicate:
             raise DuplicateSubmissionError(
                 "Same score submitted recently. Please wait before submitting again."
             )
         
+        # Write-behind: acknowledge once journaled; stored in the background
+        if self.buffer is not None:
+            return await self.buffer.submit(username, submission.score, submission.mode)
+        
         # Save to repository (repository handles entry creation)
         saved_entry = await self.repository.add_score(
             username=username,
@@ -123,15 +280,108 @@ class LeaderboardService:
             mode=submission.mode,
         )
         
+        self._record_new_scores([saved_entry])
+        
         return saved_entry
     
+    async def submit_scores(
+        self,
+        submissions: List[ScoreSubmission | dict[str, Any]],
+    ) -> List[BatchItemResult]:
+        """Submit a batch of scores; return one result per submission, in order.
+        
+        Submissions may be raw dicts, validated here one by one. Malformed,
+        invalid and duplicate submissions are rejected individually (a repeat
+        within the batch counts as a duplicate); the rest are stored together.
+        """
+        if len(submissions) > settings.batch_max_submissions:
+            raise ValidationError(
+                f"A batch may contain at most {settings.batch_max_submissions} submissions",
+                {"max_submissions": settings.batch_max_submissions},
+            )
+        
+        results: List[Optional[BatchItemResult]] = [None] * len(submissions)
+        valid: List[tuple[int, str, ScoreSubmission]] = []
+        for index, item in enumerate(submissions):
+            try:
+                submission = _parse_submission(item)
+                valid.append((index, self._validate_submission(submission), submission))
+            except APIException as exc:
+                results[index] = _rejected(index, exc)
+        
+        # One duplicate lookup for every user in the batch
+        seen = await self.repository.get_recent_submissions(
+            {username for _, username, _ in valid}, within_minutes=1
+        )
+        accepted: List[tuple[int, str, ScoreSubmission]] = []
+        for index, username, submission in valid:
+            key = (username, submission.score, submission.mode)
+            if key in seen or self._is_buffered(username, submission):
+                results[index] = _rejected(
+                    index,
+                    DuplicateSubmissionError(
+                        "Same score submitted recently. Please wait before submitting again."
+                    ),
+                )
+                continue
+            seen.add(key)
+            accepted.append((index, username, submission))
+        
+        entries = await self.store_scores(
+            [(username, submission.score, submission.mode) for _, username, submission in accepted]
+        )
+        for (index, _, _), entry in zip(accepted, entries):
+            results[index] = BatchItemResult(index=index, status="created", entry=entry)
+        
+        return results
+    
+    async def store_scores(
+        self,
+        submissions: List[tuple[str, int, GameMode]],
+        dates: Optional[List[datetime]] = None,
+    ) -> List[LeaderboardEntry]:
+        """Store already validated (username, score, mode) submissions."""
+        entries = await self.repository.add_scores(submissions, dates)
+        self._record_new_scores(entries)
+        return entries
+    
     async def get_stats(self) -> dict:
         """Get aggregate statistics."""
         return await self.repository.get_stats()
 
 
+def _parse_submission(item: ScoreSubmission | dict[str, Any]) -> ScoreSubmission:
+    """Build a submission from a batch item, raising ValidationError if malformed."""
+    if isinstance(item, ScoreSubmission):
+        return item
+    try:
+        return ScoreSubmission.model_validate(item)
+    except PydanticValidationError as exc:
+        errors = exc.errors(include_url=False, include_context=False, include_input=False)
+        first = errors[0]
+        field = ".".join(str(part) for part in first["loc"])
+        raise ValidationError(
+            f"{field}: {first['msg']}" if field else first["msg"],
+            {"validation_errors": errors},
+        )
+
+
+def _rejected(index: int, exc: APIException) -> BatchItemResult:
+    """Build the batch result for a rejected submission."""
+    return BatchItemResult(
+        index=index,
+        status="rejected",
+        error={"code": exc.code, "message": exc.message},
+    )
+
+
 # Service factory function (will be used with dependency injection)
-def create_leaderboard_service(repository: LeaderboardRepositoryProtocol) -> LeaderboardService:
-    """Create a leaderboard service with the given repository."""
-    return LeaderboardService(repository)
+def create_leaderboard_service(
+    repository: LeaderboardRepositoryProtocol,
+    cache: Optional[LeaderboardCache] = None,
+    version: Optional[LeaderboardVersion] = None,
+    buffer: Optional["WriteBehindBuffer"] = None,
+) -> LeaderboardService:
+    """Create a leaderboard service with the given repository and optional helpers."""
+    return LeaderboardService(repository, cache, version, buffer)
 
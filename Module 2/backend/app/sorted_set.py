@@ -0,0 +1,237 @@
+"""Sorted-set storage with Redis ZSET semantics.
+
+``InMemorySortedSetStore`` implements the subset of the redis.asyncio client
+API used by the sorted-set leaderboard engine, so the engine runs unchanged
+against a real Redis server or inside a single process without one.
+"""
+import logging
+import time
+from bisect import bisect_left, bisect_right, insort
+from typing import Iterable, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SortedSet:
+    """Set of members ordered by (score, member), like a Redis ZSET.
+
+    Lookups, ranks and range starts are binary searches (O(log n)). Inserts
+    shift a contiguous array, which stays cheaper than a pure-Python tree or
+    skip list at leaderboard sizes.
+    """
+
+    def __init__(self):
+        self._scores: dict[str, float] = {}
+        self._items: list[tuple[float, str]] = []
+
+    def add(self, member: str, score: float) -> None:
+        """Add a member or update its score."""
+        old = self._scores.get(member)
+        if old is not None:
+            if old == score:
+                return
+            del self._items[bisect_left(self._items, (old, member))]
+        insort(self._items, (score, member))
+        self._scores[member] = score
+
+    def update(self, mapping: dict[str, float]) -> None:
+        """Add many members, re-sorting once when that is cheaper."""
+        if len(mapping) < 64:
+            for member, score in mapping.items():
+                self.add(member, score)
+            return
+        self._scores.update(mapping)
+        self._items = sorted((score, member) for member, score in self._scores.items())
+
+    def remove(self, member: str) -> bool:
+        """Remove a member; return whether it was present."""
+        score = self._scores.pop(member, None)
+        if score is None:
+            return False
+        del self._items[bisect_left(self._items, (score, member))]
+        return True
+
+    def score(self, member: str) -> Optional[float]:
+        return self._scores.get(member)
+
+    def rev_rank(self, member: str) -> Optional[int]:
+        """0-based rank from the highest (score, member), or None."""
+        score = self._scores.get(member)
+        if score is None:
+            return None
+        return len(self._items) - 1 - bisect_left(self._items, (score, member))
+
+    def rev_range(self, start: int, stop: int) -> list[str]:
+        """Members from rank start to stop inclusive, highest first."""
+        size = len(self._items)
+        if start < 0:
+            start += size
+        if stop < 0:
+            stop += size
+        start, stop = max(start, 0), min(stop, size - 1)
+        if start > stop:
+            return []
+        return [self._items[i][1] for i in range(size - 1 - start, size - 2 - stop, -1)]
+
+    def count(self, min_score: float, max_score: float, min_open: bool, max_open: bool) -> int:
+        """Number of members with a score within the bounds."""
+        score_of = lambda item: item[0]  # noqa: E731
+        if min_open:
+            low = bisect_right(self._items, min_score, key=score_of)
+        else:
+            low = bisect_left(self._items, min_score, key=score_of)
+        if max_open:
+            high = bisect_left(self._items, max_score, key=score_of)
+        else:
+            high = bisect_right(self._items, max_score, key=score_of)
+        return max(high - low, 0)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+def _parse_bound(bound: float | str) -> tuple[float, bool]:
+    """Parse a Redis score bound such as ``5``, ``(5``, ``-inf`` or ``+inf``."""
+    if isinstance(bound, str) and bound.startswith("("):
+        return float(bound[1:]), True
+    return float(bound), False
+
+
+class InMemoryPipeline:
+    """Queue of store commands run together, like a Redis MULTI/EXEC pipeline.
+
+    The in-process commands never yield to the event loop, so the queue runs
+    without interleaving with other tasks.
+    """
+
+    def __init__(self, store: "InMemorySortedSetStore"):
+        self._store = store
+        self._commands: list[tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        getattr(self._store, name)  # Unknown commands fail when queued
+
+        def queue(*args, **kwargs) -> "InMemoryPipeline":
+            self._commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self) -> list:
+        commands, self._commands = self._commands, []
+        return [
+            await getattr(self._store, name)(*args, **kwargs) for name, args, kwargs in commands
+        ]
+
+    async def __aenter__(self) -> "InMemoryPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._commands = []
+
+
+class InMemorySortedSetStore:
+    """In-process stand-in for the Redis sorted-set and hash commands we use."""
+
+    def __init__(self):
+        self._zsets: dict[str, SortedSet] = {}
+        self._hashes: dict[str, dict[str, str]] = {}
+        self._strings: dict[str, tuple[str, Optional[float]]] = {}
+
+    async def zadd(self, name: str, mapping: dict[str, float]) -> int:
+        zset = self._zsets.setdefault(name, SortedSet())
+        before = len(zset)
+        zset.update(mapping)
+        return len(zset) - before
+
+    async def zrem(self, name: str, *members: str) -> int:
+        zset = self._zsets.get(name)
+        if zset is None:
+            return 0
+        return sum(zset.remove(member) for member in members)
+
+    async def zrevrange(self, name: str, start: int, end: int) -> list[str]:
+        zset = self._zsets.get(name)
+        return zset.rev_range(start, end) if zset else []
+
+    async def zrevrank(self, name: str, value: str) -> Optional[int]:
+        zset = self._zsets.get(name)
+        return zset.rev_rank(value) if zset else None
+
+    async def zscore(self, name: str, value: str) -> Optional[float]:
+        zset = self._zsets.get(name)
+        return zset.score(value) if zset else None
+
+    async def zcard(self, name: str) -> int:
+        zset = self._zsets.get(name)
+        return len(zset) if zset else 0
+
+    async def zcount(self, name: str, min: float | str, max: float | str) -> int:
+        zset = self._zsets.get(name)
+        if zset is None:
+            return 0
+        min_score, min_open = _parse_bound(min)
+        max_score, max_open = _parse_bound(max)
+        return zset.count(min_score, max_score, min_open, max_open)
+
+    async def hset(self, name: str, mapping: dict[str, str]) -> int:
+        fields = self._hashes.setdefault(name, {})
+        added = len(mapping.keys() - fields.keys())
+        fields.update(mapping)
+        return added
+
+    async def hmget(self, name: str, keys: Iterable[str]) -> list[Optional[str]]:
+        fields = self._hashes.get(name, {})
+        return [fields.get(key) for key in keys]
+
+    async def get(self, name: str) -> Optional[str]:
+        value, expires_at = self._strings.get(name, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._strings[name]
+            return None
+        return value
+
+    async def set(
+        self,
+        name: str,
+        value: str,
+        ex: Optional[float] = None,
+        nx: bool = False,
+    ) -> Optional[bool]:
+        if nx and await self.get(name) is not None:
+            return None
+        self._strings[name] = (value, time.monotonic() + ex if ex else None)
+        return True
+
+    async def rename(self, src: str, dst: str) -> bool:
+        for keys in (self._zsets, self._hashes, self._strings):
+            if src in keys:
+                for other in (self._zsets, self._hashes, self._strings):
+                    other.pop(dst, None)
+                keys[dst] = keys.pop(src)
+                return True
+        raise KeyError(f"no such key: {src}")
+
+    def pipeline(self, transaction: bool = True) -> InMemoryPipeline:
+        return InMemoryPipeline(self)
+
+    async def delete(self, *names: str) -> int:
+        deleted = 0
+        for name in names:
+            deleted += (self._zsets.pop(name, None) is not None)
+            deleted += (self._hashes.pop(name, None) is not None)
+            deleted += (self._strings.pop(name, None) is not None)
+        return deleted
+
+
+def create_sorted_set_store():
+    """Create a Redis client when redis_url is set, else the in-process store."""
+    if settings.redis_url:
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            logger.warning("redis package not installed; using in-process sorted sets")
+        else:
+            return redis.from_url(settings.redis_url, decode_responses=True)
+    return InMemorySortedSetStore()
@@ -0,0 +1,76 @@
+"""Process-wide cache of username -> user id.
+
+Ids found or created in a transaction are kept on the session and published
+to the cache only after it commits, so a rolled-back insert never leaves a
+dangling id behind.
+"""
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+# session.info key of the ids seen in the current transaction
+PENDING_KEY = "pending_user_ids"
+
+
+class UserIdCache:
+    """Bounded LRU map of (normalized) username to user id."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, int] = OrderedDict()
+
+    def get(self, username: str) -> Optional[int]:
+        """Return the cached id, or None."""
+        user_id = self._entries.get(username)
+        if user_id is not None:
+            self._entries.move_to_end(username)
+        return user_id
+
+    def set(self, username: str, user_id: int) -> None:
+        """Cache an id, evicting the least recently used entries if full."""
+        if self.max_entries <= 0:
+            return
+        self._entries[username] = user_id
+        self._entries.move_to_end(username)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every cached id."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Global cache shared by all requests in this process
+user_id_cache = UserIdCache(max_entries=settings.user_cache_max_entries)
+
+
+def lookup_user_id(session: AsyncSession, username: str) -> Optional[int]:
+    """Id seen earlier in this transaction or cached from a committed one."""
+    pending = session.info.get(PENDING_KEY)
+    if pending and username in pending:
+        return pending[username]
+    return user_id_cache.get(username)
+
+
+def remember_user_id(session: AsyncSession, username: str, user_id: int) -> None:
+    """Cache an id once the session's transaction commits."""
+    session.info.setdefault(PENDING_KEY, {})[username] = user_id
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_user_ids(session: Session) -> None:
+    for username, user_id in session.info.pop(PENDING_KEY, {}).items():
+        user_id_cache.set(username, user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_user_ids(session: Session) -> None:
+    session.info.pop(PENDING_KEY, None)
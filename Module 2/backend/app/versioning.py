@@ -0,0 +1,83 @@
+"""Leaderboard version tracking for conditional GET (ETag / Last-Modified)."""
+import time
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Mapping
+
+from app.config import settings
+
+# Validators roll over at least this often, even with caching disabled
+# (cache_ttl_seconds=0); Last-Modified has one-second resolution anyway
+MIN_WINDOW_SECONDS = 1
+
+
+class LeaderboardVersion:
+    """Monotonic counter of leaderboard changes made by this process.
+
+    Other worker processes cannot bump this counter, so the validators also
+    roll over every ``window_seconds`` (``cache_ttl_seconds``, at least
+    ``MIN_WINDOW_SECONDS``). A client therefore sees another worker's writes
+    no later than that worker's cached pages expire. A window of 0 never
+    rolls over.
+    """
+
+    def __init__(self, window_seconds: int):
+        self.window_seconds = window_seconds
+        self.value = 0
+        self.modified_at = time.time()
+        # Distinguishes counters of different processes and restarts
+        self._instance = uuid.uuid4().hex[:8]
+
+    def bump(self) -> None:
+        """Record a leaderboard change."""
+        self.value += 1
+        self.modified_at = time.time()
+
+    def validators(self) -> tuple[str, float]:
+        """Return the current (ETag, last-modified timestamp)."""
+        modified_at = self.modified_at
+        window = 0
+        if self.window_seconds > 0:
+            window = int(time.time() // self.window_seconds)
+            modified_at = max(modified_at, window * self.window_seconds)
+        return f'W/"{self._instance}-{self.value}-{window}"', modified_at
+
+    def headers(self) -> dict[str, str]:
+        """Validator headers for a response at the current version."""
+        etag, modified_at = self.validators()
+        return {
+            "ETag": etag,
+            "Last-Modified": formatdate(modified_at, usegmt=True),
+            "Cache-Control": "no-cache",
+        }
+
+    def is_not_modified(self, request_headers: Mapping[str, str]) -> bool:
+        """Whether the request's conditional headers match the current version."""
+        etag, modified_at = self.validators()
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            # Weak comparison: ignore W/ prefixes
+            candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return "*" in candidates or etag.removeprefix("W/") in candidates
+
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            # Last-Modified drops the fraction, so a change later in the same
+            # second must not match it: only a change exactly on the second can
+            return modified_at <= since
+
+        return False
+
+
+def create_leaderboard_version() -> LeaderboardVersion:
+    """Create a version counter whose window follows the cache TTL."""
+    return LeaderboardVersion(window_seconds=max(settings.cache_ttl_seconds, MIN_WINDOW_SECONDS))
+
+
+# Global version counter for this process
+leaderboard_version = create_leaderboard_version()
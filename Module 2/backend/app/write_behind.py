@@ -0,0 +1,416 @@
+"""Write-behind buffering of score submissions.
+
+Accepted submissions are appended to a local journal and acknowledged right
+away; a background task stores them in batched transactions. Records are
+replayed from the journal on startup, so storage is at-least-once: a crash
+between a batch's commit and its ack record stores that batch twice.
+Records that fail every storage attempt are set aside in a rejected file.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+from collections import Counter
+from contextlib import suppress
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Callable, Iterable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.exceptions import ServiceUnavailableError
+from app.models import LeaderboardEntry, GameMode
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+if TYPE_CHECKING:
+    from app.services import LeaderboardService
+
+logger = logging.getLogger(__name__)
+
+# (username, score, mode) of a submission, as used for duplicate checks
+SubmissionKey = tuple[str, int, GameMode]
+
+
+class SubmissionJournal:
+    """Append-only JSON-lines journal of submissions not yet stored.
+
+    Each submission is an ``add`` record with a sequence number; once its
+    batch is committed, an ``ack`` record lists the stored numbers. The file
+    is truncated whenever nothing is pending and rewritten with only the
+    pending records when it grows past ``compact_bytes``.
+
+    Every worker process journals to its own ``<path>.<pid>`` file and holds
+    an exclusive lock on ``<that file>.lock`` while it runs. On open, journals
+    whose lock is free were left by processes that are gone: their pending
+    records are adopted (exactly once, under that lock) and the files removed.
+    Records that can't be stored are moved aside to ``<path>.rejected``.
+    """
+
+    def __init__(self, path: str, fsync: bool = True, compact_bytes: int = 1 << 20):
+        self.base_path = path
+        self.path = path
+        self.fsync = fsync
+        self.compact_bytes = compact_bytes
+        self._lock = threading.Lock()
+        self._pending: dict[int, dict] = {}
+        self._next_seq = 1
+        self._file = None
+        self._lock_file = None
+
+    def open(self) -> List[dict]:
+        """Open this process's journal; return the records never acknowledged, oldest first.
+
+        Includes the pending records of journals left behind by other processes.
+        """
+        directory = os.path.dirname(self.base_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = f"{self.base_path}.{os.getpid()}"
+        self._lock_file = _lock_journal(self.path, blocking=True)
+
+        pending = {record["seq"]: record for record in _read_pending(self.path)}
+        records = []
+        adopted = []
+        for orphan in self._orphans():
+            lock_file = _lock_journal(orphan, blocking=False)
+            if lock_file is None:
+                continue  # Its process is still running
+            if os.path.exists(orphan):
+                records.extend(_read_pending(orphan))
+                adopted.append((orphan, lock_file))
+            else:
+                # Adopted by another process meanwhile; drop the lock file we recreated
+                with suppress(FileNotFoundError):
+                    os.remove(f"{orphan}.lock")
+                lock_file.close()
+
+        with self._lock:
+            # Renumber adopted records into this journal's sequence, durably
+            first_seq = max(pending, default=0) + 1
+            for seq, record in enumerate(records, start=first_seq):
+                pending[seq] = {**record, "seq": seq}
+            self._pending = pending
+            self._next_seq = max(pending, default=0) + 1
+            self._rewrite()
+
+        for orphan, lock_file in adopted:
+            logger.info("Adopted write-behind journal", extra={"path": orphan})
+            os.remove(orphan)
+            os.remove(f"{orphan}.lock")
+            lock_file.close()
+        return [self._pending[seq] for seq in sorted(self._pending)]
+
+    def append(self, username: str, score: int, mode: GameMode, date: datetime) -> dict:
+        """Durably record a submission; return its journal record."""
+        with self._lock:
+            record = {
+                "op": "add",
+                "seq": self._next_seq,
+                "username": username,
+                "score": score,
+                "mode": mode.value,
+                "date": date.isoformat(),
+            }
+            self._next_seq += 1
+            self._write([record])
+            self._pending[record["seq"]] = record
+        return record
+
+    def ack(self, seqs: Iterable[int]) -> None:
+        """Record that the given submissions are stored."""
+        seqs = list(seqs)
+        with self._lock:
+            for seq in seqs:
+                self._pending.pop(seq, None)
+            if not self._pending:
+                self._file.truncate(0)
+                self._sync()
+            elif self._file.tell() > self.compact_bytes:
+                self._rewrite()
+            else:
+                self._write([{"op": "ack", "seqs": seqs}])
+
+    def reject(self, records: List[dict], error: str) -> None:
+        """Move records that can't be stored aside, then acknowledge them."""
+        lines = "".join(
+            json.dumps({**record, "error": error}, separators=(",", ":")) + "\n"
+            for record in records
+        )
+        with open(f"{self.base_path}.rejected", "a", encoding="utf-8") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)  # Shared by every worker
+            f.write(lines)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self.ack(record["seq"] for record in records)
+
+    def close(self) -> None:
+        """Close the journal file, removing it if nothing is pending."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                if not self._pending:
+                    os.remove(self.path)
+                    os.remove(f"{self.path}.lock")
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    def _orphans(self) -> List[str]:
+        """Journals of other processes (and the pre-per-process journal)."""
+        directory = os.path.dirname(self.base_path) or "."
+        name = re.compile(re.escape(os.path.basename(self.base_path)) + r"(\.\d+)?")
+        return sorted(
+            os.path.join(directory, entry)
+            for entry in os.listdir(directory)
+            if name.fullmatch(entry) and os.path.join(directory, entry) != self.path
+        )
+
+    def _write(self, records: List[dict]) -> None:
+        self._file.write("".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records))
+        self._sync()
+
+    def _sync(self) -> None:
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def _rewrite(self) -> None:
+        """Replace the file with one holding only the pending records."""
+        if self._file is not None:
+            self._file.close()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for seq in sorted(self._pending):
+                f.write(json.dumps(self._pending[seq], separators=(",", ":")) + "\n")
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+
+def _read_pending(path: str) -> List[dict]:
+    """The ``add`` records of a journal file without an ``ack``, oldest first."""
+    pending: dict[int, dict] = {}
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Torn last line from a crash mid-write
+                continue
+            if record["op"] == "add":
+                pending[record["seq"]] = record
+            elif record["op"] == "ack":
+                for seq in record["seqs"]:
+                    pending.pop(seq, None)
+    return [pending[seq] for seq in sorted(pending)]
+
+
+def _lock_journal(path: str, blocking: bool):
+    """Take the exclusive lock of a journal; None if another process holds it."""
+    lock_file = open(f"{path}.lock", "a")
+    if fcntl is None:
+        return lock_file  # No advisory locks on this platform: single process only
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+class WriteBehindBuffer:
+    """Bounded queue of journaled submissions, stored by a background task."""
+
+    def __init__(
+        self,
+        journal: SubmissionJournal,
+        session_factory: async_sessionmaker,
+        queue_size: int,
+        batch_size: int,
+        flush_interval: float,
+        max_attempts: int = 5,
+    ):
+        self.journal = journal
+        self.session_factory = session_factory
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._service_factory: Optional[Callable[[AsyncSession], "LeaderboardService"]] = None
+        self._pending_keys: Counter[SubmissionKey] = Counter()
+        self._reserved = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def is_pending(self, username: str, score: int, mode: GameMode) -> bool:
+        """Whether an identical submission is queued but not yet stored."""
+        return self._pending_keys[(username, score, mode)] > 0
+
+    async def start(self, service_factory: Callable[[AsyncSession], "LeaderboardService"]) -> int:
+        """Replay unacknowledged submissions and start flushing; return the replay count."""
+        self._service_factory = service_factory
+        self._queue = asyncio.Queue()
+        pending = await asyncio.to_thread(self.journal.open)
+        for record in pending:
+            self._enqueue(record)
+        self._task = asyncio.create_task(self._run())
+        return len(pending)
+
+    async def submit(self, username: str, score: int, mode: GameMode) -> LeaderboardEntry:
+        """Journal a validated submission and queue it for storage."""
+        if not self.running:
+            raise ServiceUnavailableError("Score submissions are not being accepted right now")
+        if self._queue.qsize() + self._reserved >= self.queue_size:
+            raise ServiceUnavailableError("Too many pending submissions. Please retry shortly.")
+
+        # Reserve the queue slot while the journal write runs
+        self._reserved += 1
+        try:
+            date = datetime.now(timezone.utc)
+            record = await asyncio.to_thread(self.journal.append, username, score, mode, date)
+        finally:
+            self._reserved -= 1
+        self._enqueue(record)
+
+        return LeaderboardEntry(username=username, score=score, mode=mode, date=date)
+
+    async def drain(self) -> None:
+        """Wait until every queued submission is stored."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Store what is queued (within the timeout), then stop the flush task."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self.drain(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Stopping with unstored submissions; they will be replayed on startup",
+                extra={"pending": self._queue.qsize()},
+            )
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.journal.close()
+
+    def _enqueue(self, record: dict) -> None:
+        self._pending_keys[_record_key(record)] += 1
+        self._queue.put_nowait(record)
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            # Let a burst accumulate so it is stored in one transaction
+            await asyncio.sleep(self.flush_interval)
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                await self._flush(batch)
+            except Exception:
+                # E.g. the journal can't be written; its records are replayed on startup
+                logger.exception(
+                    "Failed to flush buffered submissions",
+                    extra={"batch_size": len(batch)},
+                )
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: List[dict]) -> None:
+        """Store a batch, retrying with backoff a bounded number of times.
+
+        A batch that keeps failing is stored record by record, so one bad
+        record can't hold back the rest; records that still fail are moved
+        aside to the rejected file.
+        """
+        try:
+            error = await self._store(batch, self.max_attempts)
+            if error is None:
+                await asyncio.to_thread(self.journal.ack, [record["seq"] for record in batch])
+            else:
+                for record in batch:
+                    if len(batch) > 1:
+                        error = await self._store([record], self.max_attempts)
+                    if error is None:
+                        await asyncio.to_thread(self.journal.ack, [record["seq"]])
+                    else:
+                        logger.error(
+                            "Giving up on a buffered submission; moved to the rejected file",
+                            extra={"username": record["username"], "error": error},
+                        )
+                        await asyncio.to_thread(self.journal.reject, [record], error)
+        finally:
+            for record in batch:
+                key = _record_key(record)
+                self._pending_keys[key] -= 1
+                if self._pending_keys[key] <= 0:
+                    del self._pending_keys[key]
+
+    async def _store(self, batch: List[dict], attempts: int) -> Optional[str]:
+        """Store records in one transaction; return the last error if every attempt failed."""
+        delay = 0.5
+        error = None
+        for attempt in range(1, attempts + 1):
+            try:
+                async with self.session_factory() as session:
+                    service = self._service_factory(session)
+                    await service.store_scores(
+                        [_record_key(record) for record in batch],
+                        dates=[datetime.fromisoformat(record["date"]) for record in batch],
+                    )
+                    await session.commit()
+                return None
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                logger.exception(
+                    "Failed to store buffered submissions",
+                    extra={"batch_size": len(batch), "attempt": attempt},
+                )
+                if attempt < attempts:
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 30.0)
+        return error
+
+
+def _record_key(record: dict) -> SubmissionKey:
+    return record["username"], record["score"], GameMode(record["mode"])
+
+
+def create_write_behind_buffer(session_factory: async_sessionmaker) -> WriteBehindBuffer:
+    """Create a buffer configured from settings."""
+    return WriteBehindBuffer(
+        SubmissionJournal(settings.write_behind_journal_path, fsync=settings.write_behind_fsync),
+        session_factory,
+        queue_size=settings.write_behind_queue_size,
+        batch_size=settings.write_behind_batch_size,
+        flush_interval=settings.write_behind_flush_interval_ms / 1000,
+        max_attempts=settings.write_behind_max_attempts,
+    )
+
+
+# Global buffer; started in the app lifespan when write_behind_enabled is set
+write_behind_buffer = create_write_behind_buffer(AsyncSessionLocal)
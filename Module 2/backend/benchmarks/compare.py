@@ -0,0 +1,69 @@
+"""Compare benchmark results against a baseline.
+
+    python -m benchmarks.compare current.json baseline.json --max-regression 0.10
+
+A scenario regresses when its p50, p95 or p99 latency grows, or its
+throughput drops, by more than the allowed fraction of the baseline. The exit
+status is 1 if any scenario regressed.
+"""
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+LATENCY_METRICS = ("p50", "p95", "p99")
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> List[str]:
+    """Print a comparison table and return a description of every regression."""
+    regressions = []
+    print(f"{'scenario':<28} {'metric':<12} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            print(f"{name:<28} (not in baseline)")
+            continue
+
+        rows = [
+            (f"{metric} ms", before["latency_ms"][metric], result["latency_ms"][metric], True)
+            for metric in LATENCY_METRICS
+        ]
+        rows.append(("req/s", before["throughput_rps"], result["throughput_rps"], False))
+        for metric, old, new, lower_is_better in rows:
+            change = (new - old) / old if old else 0.0
+            worse = change > max_regression if lower_is_better else -change > max_regression
+            flag = "  REGRESSION" if worse else ""
+            print(f"{name:<28} {metric:<12} {old:>10.2f} {new:>10.2f} {change:>+8.1%}{flag}")
+            if worse:
+                regressions.append(f"{name}: {metric} {old:.2f} -> {new:.2f} ({change:+.1%})")
+    return regressions
+
+
+def compare_files(current: dict, baseline_path: str, max_regression: float) -> List[str]:
+    """Compare results against a baseline file and report the regressions."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, max_regression)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {max_regression:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+    else:
+        print(f"\nNo regressions beyond {max_regression:.0%}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare benchmark results against a baseline")
+    parser.add_argument("current", help="Results of the run under test")
+    parser.add_argument("baseline", help="Results to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    return 1 if compare_files(current, args.baseline, args.max_regression) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
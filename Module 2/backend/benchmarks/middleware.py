@@ -0,0 +1,211 @@
+"""Per-request overhead of the request middleware stacks.
+
+    python -m benchmarks.middleware --requests 20000 [--log]
+
+Calls each stack directly with a trivial endpoint (no server, no HTTP client)
+and reports the time per request, and the overhead over the bare endpoint, of:
+
+- ``base-http``: RequestIDMiddleware + LoggingMiddleware, the BaseHTTPMiddleware
+  pair the app used before (kept here as the baseline)
+- ``asgi``: RequestContextMiddleware (plain ASGI, one ``send`` wrapper)
+
+Request logs are dropped unless ``--log`` writes them, JSON-formatted, to
+the null device.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from fastapi import Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.database import query_stats, track_queries
+
+# Same logger as the app's middleware, so both stacks write alike
+logger = logging.getLogger("app.middleware")
+
+SCOPE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "path": "/api/v1/leaderboard",
+    "raw_path": b"/api/v1/leaderboard",
+    "root_path": "",
+    "query_string": b"limit=10&mode=walls",
+    "headers": [(b"host", b"bench"), (b"accept", b"application/json")],
+    "client": ("127.0.0.1", 50000),
+    "server": ("bench", 80),
+}
+
+
+class RequestIDMiddleware(BaseHTTPMiddleware):
+    """Add request ID to each request for tracing, and count its SQL statements."""
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        request_id = str(uuid.uuid4())
+        request.state.request_id = request_id
+        stats = track_queries(request_id)
+
+        # Add request ID and database cost to response headers
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        response.headers["X-DB-Queries"] = str(stats.count)
+        response.headers["X-DB-Time"] = str(round(stats.duration, 4))
+
+        return response
+
+
+class LoggingMiddleware(BaseHTTPMiddleware):
+    """Log all requests and responses."""
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        request_id = getattr(request.state, "request_id", "unknown")
+        start_time = time.time()
+
+        # Log request
+        logger.info(
+            "Request started",
+            extra={
+                "request_id": request_id,
+                "method": request.method,
+                "path": request.url.path,
+                "query_params": str(request.query_params),
+            },
+        )
+
+        try:
+            response = await call_next(request)
+            process_time = time.time() - start_time
+            stats = query_stats.get()
+
+            # Log response
+            logger.info(
+                "Request completed",
+                extra={
+                    "request_id": request_id,
+                    "method": request.method,
+                    "path": request.url.path,
+                    "status_code": response.status_code,
+                    "process_time": round(process_time, 4),
+                    "db_queries": stats.count if stats else 0,
+                    "db_time": round(stats.duration, 4) if stats else 0.0,
+                },
+            )
+
+            response.headers["X-Process-Time"] = str(round(process_time, 4))
+            return response
+
+        except Exception as e:
+            process_time = time.time() - start_time
+            logger.error(
+                "Request failed",
+                extra={
+                    "request_id": request_id,
+                    "method": request.method,
+                    "path": request.url.path,
+                    "error": str(e),
+                    "process_time": round(process_time, 4),
+                },
+                exc_info=True,
+            )
+            raise
+
+
+async def endpoint(scope: Scope, receive: Receive, send: Send) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", b"2")],
+    })
+    await send({"type": "http.response.body", "body": b"[]"})
+
+
+async def receive() -> dict:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message: dict) -> None:
+    pass
+
+
+def build_stacks() -> Dict[str, ASGIApp]:
+    from app.middleware import RequestContextMiddleware
+
+    return {
+        "bare": endpoint,
+        "base-http": RequestIDMiddleware(LoggingMiddleware(endpoint)),
+        "asgi": RequestContextMiddleware(endpoint),
+    }
+
+
+async def time_stack(app: ASGIApp, requests: int) -> float:
+    """Seconds per request through ``app``."""
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(SCOPE), receive, send)
+    return (time.perf_counter() - started) / requests
+
+
+async def run(requests: int, rounds: int) -> Dict[str, float]:
+    """Best-of-``rounds`` seconds per request of every stack."""
+    stacks = build_stacks()
+    for app in stacks.values():
+        await time_stack(app, min(requests, 1000))  # Warm up
+
+    best: Dict[str, List[float]] = {name: [] for name in stacks}
+    for _ in range(rounds):
+        # Interleave the stacks so drift in machine load hits them alike
+        for name, app in stacks.items():
+            best[name].append(await time_stack(app, requests))
+    return {name: min(times) for name, times in best.items()}
+
+
+def configure_logging(log: bool) -> Callable[[], None]:
+    """Route the middleware logger to the null device (or nowhere); return a cleanup."""
+    from app.logging_config import JSONFormatter
+
+    logger = logging.getLogger("app.middleware")
+    logger.propagate = False
+    if not log:
+        logger.setLevel(logging.WARNING)
+        return lambda: None
+
+    logger.setLevel(logging.INFO)
+    handler = logging.StreamHandler(open(os.devnull, "w"))
+    handler.setFormatter(JSONFormatter())
+    logger.addHandler(handler)
+    return handler.stream.close
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000, help="Requests per round")
+    parser.add_argument("--rounds", type=int, default=5, help="Rounds per stack (best is kept)")
+    parser.add_argument("--log", action="store_true", help="Format and write request logs")
+    args = parser.parse_args(argv)
+
+    cleanup = configure_logging(args.log)
+    try:
+        results = asyncio.run(run(args.requests, args.rounds))
+    finally:
+        cleanup()
+
+    bare = results["bare"]
+    print(f"{'stack':<12} {'us/request':>12} {'overhead us':>12}")
+    for name, seconds in results.items():
+        print(f"{name:<12} {seconds * 1e6:>12.2f} {(seconds - bare) * 1e6:>12.2f}")
+    saved = (results["base-http"] - results["asgi"]) / (results["base-http"] - bare)
+    print(f"\nPlain ASGI removes {saved:.0%} of the middleware overhead")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
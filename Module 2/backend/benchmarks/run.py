@@ -0,0 +1,263 @@
+"""Endpoint benchmarks: throughput and latency percentiles, measured in-process.
+
+Seeds a database (see ``scripts/seed_db.py``), then drives the ASGI app through
+httpx's ASGI transport, with no network involved::
+
+    python -m benchmarks.run --users 10000 --scores 1000000 --requests 2000 --concurrency 20 \\
+        --output current.json --baseline baseline.json
+
+Results are written as JSON. With ``--baseline``, each scenario is compared
+against an earlier run and the exit status is 1 if any regressed by more than
+``--max-regression`` (see ``benchmarks/compare.py``).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+API = "/api/v1/leaderboard"
+
+# (method, url, json body) of one request
+Request = tuple[str, str, Optional[dict]]
+
+
+@dataclass
+class Scenario:
+    """A named request mix; ``build`` returns the i-th request."""
+
+    name: str
+    build: Callable[[random.Random, int, List[str]], Request]
+
+
+SCENARIOS = [
+    Scenario("leaderboard", lambda rng, i, users: ("GET", API, None)),
+    Scenario("leaderboard_mode", lambda rng, i, users: ("GET", f"{API}?mode=walls", None)),
+    Scenario("leaderboard_by_date", lambda rng, i, users: ("GET", f"{API}?sort=date", None)),
+    Scenario(
+        "leaderboard_offset_100", lambda rng, i, users: ("GET", f"{API}?offset=100", None)
+    ),
+    Scenario(
+        "leaderboard_offset_1000",
+        lambda rng, i, users: ("GET", f"{API}?offset=1000&mode=walls-through", None),
+    ),
+    Scenario(
+        "leaderboard_random_offset",
+        lambda rng, i, users: ("GET", f"{API}?offset={rng.randrange(0, 5000, 10)}", None),
+    ),
+    Scenario(
+        "user_scores", lambda rng, i, users: ("GET", f"{API}/{rng.choice(users)}", None)
+    ),
+    Scenario("stats", lambda rng, i, users: ("GET", f"{API}/stats/summary", None)),
+    Scenario(
+        "submit_score",
+        lambda rng, i, users: (
+            "POST",
+            API,
+            {
+                "username": f"BENCH{i:08d}",
+                "score": rng.randint(0, 1000),
+                "mode": "walls" if i % 2 else "walls-through",
+            },
+        ),
+    ),
+]
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000, help="Players in the seeded dataset")
+    parser.add_argument("--scores", type=int, default=100000, help="Scores in the seeded dataset")
+    parser.add_argument("--distribution", default="pareto", help="Score distribution of the dataset")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the dataset and requests")
+    parser.add_argument(
+        "--database-url", help="Database to benchmark (default: a new temporary SQLite file)"
+    )
+    parser.add_argument(
+        "--skip-seed", action="store_true", help="Use the data already in --database-url"
+    )
+    parser.add_argument("--requests", type=int, default=1000, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=50, help="Unmeasured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10, help="Requests in flight")
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=[scenario.name for scenario in SCENARIOS],
+        help="Scenario to run (repeatable; default: all)",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Disable the page and response caches"
+    )
+    parser.add_argument(
+        "--rate-limit", action="store_true", help="Keep rate limiting on (off by default)"
+    )
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against the results in this JSON file")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.10,
+        help="Allowed relative regression of latency or throughput (default 0.10)",
+    )
+    args = parser.parse_args(argv)
+    if args.skip_seed and not args.database_url:
+        parser.error("--skip-seed needs --database-url")
+    return args
+
+
+def configure_environment(args: argparse.Namespace) -> Optional[str]:
+    """Point the app's settings at the benchmark database; return a temp file to remove.
+
+    Must run before the app is imported, since settings are read at import.
+    """
+    temp_path = None
+    database_url = args.database_url
+    if database_url is None:
+        handle, temp_path = tempfile.mkstemp(prefix="benchmark-", suffix=".db")
+        os.close(handle)
+        database_url = f"sqlite:///{temp_path}"
+
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["ENVIRONMENT"] = "benchmark"  # No SQL echo
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ["RATE_LIMIT_STORAGE_URI"] = "memory://"
+    if args.no_cache:
+        os.environ["CACHE_TTL_SECONDS"] = "0"
+        os.environ["RESPONSE_CACHE_MAX_ENTRIES"] = "0"
+    return temp_path
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    """Throughput and latency percentiles (milliseconds) of one scenario."""
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 3),
+            "p50": round(cuts[49] * 1000, 3),
+            "p95": round(cuts[94] * 1000, 3),
+            "p99": round(cuts[98] * 1000, 3),
+            "max": round(max(latencies) * 1000, 3),
+        },
+    }
+
+
+async def run_requests(client, requests: List[Request], concurrency: int) -> dict:
+    """Send the requests from ``concurrency`` workers and summarize them."""
+    latencies: List[float] = []
+    errors = 0
+    pending = iter(requests)
+
+    async def worker() -> None:
+        nonlocal errors
+        for method, url, body in pending:
+            started = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Seed the database, run every selected scenario and return the results."""
+    import httpx
+    from sqlalchemy import select
+
+    from app.database import AsyncSessionLocal
+    from app.models_db import User
+    from app.rate_limit import limiter
+    from main import app
+    from scripts.seed_db import generate_dataset
+
+    if not args.skip_seed:
+        await generate_dataset(
+            args.users, args.scores, distribution=args.distribution, seed=args.seed
+        )
+    limiter.enabled = args.rate_limit
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(User.username).limit(10000))
+        usernames = list(result.scalars())
+
+    selected = [s for s in SCENARIOS if not args.scenario or s.name in args.scenario]
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for number, scenario in enumerate(selected):
+                rng = random.Random(args.seed * 1000 + number)
+                total = args.warmup + args.requests
+                requests = [scenario.build(rng, i, usernames) for i in range(total)]
+                await run_requests(client, requests[:args.warmup], args.concurrency)
+                results[scenario.name] = await run_requests(
+                    client, requests[args.warmup:], args.concurrency
+                )
+                print_result(scenario.name, results[scenario.name])
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": os.environ["DATABASE_URL"].split("://")[0],
+            "users": args.users,
+            "scores": args.scores,
+            "distribution": args.distribution,
+            "seed": args.seed,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "cache": not args.no_cache,
+            "rate_limit": args.rate_limit,
+        },
+        "scenarios": results,
+    }
+
+
+def print_result(name: str, result: dict) -> None:
+    latency = result["latency_ms"]
+    print(
+        f"{name:<28} {result['throughput_rps']:>9.1f} req/s  "
+        f"p50 {latency['p50']:>8.2f} ms  p95 {latency['p95']:>8.2f} ms  "
+        f"p99 {latency['p99']:>8.2f} ms  errors {result['errors']}",
+        flush=True,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    temp_path = configure_environment(args)
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        if temp_path:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(temp_path + suffix):
+                    os.remove(temp_path + suffix)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        from benchmarks.compare import compare_files
+        return 1 if compare_files(results, args.baseline, args.max_regression) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
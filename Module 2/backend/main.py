@@ -1,31 +1,40 @@
 """Main FastAPI application entry point."""
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 from datetime import datetime, timezone
 import os
 import logging
 
 from app.config import settings
 from app.logging_config import setup_logging
-from app.middleware import RequestIDMiddleware, LoggingMiddleware
+from app.middleware import RequestContextMiddleware, MetricsMiddleware
+from app.metrics import CONTENT_TYPE, render_metrics
 from app.exceptions import (
     APIException,
+    NotModified,
     api_exception_handler,
+    not_modified_handler,
     validation_exception_handler,
     http_exception_handler,
     general_exception_handler,
 )
 from app.api.v1.router import router as api_v1_router
 from app.models import HealthResponse
-from app.database import init_db, close_db, check_db_health
-from app.rate_limit import setup_rate_limiting
+from app.database import (
+    init_db, close_db, check_db_health, maintain_partitions, AsyncSessionLocal, engine,
+)
+from app.repository_sorted_set import leaderboard_index, sorted_set_engine_enabled
+from app.write_behind import write_behind_buffer
+from app.broadcast import leaderboard_broadcaster
+from app.api.v1.leaderboard import get_leaderboard_service
+from app.rate_limit import setup_rate_limiting, rate_limit_exceeded_handler
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from slowapi.errors import RateLimitExceeded
-from slowapi import _rate_limit_exceeded_handler
 
 # Setup logging
 setup_logging()
@@ -44,10 +53,34 @@ async def lifespan(app: FastAPI):
     logger.info(f"Environment: {settings.environment}")
     logger.info(f"Static files mode: {'Enabled' if HAS_STATIC_FILES else 'Disabled (API only)'}")
     await init_db()
+    partition_task = None
+    if engine.dialect.name == "postgresql" and settings.partition_maintenance_hours > 0:
+        # A long-lived process must create next months' partitions itself
+        partition_task = asyncio.create_task(
+            maintain_partitions(settings.partition_maintenance_hours * 3600)
+        )
+    if sorted_set_engine_enabled():
+        async with AsyncSessionLocal() as session:
+            loaded = await leaderboard_index.load(session)
+        logger.info(f"Sorted-set leaderboard loaded with {loaded} scores")
+    elif settings.leaderboard_engine == "sorted_set":
+        logger.warning(
+            "The sorted-set engine needs REDIS_URL when WEB_CONCURRENCY > 1; "
+            "serving leaderboards from SQL"
+        )
+    if settings.write_behind_enabled:
+        replayed = await write_behind_buffer.start(get_leaderboard_service)
+        logger.info(f"Write-behind submissions enabled ({replayed} replayed from journal)")
     logger.info("Application started successfully!")
     yield
     # Shutdown
     logger.info("Shutting down...")
+    if settings.write_behind_enabled:
+        await write_behind_buffer.stop()
+    await leaderboard_broadcaster.stop()
+    if partition_task is not None:
+        partition_task.cancel()
+    await leaderboard_index.flush()
     await close_db()
     logger.info("Application shutdown complete")
 
@@ -71,18 +104,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Add custom middleware
-app.add_middleware(RequestIDMiddleware)
-app.add_middleware(LoggingMiddleware)
+# Add custom middleware (the last added runs first, so metrics time the whole
+# stack). Both are plain ASGI: no per-request task or response stream.
+app.add_middleware(RequestContextMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 # Setup rate limiting
 setup_rate_limiting(app)
 
 # Register exception handlers
 app.add_exception_handler(APIException, api_exception_handler)
+app.add_exception_handler(NotModified, not_modified_handler)
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
 app.add_exception_handler(StarletteHTTPException, http_exception_handler)
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
 app.add_exception_handler(Exception, general_exception_handler)
 
 # Mount API routes
@@ -118,6 +153,14 @@ async def health_check_db():
         "timestamp": datetime.now(timezone.utc).isoformat(),
     }
 
+
+# Prometheus metrics endpoint (no DB dependency)
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Request, database pool and cache metrics in the Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+
 # Root endpoint
 @app.get("/", tags=["root"])
 async def root():
@@ -1,10 +1,39 @@
-"""Script to seed the database with initial data."""
+"""Script to seed the database with initial or synthetic data.
+
+Without arguments a handful of sample players is added. With ``--users`` and
+``--scores`` a deterministic synthetic dataset is bulk loaded instead::
+
+    python -m scripts.seed_db --users 100000 --scores 10000000 --distribution pareto --seed 42
+"""
+import argparse
 import asyncio
-from sqlalchemy import select
-from app.database import AsyncSessionLocal, init_db
+import random
+import time
+from typing import Callable, Iterator, List, Optional
+from sqlalchemy import select, insert
+from sqlalchemy.engine import Connection
+from app.database import AsyncSessionLocal, engine, init_db
+from app.db_utils import insert_ignore
 from app.models_db import User, Score, GameModeEnum
+from app import rollups  # noqa: F401  Registers the rollup listeners
+from app.rollups import rebuild_rollups
 from datetime import datetime, timedelta, timezone
 
+DISTRIBUTIONS = ("uniform", "normal", "pareto")
+
+# Generated players are named SEED00000001, SEED00000002, ...
+SEED_USER_PREFIX = "SEED"
+
+# Users inserted per multi-row INSERT (well under SQLite's bound parameter limit)
+USER_BATCH_SIZE = 5000
+
+# Generated dates end here unless --now says otherwise, so a seed always
+# yields the same rows
+DEFAULT_NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+# (user_id, score, mode name, unix timestamp) of a generated score
+ScoreTuple = tuple[int, int, str, int]
+
 
 async def seed_database():
     """Seed database with initial test data."""
@@ -48,6 +77,207 @@ async def seed_database():
         print("Database seeded successfully!")
 
 
+def score_sampler(
+    distribution: str, rng: random.Random, max_score: int
+) -> Callable[[], int]:
+    """Return a function drawing one score from the distribution."""
+    if distribution == "uniform":
+        return lambda: rng.randint(0, max_score)
+    if distribution == "normal":
+        mean, deviation = max_score / 4, max_score / 8
+        return lambda: min(max_score, max(0, int(rng.gauss(mean, deviation))))
+    # Heavy tail: most games end early, a few players score very high
+    scale = max_score / 20
+    return lambda: min(max_score, int((rng.paretovariate(1.5) - 1) * scale))
+
+
+def generate_scores(
+    count: int,
+    user_ids: List[int],
+    distribution: str,
+    rng: random.Random,
+    days: int,
+    max_score: int,
+    batch_size: int,
+    now: datetime = DEFAULT_NOW,
+) -> Iterator[List[ScoreTuple]]:
+    """Yield batches of scores spread over the ``days`` days before ``now``."""
+    sample = score_sampler(distribution, rng, max_score)
+    modes = (GameModeEnum.WALLS.name, GameModeEnum.WALLS_THROUGH.name)
+    end = int(now.timestamp())
+    span = days * 86400
+    for start in range(0, count, batch_size):
+        yield [
+            (rng.choice(user_ids), sample(), modes[rng.getrandbits(1)], end - rng.randrange(span))
+            for _ in range(min(batch_size, count - start))
+        ]
+
+
+def create_seed_users(connection: Connection, count: int) -> List[int]:
+    """Insert the generated players (skipping existing ones) and return their ids."""
+    dialect = connection.dialect.name
+    usernames = [f"{SEED_USER_PREFIX}{n:08d}" for n in range(1, count + 1)]
+    for start in range(0, count, USER_BATCH_SIZE):
+        batch = usernames[start:start + USER_BATCH_SIZE]
+        connection.execute(
+            insert_ignore(dialect, User.__table__, [{"username": name} for name in batch])
+        )
+    result = connection.execute(
+        select(User.id).where(User.username.like(f"{SEED_USER_PREFIX}%")).order_by(User.id)
+    )
+    return list(result.scalars())[:count]
+
+
+def drop_score_indexes(connection: Connection) -> None:
+    """Drop the secondary indexes of scores (rebuilding once beats updating per row)."""
+    for index in Score.__table__.indexes:
+        index.drop(connection, checkfirst=True)
+
+
+def create_score_indexes(connection: Connection) -> None:
+    for index in Score.__table__.indexes:
+        index.create(connection, checkfirst=True)
+
+
+async def load_scores(connection, batch: List[ScoreTuple]) -> None:
+    """Bulk insert a batch with the fastest path the driver offers."""
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        # COPY through the asyncpg connection
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            "scores",
+            records=[
+                (user_id, score, mode, datetime.fromtimestamp(date, timezone.utc))
+                for user_id, score, mode, date in batch
+            ],
+            columns=["user_id", "score", "mode", "date"],
+        )
+    elif dialect == "sqlite":
+        # executemany straight on the driver; SQLite formats the dates
+        # the way SQLAlchemy stores them
+        await connection.exec_driver_sql(
+            "INSERT INTO scores (user_id, score, mode, date) VALUES "
+            "(?, ?, ?, strftime('%Y-%m-%d %H:%M:%S', ?, 'unixepoch') || '.000000')",
+            batch,
+        )
+    else:
+        await connection.execute(
+            insert(Score.__table__),
+            [
+                {
+                    "user_id": user_id,
+                    "score": score,
+                    "mode": GameModeEnum[mode],
+                    "date": datetime.fromtimestamp(date, timezone.utc),
+                }
+                for user_id, score, mode, date in batch
+            ],
+        )
+
+
+async def generate_dataset(
+    users: int,
+    scores: int,
+    distribution: str = "pareto",
+    seed: int = 0,
+    days: int = 90,
+    max_score: int = 1000,
+    batch_size: int = 50000,
+    keep_indexes: bool = False,
+    now: datetime = DEFAULT_NOW,
+) -> None:
+    """Bulk load synthetic players and scores, then rebuild indexes and rollups."""
+    await init_db()
+    rng = random.Random(seed)
+    started = time.perf_counter()
+
+    async with engine.connect() as connection:
+        dialect = connection.dialect.name
+        if dialect == "sqlite":
+            # Durability is irrelevant for a throwaway dataset
+            await connection.exec_driver_sql("PRAGMA synchronous=OFF")
+            await connection.commit()
+
+        async with connection.begin():
+            user_ids = await connection.run_sync(create_seed_users, users)
+            print(f"{len(user_ids)} players ready")
+            if not keep_indexes:
+                await connection.run_sync(drop_score_indexes)
+
+            # Generate the next batch in a thread while the current one loads
+            batches = generate_scores(
+                scores, user_ids, distribution, rng, days, max_score, batch_size, now
+            )
+            batch = next(batches, None)
+            loaded = 0
+            while batch is not None:
+                loading = asyncio.create_task(load_scores(connection, batch))
+                next_batch = await asyncio.to_thread(next, batches, None)
+                await loading
+                loaded += len(batch)
+                batch = next_batch
+                rate = loaded / (time.perf_counter() - started)
+                print(f"{loaded}/{scores} scores ({rate:,.0f} rows/s)", flush=True)
+
+            if not keep_indexes:
+                print("Rebuilding indexes...")
+                await connection.run_sync(create_score_indexes)
+            print("Rebuilding rollups...")
+            await connection.run_sync(rebuild_rollups)
+
+    print(f"Generated {scores} scores in {time.perf_counter() - started:.1f}s")
+
+
+def parse_now(value: str) -> datetime:
+    """Parse an ISO date or datetime; naive values are taken as UTC."""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an ISO date: {value!r}")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, help="Synthetic players to create")
+    parser.add_argument("--scores", type=int, help="Synthetic scores to generate")
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="pareto")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (same seed, same data)")
+    parser.add_argument("--days", type=int, default=90, help="Spread score dates over this many days")
+    parser.add_argument(
+        "--now",
+        type=parse_now,
+        default=DEFAULT_NOW,
+        help=f"ISO date the score dates end at (default {DEFAULT_NOW.date()})",
+    )
+    parser.add_argument("--max-score", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=50000, help="Rows per bulk insert")
+    parser.add_argument(
+        "--keep-indexes", action="store_true", help="Load with indexes in place (slower)"
+    )
+    args = parser.parse_args(argv)
+    if (args.users is None) != (args.scores is None):
+        parser.error("--users and --scores must be given together")
+    if args.users is not None and (args.users < 1 or args.scores < 0):
+        parser.error("--users must be positive and --scores non-negative")
+    return args
+
+
 if __name__ == "__main__":
-    asyncio.run(seed_database())
+    args = parse_args()
+    if args.users is None:
+        asyncio.run(seed_database())
+    else:
+        asyncio.run(generate_dataset(
+            args.users,
+            args.scores,
+            distribution=args.distribution,
+            seed=args.seed,
+            days=args.days,
+            max_score=args.max_score,
+            batch_size=args.batch_size,
+            keep_indexes=args.keep_indexes,
+            now=args.now,
+        ))
 
@@ -3,7 +3,13 @@ import pytest
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from app.database import Base, get_db
+from app.database import Base, get_read_db, get_write_db
+from app.cache import leaderboard_cache, response_cache
+from app.user_cache import user_id_cache
+from app.recent_submissions import recent_submissions
+from app.rate_limit import limiter
+from app.metrics import request_metrics
+from app.versioning import leaderboard_version
 from app.models_db import User, Score, GameModeEnum
 from main import app
 
@@ -29,6 +35,24 @@ TestSessionLocal = async_sessionmaker(
 )
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Reset process-wide caches so tests don't see each other's data."""
+    leaderboard_cache.clear()
+    response_cache.clear()
+    user_id_cache.clear()
+    recent_submissions.clear()
+    limiter.reset()
+    request_metrics.reset()
+    # Fixtures write to the database directly; invalidate earlier ETags
+    leaderboard_version.bump()
+    yield
+    leaderboard_cache.clear()
+    response_cache.clear()
+    user_id_cache.clear()
+    recent_submissions.clear()
+
+
 @pytest.fixture
 async def db_session():
     """Create a test database session."""
@@ -45,16 +69,19 @@ async def db_session():
 
 @pytest.fixture
 def override_get_db(db_session):
-    """Override the get_db dependency."""
+    """Override the get_write_db / get_read_db dependencies."""
     async def _get_db():
         yield db_session
+        # Commit like get_write_db so after-commit hooks (caches, index) run
+        await db_session.commit()
     return _get_db
 
 
 @pytest.fixture
 async def client(override_get_db):
     """Create a test client."""
-    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_write_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     from httpx import AsyncClient
     async with AsyncClient(app=app, base_url="http://test") as ac:
         yield ac
@@ -1,7 +1,13 @@
 """Tests for API endpoints."""
+import time
 import pytest
 from httpx import AsyncClient
 
+from app.cache import response_cache
+from app.config import settings
+from app.database import create_sqlite_engines
+from app import metrics
+
 
 @pytest.mark.asyncio
 class TestHealthEndpoints:
@@ -48,6 +54,66 @@ class TestLeaderboardEndpoints:
         data = response.json()
         assert len(data["data"]) <= 5
     
+    async def test_get_leaderboard_cursor(self, client: AsyncClient, test_scores):
+        """Test following next_cursor to the next page."""
+        response = await client.get("/api/v1/leaderboard", params={"limit": 2})
+        first = response.json()
+        assert first["meta"]["has_more"] is True
+        assert first["meta"]["next_cursor"]
+        
+        response = await client.get(
+            "/api/v1/leaderboard",
+            params={"limit": 2, "cursor": first["meta"]["next_cursor"]},
+        )
+        assert response.status_code == 200
+        second = response.json()
+        assert [e["score"] for e in second["data"]] == [120]
+        assert second["meta"]["next_cursor"] is None
+    
+    async def test_get_leaderboard_invalid_cursor(self, client: AsyncClient):
+        """Test that a malformed cursor is rejected."""
+        response = await client.get("/api/v1/leaderboard", params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400
+        assert response.json()["error"]["code"] == "VALIDATION_ERROR"
+    
+    async def test_get_leaderboard_without_total(self, client: AsyncClient, test_scores):
+        """Test include_total=false."""
+        response = await client.get(
+            "/api/v1/leaderboard", params={"limit": 2, "include_total": "false"}
+        )
+        assert response.status_code == 200
+        meta = response.json()["meta"]
+        assert meta["total"] is None
+        assert meta["has_more"] is True
+    
+    async def test_get_leaderboard_period(
+        self, client: AsyncClient, db_session, test_user, test_scores
+    ):
+        """Test that day and week leaderboards skip older scores."""
+        from datetime import datetime, timedelta, timezone
+        from app.models_db import Score, GameModeEnum
+        
+        old_date = datetime.now(timezone.utc) - timedelta(days=10)
+        db_session.add(
+            Score(user_id=test_user.id, score=900, mode=GameModeEnum.WALLS, date=old_date)
+        )
+        await db_session.flush()
+        
+        for period, scores in (("day", [250, 180, 120]), ("all", [900, 250, 180, 120])):
+            response = await client.get("/api/v1/leaderboard", params={"period": period})
+            assert response.status_code == 200
+            data = response.json()
+            assert [e["score"] for e in data["data"]] == scores
+            assert data["meta"]["total"] == len(scores)
+        
+        response = await client.get("/api/v1/leaderboard", params={"period": "month"})
+        assert response.status_code == 400
+        
+        response = await client.get(
+            "/api/v1/leaderboard", params={"period": "week", "distinct_players": "true"}
+        )
+        assert response.status_code == 400
+    
     async def test_submit_score(self, client: AsyncClient):
         """Test submitting a score."""
         response = await client.post(
@@ -105,3 +171,375 @@ class TestLeaderboardEndpoints:
         assert "average_score" in data
         assert "top_score" in data
 
+
+@pytest.mark.asyncio
+class TestRankEndpoints:
+    """Tests for rank lookup endpoints."""
+    
+    async def test_get_score_rank(self, client: AsyncClient, test_scores):
+        """Test ranking an arbitrary score."""
+        response = await client.get(
+            "/api/v1/leaderboard/rank", params={"score": 200, "mode": "walls"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["rank"] == 2
+        assert data["total"] == 2
+        assert data["percentile"] == 50.0
+    
+    async def test_get_user_rank(self, client: AsyncClient, test_user, test_scores):
+        """Test ranking a user's best score."""
+        response = await client.get(f"/api/v1/leaderboard/{test_user.username}/rank")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["username"] == test_user.username
+        assert data["score"] == 250
+        assert data["rank"] == 1
+        assert data["percentile"] == 100.0
+    
+    async def test_get_user_rank_not_found(self, client: AsyncClient):
+        """Test ranking a user without scores."""
+        response = await client.get("/api/v1/leaderboard/NONEXISTENT/rank")
+        assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+class TestQueryInstrumentation:
+    """Tests for per-request SQL statement counting."""
+    
+    async def test_db_headers(self, client: AsyncClient, test_scores):
+        """Test that responses report the statements they ran."""
+        response = await client.get("/api/v1/leaderboard", params={"offset": 1})
+        assert response.status_code == 200
+        assert int(response.headers["X-DB-Queries"]) >= 1
+        assert float(response.headers["X-DB-Time"]) >= 0
+        
+        # Served from the page cache: no statements
+        response = await client.get("/api/v1/leaderboard", params={"offset": 1})
+        assert response.headers["X-DB-Queries"] == "0"
+    
+    async def test_completion_log_fields(self, client: AsyncClient, test_scores, caplog):
+        """Test that the completion log carries the request's database cost."""
+        import logging
+        
+        with caplog.at_level(logging.INFO, logger="app.middleware"):
+            response = await client.get("/api/v1/leaderboard/TESTUSER")
+        
+        completed = [r for r in caplog.records if r.getMessage() == "Request completed"]
+        assert completed[-1].request_id == response.headers["X-Request-ID"]
+        assert completed[-1].db_queries == int(response.headers["X-DB-Queries"]) > 0
+
+
+@pytest.mark.asyncio
+class TestRequestContext:
+    """Tests for the request ID / timing / logging middleware."""
+    
+    async def test_response_headers(self, client: AsyncClient):
+        """Test that every response carries its request ID, timing and DB cost."""
+        import uuid
+        
+        response = await client.get("/health")
+        assert uuid.UUID(response.headers["X-Request-ID"])
+        assert float(response.headers["X-Process-Time"]) >= 0
+        assert response.headers["X-DB-Queries"] == "0"
+        assert response.headers["X-DB-Time"] == "0.0"
+    
+    async def test_failure_logged(self, caplog):
+        """Test that unhandled errors are logged with the request ID, then re-raised."""
+        import logging
+        from httpx import ASGITransport
+        from app.database import query_stats
+        from app.middleware import RequestContextMiddleware
+        
+        async def failing_app(scope, receive, send):
+            raise RuntimeError("boom")
+        
+        transport = ASGITransport(app=RequestContextMiddleware(failing_app))
+        async with AsyncClient(transport=transport, base_url="http://test") as failing:
+            with caplog.at_level(logging.INFO, logger="app.middleware"):
+                with pytest.raises(RuntimeError):
+                    await failing.get("/anything", params={"a": "1"})
+        
+        started, failed = [
+            r for r in caplog.records if r.getMessage() in ("Request started", "Request failed")
+        ]
+        assert started.query_params == "a=1"
+        assert failed.request_id == started.request_id
+        assert failed.error == "boom"
+        assert query_stats.get() is None
+
+
+@pytest.mark.asyncio
+class TestMetrics:
+    """Tests for the Prometheus metrics endpoint."""
+    
+    async def test_requests_labelled_by_route_template(self, client: AsyncClient, test_scores):
+        """Test that requests are counted per route template, not per raw path."""
+        await client.get("/api/v1/leaderboard/TESTUSER")
+        await client.get("/api/v1/leaderboard/OTHERUSER")
+        await client.get("/no/such/path")
+        
+        response = await client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = response.text
+        assert (
+            'http_requests_total{method="GET",route="/api/v1/leaderboard/{username}",'
+            'status="200"} 1' in body
+        )
+        assert (
+            'http_requests_total{method="GET",route="/api/v1/leaderboard/{username}",'
+            'status="404"} 1' in body
+        )
+        assert 'http_requests_total{method="GET",route="<unmatched>",status="404"} 1' in body
+        assert (
+            'http_request_duration_seconds_bucket{method="GET",'
+            'route="/api/v1/leaderboard/{username}",le="+Inf"} 2' in body
+        )
+        assert "OTHERUSER" not in body
+        # The scrape itself is still in flight
+        assert "http_requests_in_flight 1" in body
+    
+    async def test_rate_limit_rejections_counted(self, client: AsyncClient, monkeypatch):
+        """Test that 429 responses are counted."""
+        # A frozen clock keeps every hit in one window (a boundary would admit an extra one)
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now)
+        limit = settings.rate_limit_per_minute
+        for i in range(limit + 1):
+            response = await client.post(
+                "/api/v1/leaderboard", json={"username": "FLOOD", "score": i, "mode": "walls"}
+            )
+        assert response.status_code == 429
+        
+        body = (await client.get("/metrics")).text
+        assert "rate_limit_rejections_total 1" in body
+        assert (
+            'http_requests_total{method="POST",route="/api/v1/leaderboard",status="429"} 1'
+            in body
+        )
+    
+    async def test_cache_hit_ratio(self, client: AsyncClient, test_scores):
+        """Test that response cache lookups are reported."""
+        hits, misses = response_cache.hits, response_cache.misses
+        await client.get("/api/v1/leaderboard")
+        await client.get("/api/v1/leaderboard")
+        
+        assert (response_cache.hits - hits, response_cache.misses - misses) == (1, 1)
+        body = (await client.get("/metrics")).text
+        assert f'cache_hits_total{{cache="response"}} {response_cache.hits}' in body
+        assert 'cache_hit_ratio{cache="leaderboard"}' in body
+    
+    async def test_pool_gauges_per_engine(self, client: AsyncClient, tmp_path, monkeypatch):
+        """Test that the read pool is reported beside the writer pool."""
+        writer, readers = create_sqlite_engines(f"sqlite+aiosqlite:///{tmp_path / 'pools.db'}")
+        monkeypatch.setattr(metrics, "engine", writer)
+        monkeypatch.setattr(metrics, "read_engine", readers)
+        try:
+            body = (await client.get("/metrics")).text
+        finally:
+            await writer.dispose()
+            await readers.dispose()
+        
+        assert 'db_pool_size{pool="write"} 1' in body
+        assert f'db_pool_size{{pool="read"}} {settings.sqlite_read_pool_size}' in body
+        assert 'db_pool_checked_out{pool="read"} 0' in body
+
+
+@pytest.mark.asyncio
+class TestConditionalRequests:
+    """Tests for ETag / Last-Modified handling."""
+    
+    async def test_leaderboard_not_modified(self, client: AsyncClient, test_scores):
+        """Test that a matching If-None-Match returns 304 without a body."""
+        response = await client.get("/api/v1/leaderboard")
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        assert "last-modified" in response.headers
+        
+        response = await client.get("/api/v1/leaderboard", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+    
+    async def test_not_modified_skips_database(self, client: AsyncClient, test_scores):
+        """Test that a 304 is answered before a DB session is opened."""
+        from app.database import get_read_db
+        from main import app
+        
+        etag = (await client.get("/api/v1/leaderboard/stats/summary")).headers["etag"]
+        
+        async def _no_db():
+            raise AssertionError("DB session opened for a conditional hit")
+            yield
+        
+        app.dependency_overrides[get_read_db] = _no_db
+        response = await client.get(
+            "/api/v1/leaderboard/stats/summary", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+    
+    async def test_submit_changes_etag(self, client: AsyncClient, test_scores):
+        """Test that a new score invalidates earlier validators."""
+        etag = (await client.get("/api/v1/leaderboard")).headers["etag"]
+        
+        response = await client.post(
+            "/api/v1/leaderboard",
+            json={"username": "TESTPLAYER", "score": 300, "mode": "walls"},
+        )
+        assert response.status_code == 201
+        
+        response = await client.get("/api/v1/leaderboard", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+    
+    async def test_if_modified_since(self, client: AsyncClient, test_scores):
+        """Test Last-Modified round trip."""
+        from app.versioning import leaderboard_version
+        
+        # Last change exactly on a second, as after a window rollover
+        leaderboard_version.modified_at = float(int(time.time()))
+        response = await client.get("/api/v1/leaderboard")
+        last_modified = response.headers["last-modified"]
+        
+        response = await client.get(
+            "/api/v1/leaderboard", headers={"If-Modified-Since": last_modified}
+        )
+        assert response.status_code == 304
+    
+    async def test_if_modified_since_same_second(self, client: AsyncClient, test_scores):
+        """Test that a change within the second of Last-Modified is not a 304."""
+        from app.versioning import leaderboard_version
+        
+        leaderboard_version.modified_at = int(time.time()) + 0.5
+        last_modified = (await client.get("/api/v1/leaderboard")).headers["last-modified"]
+        
+        response = await client.get(
+            "/api/v1/leaderboard", headers={"If-Modified-Since": last_modified}
+        )
+        assert response.status_code == 200
+    
+    async def test_first_page_served_from_rendered_bytes(
+        self, client: AsyncClient, test_scores
+    ):
+        """Test that a cached first page matches the freshly rendered one."""
+        first = await client.get("/api/v1/leaderboard")
+        second = await client.get("/api/v1/leaderboard")
+        assert second.status_code == 200
+        assert second.content == first.content
+        assert second.headers["content-type"] == "application/json"
+        
+        await client.post(
+            "/api/v1/leaderboard",
+            json={"username": "TESTPLAYER", "score": 300, "mode": "walls"},
+        )
+        response = await client.get("/api/v1/leaderboard")
+        assert response.json()["data"][0]["score"] == 300
+
+
+@pytest.mark.asyncio
+class TestBatchSubmission:
+    """Tests for batch score submission."""
+    
+    async def test_submit_batch(self, client: AsyncClient):
+        """Test that each submission gets its own result."""
+        response = await client.post(
+            "/api/v1/leaderboard/batch",
+            json={
+                "submissions": [
+                    {"username": "PLAYER1", "score": 300, "mode": "walls"},
+                    {"username": "PLAYER2", "score": 200, "mode": "walls-through"},
+                    {"username": "PLAYER1", "score": 300, "mode": "walls"},
+                ]
+            },
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["created"] == 2
+        assert data["rejected"] == 1
+        assert [r["status"] for r in data["results"]] == ["created", "created", "rejected"]
+        assert data["results"][0]["entry"]["username"] == "PLAYER1"
+        assert data["results"][2]["error"]["code"] == "DUPLICATE_SUBMISSION"
+        
+        response = await client.get("/api/v1/leaderboard")
+        assert response.json()["meta"]["total"] == 2
+    
+    async def test_submit_batch_malformed_item(self, client: AsyncClient):
+        """Test that a malformed submission is rejected without failing the batch."""
+        response = await client.post(
+            "/api/v1/leaderboard/batch",
+            json={
+                "submissions": [
+                    {"username": "PLAYER1", "score": 300, "mode": "walls"},
+                    {"username": "PLAYER2", "score": -5, "mode": "walls"},
+                    {"username": "PLAYER3", "mode": "snake"},
+                ]
+            },
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert [r["status"] for r in data["results"]] == ["created", "rejected", "rejected"]
+        assert data["results"][1]["error"]["code"] == "VALIDATION_ERROR"
+        assert data["results"][1]["error"]["message"].startswith("score:")
+    
+    async def test_submit_batch_too_large(self, client: AsyncClient):
+        """Test that batches over the configured size are rejected."""
+        from app.config import settings
+        
+        submission = {"username": "PLAYER1", "score": 1, "mode": "walls"}
+        response = await client.post(
+            "/api/v1/leaderboard/batch",
+            json={"submissions": [submission] * (settings.batch_max_submissions + 1)},
+        )
+        assert response.status_code == 400
+        assert response.json()["error"]["code"] == "VALIDATION_ERROR"
+
+
+@pytest.mark.asyncio
+class TestReadReplicaRouting:
+    """Tests for routing reads to the replica and writes to the primary."""
+    
+    async def test_reads_from_replica_writes_to_primary(
+        self, client: AsyncClient, db_session, tmp_path
+    ):
+        """Test GET routes against a second SQLite file standing in for the replica."""
+        from sqlalchemy import func, select
+        from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+        from app.database import Base, create_read_engine, get_read_db
+        from app.models_db import User, Score, GameModeEnum
+        from main import app
+        
+        url = f"sqlite:///{tmp_path}/replica.db"
+        seed_engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"))
+        async with seed_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSession(seed_engine) as session:
+            user = User(username="REPLICA")
+            session.add(user)
+            await session.flush()
+            session.add(Score(user_id=user.id, score=42, mode=GameModeEnum.WALLS))
+            await session.commit()
+        await seed_engine.dispose()
+        
+        replica = create_read_engine(url)
+        
+        async def _replica_db():
+            async with AsyncSession(replica) as session:
+                yield session
+        
+        app.dependency_overrides[get_read_db] = _replica_db
+        try:
+            response = await client.get("/api/v1/leaderboard")
+            assert [e["username"] for e in response.json()["data"]] == ["REPLICA"]
+            
+            response = await client.post(
+                "/api/v1/leaderboard", json={"username": "PRIMARY", "score": 99, "mode": "walls"}
+            )
+            assert response.status_code == 201
+            assert await db_session.scalar(select(func.count()).select_from(Score)) == 1
+            
+            # Not replicated: reads still see only the replica's data
+            response = await client.get("/api/v1/leaderboard/PRIMARY")
+            assert response.status_code == 404
+        finally:
+            await replica.dispose()
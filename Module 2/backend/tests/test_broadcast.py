@@ -0,0 +1,142 @@
+"""Tests for the live leaderboard broadcaster."""
+import asyncio
+import json
+
+import pytest
+
+from app.broadcast import LeaderboardBroadcaster
+from app.models import GameMode
+from app.repository_db import DatabaseLeaderboardRepository
+from tests.conftest import TestSessionLocal
+
+
+def parse_event(message: str) -> tuple[str, dict]:
+    """Split an encoded server-sent event into its name and data."""
+    name_line, data_line = message.strip().split("\n")
+    return name_line.removeprefix("event: "), json.loads(data_line.removeprefix("data: "))
+
+
+async def add_scores(*scores: int, username: str = "PLAYER1") -> None:
+    """Store scores in their own committed transaction."""
+    async with TestSessionLocal() as session:
+        repo = DatabaseLeaderboardRepository(session)
+        for score in scores:
+            await repo.add_score(username=username, score=score, mode=GameMode.WALLS)
+        await session.commit()
+
+
+@pytest.fixture
+def make_broadcaster(monkeypatch):
+    """Build a broadcaster reading from the test database, notified on commit."""
+    def _make(top_n: int = 2, debounce: float = 0.01) -> LeaderboardBroadcaster:
+        broadcaster = LeaderboardBroadcaster(
+            TestSessionLocal, top_n=top_n, debounce=debounce, refresh_interval=60
+        )
+        monkeypatch.setattr("app.broadcast.leaderboard_broadcaster", broadcaster)
+        return broadcaster
+    return _make
+
+
+@pytest.mark.asyncio
+class TestLeaderboardBroadcaster:
+    """Tests for LeaderboardBroadcaster."""
+    
+    async def test_snapshot_then_diff(self, db_session, make_broadcaster):
+        """Test that subscribers get a snapshot, then only the changed entries."""
+        await add_scores(100, 50)
+        broadcaster = make_broadcaster()
+        subscription = await broadcaster.subscribe(None)
+        
+        name, data = parse_event(subscription.queue.get_nowait())
+        assert name == "snapshot"
+        assert [(e["rank"], e["score"]) for e in data["entries"]] == [(1, 100), (2, 50)]
+        dropped_id = data["entries"][1]["id"]
+        
+        await add_scores(200)
+        name, data = parse_event(await asyncio.wait_for(subscription.queue.get(), 1))
+        assert name == "diff"
+        assert [(e["rank"], e["score"]) for e in data["added"]] == [(1, 200)]
+        assert data["removed"] == [dropped_id]
+        
+        await broadcaster.stop()
+    
+    async def test_burst_coalesced_into_one_refresh(self, db_session, make_broadcaster):
+        """Test that a burst of commits is pushed as a single diff."""
+        broadcaster = make_broadcaster(top_n=5, debounce=0.2)
+        subscription = await broadcaster.subscribe(GameMode.WALLS)
+        subscription.queue.get_nowait()
+        
+        for score in (10, 20, 30):
+            await add_scores(score)
+        
+        name, data = parse_event(await asyncio.wait_for(subscription.queue.get(), 1))
+        assert name == "diff"
+        assert [e["score"] for e in data["added"]] == [30, 20, 10]
+        await asyncio.sleep(0.05)
+        assert subscription.queue.empty()
+        
+        await broadcaster.stop()
+    
+    async def test_unchanged_top_not_pushed(self, db_session, make_broadcaster):
+        """Test that scores below the top N push nothing."""
+        await add_scores(300, 200)
+        broadcaster = make_broadcaster()
+        subscription = await broadcaster.subscribe(None)
+        subscription.queue.get_nowait()
+        
+        await add_scores(5)
+        await asyncio.sleep(0.05)
+        assert subscription.queue.empty()
+        
+        broadcaster.unsubscribe(subscription)
+        assert broadcaster.subscriber_count == 0
+        await broadcaster.stop()
+    
+    async def test_events_unsubscribe_on_close(self, db_session, make_broadcaster):
+        """Test that closing the event stream removes the subscriber."""
+        broadcaster = make_broadcaster()
+        events = broadcaster.events(None, keepalive=0.01)
+        
+        assert (await events.__anext__()).startswith("event: snapshot")
+        assert await events.__anext__() == ": keepalive\n\n"
+        assert broadcaster.subscriber_count == 1
+        
+        await events.aclose()
+        assert broadcaster.subscriber_count == 0
+        await broadcaster.stop()
+    
+    async def test_close_streams_ends_events(self, db_session, make_broadcaster):
+        """Test that open streams finish when shutdown starts."""
+        broadcaster = make_broadcaster()
+        events = broadcaster.events(None, keepalive=60)
+        assert (await events.__anext__()).startswith("event: snapshot")
+        
+        pending = asyncio.ensure_future(events.__anext__())
+        await asyncio.sleep(0)
+        broadcaster.close_streams()
+        with pytest.raises(StopAsyncIteration):
+            await asyncio.wait_for(pending, 1)
+        assert broadcaster.subscriber_count == 0
+        
+        # Streams opened after shutdown started end right after the snapshot
+        late = [message async for message in broadcaster.events(None, keepalive=60)]
+        assert len(late) == 1
+        await broadcaster.stop()
+    
+    async def test_events_end_once_disconnected(self, db_session, make_broadcaster):
+        """Test that a stream ends at the first keepalive after the connection closed."""
+        broadcaster = make_broadcaster()
+        closed = False
+        
+        async def disconnected():
+            return closed
+        
+        events = broadcaster.events(None, keepalive=0.01, disconnected=disconnected)
+        assert (await events.__anext__()).startswith("event: snapshot")
+        assert await events.__anext__() == ": keepalive\n\n"
+        
+        closed = True
+        with pytest.raises(StopAsyncIteration):
+            await asyncio.wait_for(events.__anext__(), 1)
+        assert broadcaster.subscriber_count == 0
+        await broadcaster.stop()
@@ -0,0 +1,222 @@
+"""Tests for the leaderboard page and response caches."""
+import gzip
+import time
+import pytest
+from app.cache import LeaderboardCache, ResponseCache
+from app.recent_submissions import RecentSubmissionIndex
+from app.models import LeaderboardEntry, GameMode, ScoreSubmission
+from app.repository_db import DatabaseLeaderboardRepository
+from app.services import create_leaderboard_service
+from app.config import settings
+from app.versioning import LeaderboardVersion, create_leaderboard_version
+
+
+def make_entries(*scores: int, mode: str = "walls") -> list[LeaderboardEntry]:
+    """Build leaderboard entries with the given scores."""
+    return [
+        LeaderboardEntry(id=i + 1, username="PLAYER1", score=score, mode=mode)
+        for i, score in enumerate(scores)
+    ]
+
+
+class TestLeaderboardCache:
+    """Tests for LeaderboardCache."""
+    
+    def test_get_and_set(self):
+        """Test storing and reading a page."""
+        cache = LeaderboardCache(ttl_seconds=30, max_entries=10)
+        key = cache.make_key(GameMode.WALLS, "score", 2, 0)
+        
+        assert cache.get(key) is None
+        cache.set(key, make_entries(300, 200), 5)
+        
+        entries, total = cache.get(key)
+        assert [e.score for e in entries] == [300, 200]
+        assert total == 5
+        assert cache.hits == 1
+        assert cache.misses == 1
+    
+    def test_expired_entry(self, monkeypatch):
+        """Test that entries past their TTL are not served."""
+        cache = LeaderboardCache(ttl_seconds=30, max_entries=10)
+        key = cache.make_key(None, "score", 10, 0)
+        cache.set(key, make_entries(100), 1)
+        
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + 31)
+        assert cache.get(key) is None
+        assert len(cache) == 0
+    
+    def test_size_eviction(self):
+        """Test that the least recently used page is evicted."""
+        cache = LeaderboardCache(ttl_seconds=30, max_entries=2)
+        keys = [cache.make_key(None, "score", 10, offset) for offset in (0, 10, 20)]
+        cache.set(keys[0], make_entries(100), 1)
+        cache.set(keys[1], make_entries(100), 1)
+        cache.get(keys[0])
+        cache.set(keys[2], make_entries(100), 1)
+        
+        assert len(cache) == 2
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) is not None
+    
+    def test_invalidate_for_score(self):
+        """Test that only pages the new score can reach are dropped."""
+        cache = LeaderboardCache(ttl_seconds=30, max_entries=10)
+        top = cache.make_key(GameMode.WALLS, "score", 2, 0)
+        second = cache.make_key(GameMode.WALLS, "score", 2, 2)
+        all_modes = cache.make_key(None, "score", 2, 0)
+        by_date = cache.make_key(GameMode.WALLS, "date", 2, 0)
+        other_mode = cache.make_key(GameMode.WALLS_THROUGH, "score", 2, 0)
+        
+        cache.set(top, make_entries(500, 400), 4)
+        cache.set(second, make_entries(300, 200), 4)
+        cache.set(all_modes, make_entries(500, 400), 6)
+        cache.set(by_date, make_entries(200, 300), 4)
+        cache.set(other_mode, make_entries(50, 40, mode="walls-through"), 2)
+        
+        cache.invalidate_for_score(GameMode.WALLS, 350)
+        
+        assert cache.get(top)[1] == 5
+        assert cache.get(all_modes)[1] == 7
+        assert cache.get(second) is None
+        assert cache.get(by_date) is None
+        assert cache.get(other_mode)[1] == 2
+
+
+class TestResponseCache:
+    """Tests for ResponseCache."""
+    
+    def test_bodies_are_tied_to_etag(self):
+        """Test that a body is only served for the ETag it was rendered at."""
+        cache = ResponseCache(max_entries=10)
+        cache.set("stats", 'W/"a"', b"{}")
+        
+        assert cache.get("stats", 'W/"a"') == (b"{}", None)
+        assert cache.get("stats", 'W/"b"') is None
+    
+    def test_large_bodies_are_gzipped(self):
+        """Test that bodies above the threshold get a gzip variant."""
+        cache = ResponseCache(max_entries=10)
+        body = b"[" + b"1," * 500 + b"1]"
+        cache.set("page", 'W/"a"', body)
+        
+        cached_body, gzipped = cache.get("page", 'W/"a"')
+        assert cached_body == body
+        assert gzip.decompress(gzipped) == body
+    
+    def test_size_eviction(self):
+        """Test that the least recently used body is evicted."""
+        cache = ResponseCache(max_entries=1)
+        cache.set("a", "1", b"a")
+        cache.set("b", "1", b"b")
+        
+        assert cache.get("a", "1") is None
+        assert cache.get("b", "1") == (b"b", None)
+
+
+class TestLeaderboardVersion:
+    """Tests for LeaderboardVersion."""
+    
+    def test_validators_roll_over_with_caching_disabled(self, monkeypatch):
+        """Test that validators still roll over when cache_ttl_seconds is 0."""
+        monkeypatch.setattr(settings, "cache_ttl_seconds", 0)
+        version = create_leaderboard_version()
+        monkeypatch.setattr(time, "time", lambda: 6000.0)
+        etag, _ = version.validators()
+        assert version.is_not_modified({"if-none-match": etag})
+        
+        # Another worker may have stored a score since
+        monkeypatch.setattr(time, "time", lambda: 6001.0)
+        assert not version.is_not_modified({"if-none-match": etag})
+
+
+class TestRecentSubmissionIndex:
+    """Tests for RecentSubmissionIndex."""
+    
+    def test_seen_within_window(self, monkeypatch):
+        """Test that submissions are found only inside the window."""
+        index = RecentSubmissionIndex(retention_seconds=120, bucket_seconds=5)
+        key = ("PLAYER1", 100, GameMode.WALLS)
+        index.add([key])
+        
+        assert index.seen(key, 60)
+        assert not index.seen(("PLAYER1", 101, GameMode.WALLS), 60)
+        
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+        assert not index.seen(key, 60)
+        assert index.recent(["PLAYER1"], 90) == {key}
+    
+    def test_covers_after_window_elapsed(self, monkeypatch):
+        """Test that misses are only trusted once the index spans the window."""
+        index = RecentSubmissionIndex(retention_seconds=120)
+        assert not index.covers(60)
+        
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + 60)
+        assert index.covers(60)
+        assert not index.covers(600)
+    
+    def test_shared_index_never_covers(self, monkeypatch):
+        """Test that misses are never trusted when other workers store submissions."""
+        index = RecentSubmissionIndex(retention_seconds=120, exclusive=False)
+        index.add([("PLAYER1", 100, GameMode.WALLS)])
+        
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+        assert not index.covers(60)
+        assert index.seen(("PLAYER1", 100, GameMode.WALLS), 120)
+    
+    def test_old_buckets_expire(self):
+        """Test that buckets past the retention are dropped."""
+        index = RecentSubmissionIndex(retention_seconds=10, bucket_seconds=5)
+        index.add([("PLAYER1", 100, GameMode.WALLS)], now=0)
+        index.add([("PLAYER2", 100, GameMode.WALLS)], now=100)
+        
+        assert len(index._buckets) == 1
+
+
+@pytest.mark.asyncio
+class TestCachedLeaderboardService:
+    """Tests for the service read-through cache."""
+    
+    async def test_cached_page_reflects_new_score(self, db_session, test_scores):
+        """Test that a submitted score shows up on a cached page."""
+        cache = LeaderboardCache(ttl_seconds=30, max_entries=10)
+        service = create_leaderboard_service(
+            DatabaseLeaderboardRepository(db_session), cache=cache
+        )
+        
+        entries, total = await service.get_leaderboard(limit=2, mode=GameMode.WALLS)
+        assert [e.score for e in entries] == [250, 120]
+        
+        await service.get_leaderboard(limit=2, mode=GameMode.WALLS)
+        assert cache.hits == 1
+        
+        await service.submit_score(
+            ScoreSubmission(username="NEWPLAYER", score=999, mode="walls")
+        )
+        await db_session.commit()
+        entries, new_total = await service.get_leaderboard(limit=2, mode=GameMode.WALLS)
+        assert entries[0].score == 999
+        assert new_total == total + 1
+    
+    async def test_rolled_back_score_keeps_cache(self, db_session, test_scores):
+        """Test that pages and validators are only invalidated once scores commit."""
+        cache = LeaderboardCache(ttl_seconds=30, max_entries=10)
+        version = LeaderboardVersion(window_seconds=0)
+        service = create_leaderboard_service(
+            DatabaseLeaderboardRepository(db_session), cache=cache, version=version
+        )
+        await service.get_leaderboard(limit=2, mode=GameMode.WALLS)
+        
+        await service.submit_score(
+            ScoreSubmission(username="NEWPLAYER", score=999, mode="walls")
+        )
+        assert version.value == 0
+        await db_session.rollback()
+        
+        await service.get_leaderboard(limit=2, mode=GameMode.WALLS)
+        assert cache.hits == 1
+        assert version.value == 0
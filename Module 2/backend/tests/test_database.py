@@ -0,0 +1,45 @@
+"""Tests for database engine configuration."""
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.database import create_sqlite_engines
+
+
+@pytest.fixture
+async def sqlite_engines(tmp_path):
+    writer, reader = create_sqlite_engines(f"sqlite+aiosqlite:///{tmp_path}/app.db")
+    yield writer, reader
+    await writer.dispose()
+    await reader.dispose()
+
+
+async def pragma(engine, name: str):
+    async with engine.connect() as conn:
+        return (await conn.exec_driver_sql(f"PRAGMA {name}")).scalar()
+
+
+@pytest.mark.asyncio
+class TestSQLiteProductionProfile:
+    """Tests for the WAL / reader pool / single writer SQLite profile."""
+    
+    async def test_writer_pragmas(self, sqlite_engines):
+        """Test that writer connections enable WAL and the tuned settings."""
+        writer, _ = sqlite_engines
+        assert await pragma(writer, "journal_mode") == "wal"
+        assert await pragma(writer, "synchronous") == 1  # NORMAL
+        assert await pragma(writer, "busy_timeout") == 5000
+        assert await pragma(writer, "cache_size") == -65536
+        assert writer.pool.size() == 1
+    
+    async def test_readers_are_read_only(self, sqlite_engines):
+        """Test that reader connections see committed data but cannot write."""
+        writer, reader = sqlite_engines
+        async with writer.begin() as conn:
+            await conn.exec_driver_sql("CREATE TABLE t (x INTEGER)")
+            await conn.exec_driver_sql("INSERT INTO t VALUES (1)")
+        
+        async with reader.connect() as conn:
+            assert (await conn.exec_driver_sql("SELECT x FROM t")).scalar() == 1
+            with pytest.raises(OperationalError, match="readonly"):
+                await conn.exec_driver_sql("INSERT INTO t VALUES (2)")
+        assert await pragma(reader, "query_only") == 1
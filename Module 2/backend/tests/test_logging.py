@@ -0,0 +1,81 @@
+"""Tests for the logging pipeline."""
+import io
+import json
+import logging
+import logging.handlers
+import queue
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.logging_config import JSONFormatter, NonBlockingQueueHandler
+from app.middleware import RequestContextMiddleware
+
+
+def make_record(**extra) -> logging.LogRecord:
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "Hello %s", ("world",), None)
+    record.__dict__.update(extra)
+    return record
+
+
+class TestJSONFormatter:
+    """Tests for JSONFormatter."""
+    
+    def test_fields(self):
+        """Test that the message and request fields are encoded."""
+        record = make_record(request_id="abc", status_code=200, db_time=0.0012)
+        data = json.loads(JSONFormatter().format(record))
+        
+        assert data["message"] == "Hello world"
+        assert data["level"] == "INFO"
+        assert (data["request_id"], data["status_code"], data["db_time"]) == ("abc", 200, 0.0012)
+        assert "path" not in data
+
+
+class TestQueueLogging:
+    """Tests for the background-thread logging mode."""
+    
+    def test_listener_writes_records(self):
+        """Test that queued records are formatted and written by the listener."""
+        stream = io.StringIO()
+        target = logging.StreamHandler(stream)
+        target.setFormatter(JSONFormatter())
+        handler = NonBlockingQueueHandler(queue.Queue(10))
+        listener = logging.handlers.QueueListener(handler.queue, target)
+        listener.start()
+        
+        handler.handle(make_record(request_id="abc"))
+        listener.stop()
+        
+        assert json.loads(stream.getvalue())["request_id"] == "abc"
+    
+    def test_full_queue_drops_records(self):
+        """Test that a full queue drops records instead of blocking."""
+        handler = NonBlockingQueueHandler(queue.Queue(2))
+        for _ in range(5):
+            handler.handle(make_record())
+        
+        assert handler.queue.qsize() == 2
+        assert handler.dropped == 3
+
+
+@pytest.mark.asyncio
+class TestRequestLogSampling:
+    """Tests for sampling of request logs."""
+    
+    async def test_errors_kept_when_successes_sampled_out(self, caplog):
+        """Test that only error responses are logged with a zero sample rate."""
+        async def app(scope, receive, send):
+            status = 404 if scope["path"] == "/missing" else 200
+            await send({"type": "http.response.start", "status": status, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+        
+        transport = ASGITransport(app=RequestContextMiddleware(app, sample_rate=0))
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            with caplog.at_level(logging.INFO, logger="app.middleware"):
+                ok = await client.get("/ok")
+                await client.get("/missing")
+        
+        messages = [(r.getMessage(), r.path) for r in caplog.records if r.name == "app.middleware"]
+        assert messages == [("Request completed", "/missing")]
+        assert ok.headers["X-Request-ID"]
@@ -35,6 +35,11 @@ class TestScoreSubmission:
         # Username too long
         with pytest.raises(ValidationError):
             ScoreSubmission(username="A" * 21, score=100, mode="walls")
+        
+        # Names of fixed leaderboard routes, in any case
+        for username in ("rank", "Stream"):
+            with pytest.raises(ValidationError):
+                ScoreSubmission(username=username, score=100, mode="walls")
     
     def test_score_validation(self):
         """Test score validation."""
@@ -0,0 +1,59 @@
+"""Tests for time partitioning of scores."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models import GameMode
+from app.models_db import Score, GameModeEnum
+from app.partitions import ensure_partitions, period_key, period_start, prune_scores_before
+from app.repository_db import DatabaseLeaderboardRepository
+from app.rollups import rebuild_rollups
+
+
+class TestPeriods:
+    """Tests for period boundaries."""
+    
+    def test_period_start(self):
+        """Test that days start at UTC midnight and weeks on Monday."""
+        now = datetime(2026, 10, 17, 15, 30, tzinfo=timezone.utc)  # a Saturday
+        
+        assert period_start("all", now) is None
+        assert period_start("day", now) == datetime(2026, 10, 17, tzinfo=timezone.utc)
+        assert period_start("week", now) == datetime(2026, 10, 12, tzinfo=timezone.utc)
+    
+    def test_period_key(self):
+        """Test that the key changes when a new period starts."""
+        now = datetime(2026, 10, 17, 23, 59, tzinfo=timezone.utc)
+        
+        assert period_key("all", now) == "all"
+        assert period_key("day", now) == "day:2026-10-17"
+        assert period_key("day", now + timedelta(minutes=1)) == "day:2026-10-18"
+        assert period_key("week", now + timedelta(minutes=1)) == "week:2026-10-12"
+
+
+@pytest.mark.asyncio
+class TestPartitionMaintenance:
+    """Tests for partition maintenance on a non-partitioned database."""
+    
+    async def test_ensure_partitions_noop(self, db_session):
+        """Test that SQLite has no partitions to create."""
+        connection = await db_session.connection()
+        assert await connection.run_sync(ensure_partitions) == []
+    
+    async def test_prune_scores_before(self, db_session, test_user, test_scores):
+        """Test that old scores are removed and rollups rebuilt."""
+        old_date = datetime.now(timezone.utc) - timedelta(days=40)
+        db_session.add(
+            Score(user_id=test_user.id, score=900, mode=GameModeEnum.WALLS, date=old_date)
+        )
+        await db_session.flush()
+        connection = await db_session.connection()
+        await connection.run_sync(rebuild_rollups)
+        repo = DatabaseLeaderboardRepository(db_session)
+        assert await repo.get_user_best_score(test_user.username, GameMode.WALLS) == 900
+        
+        cutoff = datetime.now(timezone.utc) - timedelta(days=30)
+        await connection.run_sync(prune_scores_before, cutoff)
+        
+        assert await repo.count_scores() == 3
+        assert await repo.get_user_best_score(test_user.username, GameMode.WALLS) == 250
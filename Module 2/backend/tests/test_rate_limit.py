@@ -0,0 +1,94 @@
+"""Tests for the shared rate limit storage."""
+import sqlite3
+import time
+
+import pytest
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import SlidingWindowCounterRateLimiter
+
+from app.rate_limit_storage import SQLiteStorage
+
+
+class TestSQLiteStorage:
+    """Tests for SQLiteStorage."""
+    
+    def test_sliding_window_shared_between_processes(self, tmp_path):
+        """Test that two storages on the same file share their counters."""
+        uri = f"sqlite:///{tmp_path}/rate_limits.db"
+        worker1 = SlidingWindowCounterRateLimiter(storage_from_string(uri))
+        worker2 = SlidingWindowCounterRateLimiter(storage_from_string(uri))
+        limit = parse("3/minute")
+        
+        assert worker1.hit(limit, "client")
+        assert worker2.hit(limit, "client")
+        assert worker1.hit(limit, "client")
+        assert not worker2.hit(limit, "client")
+        assert worker1.hit(limit, "other-client")
+    
+    def test_previous_window_is_weighted(self, tmp_path, monkeypatch):
+        """Test that hits from the previous window count proportionally."""
+        storage = SQLiteStorage(f"sqlite:///{tmp_path}/rate_limits.db")
+        start = 6000.0  # Start of a 60 second window
+        monkeypatch.setattr(time, "time", lambda: start)
+        for _ in range(4):
+            assert storage.acquire_sliding_window_entry("client", 4, 60)
+        assert not storage.acquire_sliding_window_entry("client", 4, 60)
+        
+        # Halfway through the next window, half of the previous hits still count
+        monkeypatch.setattr(time, "time", lambda: start + 90)
+        assert storage.acquire_sliding_window_entry("client", 4, 60)
+        assert storage.acquire_sliding_window_entry("client", 4, 60)
+        assert not storage.acquire_sliding_window_entry("client", 4, 60)
+    
+    def test_idle_keys_are_evicted(self, tmp_path, monkeypatch):
+        """Test that keys idle for two windows are deleted."""
+        storage = SQLiteStorage(f"sqlite:///{tmp_path}/rate_limits.db")
+        monkeypatch.setattr(time, "time", lambda: 6000.0)
+        storage.acquire_sliding_window_entry("idle", 10, 60)
+        
+        monkeypatch.setattr(time, "time", lambda: 6000.0 + 3600)
+        storage.acquire_sliding_window_entry("active", 10, 60)
+        
+        rows = storage._connection.execute("SELECT key FROM rate_limits").fetchall()
+        assert rows == [("active",)]
+    
+    def test_locked_file_counts_in_process(self, tmp_path):
+        """Test that hits are limited per worker, quickly, while another process holds the lock."""
+        uri = f"sqlite:///{tmp_path}/rate_limits.db"
+        holder = SQLiteStorage(uri)
+        storage = SQLiteStorage(uri, busy_timeout=0.01)
+        holder._connection.execute("BEGIN IMMEDIATE")
+        try:
+            started = time.monotonic()
+            assert storage.acquire_sliding_window_entry("client", 1, 60)
+            assert not storage.acquire_sliding_window_entry("client", 1, 60)
+            assert time.monotonic() - started < 1
+        finally:
+            holder._connection.execute("ROLLBACK")
+        
+        assert storage.acquire_sliding_window_entry("client", 1, 60)
+        assert not storage.acquire_sliding_window_entry("client", 1, 60)
+    
+    def test_failed_commit_rolls_back(self, tmp_path):
+        """Test that a failed COMMIT does not leave the transaction open."""
+        storage = SQLiteStorage(f"sqlite:///{tmp_path}/rate_limits.db")
+        connection = storage._connection
+        
+        class FailingCommit:
+            def execute(self, sql, *args):
+                if sql == "COMMIT":
+                    raise sqlite3.DatabaseError("disk I/O error")
+                return connection.execute(sql, *args)
+            
+            @property
+            def in_transaction(self):
+                return connection.in_transaction
+        
+        storage._connection = FailingCommit()
+        with pytest.raises(sqlite3.DatabaseError):
+            storage.acquire_sliding_window_entry("client", 5, 60)
+        
+        storage._connection = connection
+        assert not connection.in_transaction
+        assert storage.acquire_sliding_window_entry("client", 5, 60)
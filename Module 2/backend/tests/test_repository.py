@@ -1,7 +1,12 @@
 """Tests for database repository."""
+from datetime import datetime, timedelta, timezone
+
 import pytest
 from app.repository_db import DatabaseLeaderboardRepository
 from app.models import GameMode
+from app.models_db import Score, GameModeEnum
+from app.pagination import encode_cursor
+from app.rollups import rebuild_rollups
 
 
 @pytest.mark.asyncio
@@ -42,6 +47,97 @@ class TestDatabaseLeaderboardRepository:
         assert len(entries2) <= 2
         assert total2 == total1
     
+    async def test_get_leaderboard_cursor_pagination(self, db_session, test_user):
+        """Test that walking cursors matches offset pagination, ties included."""
+        for value in (300, 250, 250, 250, 200, 150, 150):
+            db_session.add(Score(user_id=test_user.id, score=value, mode=GameModeEnum.WALLS))
+        await db_session.flush()
+        repo = DatabaseLeaderboardRepository(db_session)
+        
+        for sort in ("score", "date"):
+            expected, _ = await repo.get_leaderboard(limit=100, offset=0, sort=sort)
+            
+            seen = []
+            cursor = None
+            while True:
+                page, _ = await repo.get_leaderboard(limit=2, sort=sort, cursor=cursor)
+                seen.extend(page)
+                if len(page) < 2:
+                    break
+                cursor = encode_cursor(page[-1])
+            
+            assert [e.id for e in seen] == [e.id for e in expected]
+    
+    async def test_cursor_pagination_server_default_dates(self, db_session, test_user):
+        """Test cursors over rows dated by the database default, within one second."""
+        from sqlalchemy import text
+        
+        await db_session.execute(
+            text(
+                "INSERT INTO scores (user_id, score, mode) "
+                "VALUES (:user_id, 100, 'WALLS'), (:user_id, 100, 'WALLS'), "
+                "(:user_id, 100, 'WALLS'), (:user_id, 90, 'WALLS'), (:user_id, 80, 'WALLS')"
+            ),
+            {"user_id": test_user.id},
+        )
+        repo = DatabaseLeaderboardRepository(db_session)
+        
+        for sort in ("score", "date"):
+            seen = []
+            cursor = None
+            for _ in range(5):
+                page, _ = await repo.get_leaderboard(limit=2, sort=sort, cursor=cursor)
+                seen.extend(page)
+                if len(page) < 2:
+                    break
+                cursor = encode_cursor(page[-1])
+            
+            assert len({e.id for e in seen}) == len(seen) == 5
+    
+    async def test_get_leaderboard_distinct_players(self, db_session, test_user, test_scores):
+        """Test one entry per player from the personal-best table."""
+        repo = DatabaseLeaderboardRepository(db_session)
+        await repo.add_score(username="OTHER", score=200, mode=GameMode.WALLS)
+        await repo.add_score(username="OTHER", score=100, mode=GameMode.WALLS)
+        
+        entries, total = await repo.get_leaderboard(
+            limit=10, mode=GameMode.WALLS, distinct_players=True
+        )
+        assert [(e.username, e.score) for e in entries] == [("TESTUSER", 250), ("OTHER", 200)]
+        assert total == 2
+        
+        entries, total = await repo.get_leaderboard(limit=10, distinct_players=True)
+        assert [(e.username, e.score, e.mode) for e in entries] == [
+            ("TESTUSER", 250, "walls"),
+            ("OTHER", 200, "walls"),
+        ]
+        assert total == 2
+        
+        await repo.add_score(username="OTHER", score=400, mode=GameMode.WALLS)
+        entries, _ = await repo.get_leaderboard(limit=1, distinct_players=True)
+        assert (entries[0].username, entries[0].score) == ("OTHER", 400)
+        
+        # Inactive players leave both the page and the total
+        test_user.is_active = False
+        await db_session.flush()
+        entries, total = await repo.get_leaderboard(limit=10, distinct_players=True)
+        assert [e.username for e in entries] == ["OTHER"]
+        assert total == 1
+    
+    async def test_distinct_players_same_best_in_both_modes(self, db_session, test_user):
+        """Test that a best tied on score and date across modes is listed once."""
+        date = datetime(2024, 1, 15, tzinfo=timezone.utc)
+        db_session.add_all([
+            Score(user_id=test_user.id, score=100, mode=GameModeEnum.WALLS, date=date),
+            Score(user_id=test_user.id, score=100, mode=GameModeEnum.WALLS_THROUGH, date=date),
+        ])
+        await db_session.flush()
+        
+        repo = DatabaseLeaderboardRepository(db_session)
+        entries, total = await repo.get_leaderboard(limit=10, distinct_players=True)
+        assert [(e.username, e.score) for e in entries] == [("TESTUSER", 100)]
+        assert total == 1
+    
     async def test_get_user_scores(self, db_session, test_user, test_scores):
         """Test getting user scores."""
         repo = DatabaseLeaderboardRepository(db_session)
@@ -55,6 +151,74 @@ class TestDatabaseLeaderboardRepository:
         assert len(entries) == 3
         assert all(entry.username == test_user.username for entry in entries)
     
+    async def test_score_counters(self, db_session, test_user, test_scores):
+        """Test that counters track inserted scores and can be rebuilt."""
+        repo = DatabaseLeaderboardRepository(db_session)
+        await repo.add_score(username=test_user.username, score=90, mode=GameMode.WALLS)
+        
+        assert await repo.count_scores() == 4
+        assert await repo.count_scores(GameMode.WALLS) == 3
+        assert await repo.count_user_scores("testuser", GameMode.WALLS_THROUGH) == 1
+        
+        connection = await db_session.connection()
+        await connection.run_sync(rebuild_rollups)
+        assert await repo.count_scores(GameMode.WALLS) == 3
+        assert await repo.count_user_scores(test_user.username) == 4
+    
+    async def test_counters_follow_active_users(self, db_session, test_user, test_scores):
+        """Test that totals match the pages when a user is deactivated or reactivated."""
+        repo = DatabaseLeaderboardRepository(db_session)
+        await repo.add_score(username="OTHER", score=90, mode=GameMode.WALLS)
+        since = datetime.now(timezone.utc) - timedelta(hours=1)
+        
+        test_user.is_active = False
+        await db_session.flush()
+        entries, total = await repo.get_leaderboard(limit=10)
+        assert total == len(entries) == 1
+        assert await repo.count_scores(GameMode.WALLS) == 1
+        assert await repo.count_scores_since(since) == 1
+        
+        # Scores of an inactive user stay out of the totals
+        await repo.add_score(username=test_user.username, score=70, mode=GameMode.WALLS)
+        assert await repo.count_scores() == 1
+        
+        test_user.is_active = True
+        await db_session.flush()
+        entries, total = await repo.get_leaderboard(limit=10)
+        assert total == len(entries) == 5
+        assert await repo.count_scores_since(since) == 5
+        
+        connection = await db_session.connection()
+        await connection.run_sync(rebuild_rollups)
+        assert await repo.count_scores() == 5
+    
+    async def test_score_rank_skips_inactive_users(self, db_session, test_user, test_scores):
+        """Test that an inactive high scorer counts in neither the rank nor the total."""
+        repo = DatabaseLeaderboardRepository(db_session)
+        await repo.add_score(username="OTHER", score=90, mode=GameMode.WALLS)
+        
+        test_user.is_active = False
+        await db_session.flush()
+        assert await repo.get_score_rank(50, GameMode.WALLS) == (2, 1)
+        assert await repo.get_score_rank(90, GameMode.WALLS) == (1, 1)
+    
+    async def test_user_lookups_match_exact_name(self, db_session):
+        """Test that "_" in a username is not a wildcard."""
+        repo = DatabaseLeaderboardRepository(db_session)
+        await repo.add_score(username="AXB", score=300, mode=GameMode.WALLS)
+        await repo.add_score(username="A_B", score=100, mode=GameMode.WALLS)
+        
+        assert await repo.get_user_best_score("a_b") == 100
+        assert await repo.count_user_scores("a_b") == 1
+    
+    async def test_get_leaderboard_without_total(self, db_session, test_scores):
+        """Test skipping the total."""
+        repo = DatabaseLeaderboardRepository(db_session)
+        entries, total = await repo.get_leaderboard(limit=10, include_total=False)
+        
+        assert total is None
+        assert len(entries) == 3
+    
     async def test_get_or_create_user(self, db_session):
         """Test getting or creating user."""
         repo = DatabaseLeaderboardRepository(db_session)
@@ -83,6 +247,18 @@ class TestDatabaseLeaderboardRepository:
         assert entry.mode == "walls"
         assert entry.id is not None
     
+    async def test_reads_skip_identity_map(self, db_session, test_user, test_scores):
+        """Test that leaderboard reads and writes don't hydrate Score entities."""
+        repo = DatabaseLeaderboardRepository(db_session)
+        db_session.expunge_all()
+        
+        await repo.get_leaderboard(limit=10)
+        await repo.get_user_scores(username=test_user.username)
+        entry = await repo.add_score(username=test_user.username, score=75, mode=GameMode.WALLS)
+        
+        assert entry.mode == "walls"
+        assert not any(isinstance(obj, Score) for obj in db_session.identity_map.values())
+    
     async def test_check_duplicate_submission(self, db_session, test_user):
         """Test duplicate submission detection."""
         repo = DatabaseLeaderboardRepository(db_session)
@@ -115,3 +291,103 @@ class TestDatabaseLeaderboardRepository:
         assert "top_score" in stats
         assert stats["total_scores"] >= 3
 
+    
+    async def test_stats_rollup(self, db_session, test_user, test_scores):
+        """Test that the stats rollup tracks new users and scores."""
+        repo = DatabaseLeaderboardRepository(db_session)
+        await repo.add_score(username="NEWPLAYER", score=450, mode=GameMode.WALLS)
+        
+        stats = await repo.get_stats()
+        assert stats == {
+            "total_players": 2,
+            "total_scores": 4,
+            "average_score": 250.0,
+            "top_score": 450,
+        }
+        
+        connection = await db_session.connection()
+        await connection.run_sync(rebuild_rollups)
+        assert await repo.get_stats() == stats
+    
+    async def test_add_scores(self, db_session, test_user, test_scores):
+        """Test bulk insert of scores for new and existing users."""
+        repo = DatabaseLeaderboardRepository(db_session)
+        entries = await repo.add_scores([
+            ("TESTUSER", 300, GameMode.WALLS),
+            ("newplayer", 90, GameMode.WALLS_THROUGH),
+            ("NEWPLAYER", 400, GameMode.WALLS),
+        ])
+        
+        assert [(e.username, e.score) for e in entries] == [
+            ("TESTUSER", 300), ("NEWPLAYER", 90), ("NEWPLAYER", 400)
+        ]
+        assert all(e.id is not None for e in entries)
+        
+        stats = await repo.get_stats()
+        assert stats["total_players"] == 2
+        assert stats["total_scores"] == 6
+        assert stats["top_score"] == 400
+        
+        recent = await repo.get_recent_submissions(["NEWPLAYER"])
+        assert recent == {
+            ("NEWPLAYER", 90, GameMode.WALLS_THROUGH),
+            ("NEWPLAYER", 400, GameMode.WALLS),
+        }
+    
+    async def test_user_ids_cached_after_commit(self, db_session):
+        """Test that returning players don't query the users table."""
+        from sqlalchemy import event
+        from tests.conftest import TestSessionLocal, test_engine
+        from app.user_cache import user_id_cache
+        
+        async with TestSessionLocal() as session:
+            repo = DatabaseLeaderboardRepository(session)
+            await repo.add_score(username="player1", score=100, mode=GameMode.WALLS)
+            assert user_id_cache.get("PLAYER1") is None
+            await session.commit()
+        assert user_id_cache.get("PLAYER1") is not None
+        
+        statements = []
+        
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(test_engine.sync_engine, "before_cursor_execute", record)
+        try:
+            repo = DatabaseLeaderboardRepository(db_session)
+            assert not await repo.check_duplicate_submission("PLAYER1", 200, GameMode.WALLS)
+            await repo.add_score(username="PLAYER1", score=200, mode=GameMode.WALLS)
+        finally:
+            event.remove(test_engine.sync_engine, "before_cursor_execute", record)
+        
+        assert statements
+        assert not any("users" in statement for statement in statements)
+    
+    async def test_user_ids_not_cached_after_rollback(self, db_session):
+        """Test that ids of rolled-back inserts are discarded."""
+        from tests.conftest import TestSessionLocal
+        from app.user_cache import user_id_cache
+        
+        async with TestSessionLocal() as session:
+            repo = DatabaseLeaderboardRepository(session)
+            await repo.get_user_id("PLAYER2")
+            await session.rollback()
+        
+        assert user_id_cache.get("PLAYER2") is None
+    
+    async def test_duplicate_check_uses_recent_index(self, db_session):
+        """Test that committed submissions are detected without a query."""
+        from tests.conftest import TestSessionLocal
+        from app.recent_submissions import recent_submissions
+        
+        async with TestSessionLocal() as session:
+            repo = DatabaseLeaderboardRepository(session)
+            await repo.add_score(username="PLAYER1", score=100, mode=GameMode.WALLS)
+            await session.commit()
+        
+        # Pretend the index has been running for longer than the window
+        recent_submissions.started_at -= 60
+        
+        repo = DatabaseLeaderboardRepository(db_session)
+        assert await repo.check_duplicate_submission("PLAYER1", 100, GameMode.WALLS)
+        assert not await repo.check_duplicate_submission("PLAYER1", 101, GameMode.WALLS)
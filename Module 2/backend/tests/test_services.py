@@ -81,6 +81,21 @@ class TestLeaderboardService:
         with pytest.raises(DuplicateSubmissionError):
             await service.submit_score(submission)
     
+    async def test_submit_scores_rejects_individually(self, db_session):
+        """Test that a batch rejects recent duplicates without failing the rest."""
+        repo = DatabaseLeaderboardRepository(db_session)
+        service = create_leaderboard_service(repo)
+        
+        await service.submit_score(ScoreSubmission(username="PLAYER1", score=250, mode="walls"))
+        results = await service.submit_scores([
+            ScoreSubmission(username="PLAYER1", score=250, mode="walls"),
+            ScoreSubmission(username="PLAYER1", score=260, mode="walls"),
+        ])
+        
+        assert [r.status for r in results] == ["rejected", "created"]
+        assert results[0].error["code"] == "DUPLICATE_SUBMISSION"
+        assert results[1].entry.score == 260
+    
     async def test_get_user_scores(self, db_session, test_user, test_scores):
         """Test getting user scores through service."""
         repo = DatabaseLeaderboardRepository(db_session)
@@ -0,0 +1,138 @@
+"""Tests for the sorted-set leaderboard engine."""
+import asyncio
+
+import pytest
+from app.sorted_set import SortedSet, InMemorySortedSetStore
+from app.repository_db import DatabaseLeaderboardRepository
+from app.repository_sorted_set import (
+    LOAD_LOCK_KEY,
+    LeaderboardIndex,
+    SortedSetLeaderboardRepository,
+    sorted_set_engine_enabled,
+)
+from app.config import settings
+from app.models import GameMode
+from app.models_db import Score, GameModeEnum
+from app.pagination import encode_cursor
+
+
+class TestSortedSet:
+    """Tests for SortedSet."""
+    
+    def test_rank_and_range(self):
+        """Test reverse rank and range ordering."""
+        zset = SortedSet()
+        zset.update({"a": 10, "b": 30, "c": 20, "d": 20})
+        
+        assert zset.rev_range(0, -1) == ["b", "d", "c", "a"]
+        assert zset.rev_range(1, 2) == ["d", "c"]
+        assert zset.rev_rank("b") == 0
+        assert zset.rev_rank("a") == 3
+        assert zset.rev_rank("missing") is None
+    
+    def test_update_score(self):
+        """Test re-adding a member moves it."""
+        zset = SortedSet()
+        zset.add("a", 10)
+        zset.add("b", 20)
+        zset.add("a", 30)
+        
+        assert len(zset) == 2
+        assert zset.rev_range(0, -1) == ["a", "b"]
+        assert zset.remove("a") is True
+        assert zset.rev_range(0, -1) == ["b"]
+    
+    @pytest.mark.asyncio
+    async def test_zcount_bounds(self):
+        """Test Redis-style exclusive and infinite bounds."""
+        store = InMemorySortedSetStore()
+        await store.zadd("key", {"a": 10, "b": 20, "c": 20, "d": 30})
+        
+        assert await store.zcount("key", "(20", "+inf") == 1
+        assert await store.zcount("key", 20, "+inf") == 3
+        assert await store.zcount("key", "-inf", "(20") == 1
+    
+    @pytest.mark.asyncio
+    async def test_pipeline_runs_on_execute(self):
+        """Test that pipelined commands wait for execute and return its results."""
+        store = InMemorySortedSetStore()
+        async with store.pipeline(transaction=True) as pipe:
+            pipe.hset("entries", mapping={"1": "x"})
+            pipe.zadd("key", {"a": 10})
+            assert await store.zcard("key") == 0
+            assert await pipe.execute() == [1, 1]
+        
+        assert await store.hmget("entries", ["1"]) == ["x"]
+        assert await store.zcard("key") == 1
+    
+    def test_in_process_engine_needs_one_worker(self, monkeypatch):
+        """Test that several workers without Redis fall back to SQL."""
+        monkeypatch.setattr(settings, "leaderboard_engine", "sorted_set")
+        monkeypatch.setattr(settings, "web_concurrency", 1)
+        assert sorted_set_engine_enabled()
+        
+        monkeypatch.setattr(settings, "web_concurrency", 4)
+        assert not sorted_set_engine_enabled()
+
+
+@pytest.mark.asyncio
+class TestSortedSetLeaderboardRepository:
+    """Tests for SortedSetLeaderboardRepository."""
+    
+    async def make_repo(self, db_session) -> SortedSetLeaderboardRepository:
+        index = LeaderboardIndex(InMemorySortedSetStore())
+        await index.load(db_session)
+        return SortedSetLeaderboardRepository(DatabaseLeaderboardRepository(db_session), index)
+    
+    async def test_matches_sql_order(self, db_session, test_user):
+        """Test that pages match the SQL engine, ties included."""
+        for value in (300, 250, 250, 200, 150):
+            db_session.add(Score(user_id=test_user.id, score=value, mode=GameModeEnum.WALLS))
+        db_session.add(Score(user_id=test_user.id, score=275, mode=GameModeEnum.WALLS_THROUGH))
+        await db_session.flush()
+        repo = await self.make_repo(db_session)
+        
+        for mode in (None, GameMode.WALLS):
+            expected, expected_total = await repo.database.get_leaderboard(limit=3, offset=1, mode=mode)
+            entries, total = await repo.get_leaderboard(limit=3, offset=1, mode=mode)
+            assert [e.id for e in entries] == [e.id for e in expected]
+            assert total == expected_total
+    
+    async def test_cursor_and_add_score(self, db_session, test_scores):
+        """Test cursor pages and that new scores are mirrored into the index."""
+        repo = await self.make_repo(db_session)
+        
+        await repo.add_score(username="NEWPLAYER", score=500, mode=GameMode.WALLS)
+        await db_session.commit()
+        await repo.index.flush()
+        first, total = await repo.get_leaderboard(limit=2)
+        assert [e.score for e in first] == [500, 250]
+        assert total == 4
+        
+        second, _ = await repo.get_leaderboard(limit=2, cursor=encode_cursor(first[-1]))
+        assert [e.score for e in second] == [180, 120]
+        assert await repo.index.count_above(GameMode.WALLS, 200) == 2
+    
+    async def test_rolled_back_score_not_indexed(self, db_session, test_scores):
+        """Test that only committed scores are mirrored into the index."""
+        repo = await self.make_repo(db_session)
+        
+        await repo.add_score(username="NEWPLAYER", score=500, mode=GameMode.WALLS)
+        await db_session.rollback()
+        await repo.index.flush()
+        
+        assert await repo.index.count(None) == 3
+        assert await repo.index.count_above(GameMode.WALLS, 250) == 0
+    
+    async def test_concurrent_loads_share_one_build(self, db_session, test_scores):
+        """Test that workers sharing a store build the index once, without clearing it."""
+        store = InMemorySortedSetStore()
+        first, second = LeaderboardIndex(store), LeaderboardIndex(store)
+        
+        loaded = await asyncio.gather(first.load(db_session), second.load(db_session))
+        
+        assert loaded == [3, 3]
+        assert first.ready and second.ready
+        assert await store.get(LOAD_LOCK_KEY) is None
+        assert await store.zcard("leaderboard:all:staging") == 0
+        assert len(await first.top(None, 0, 10)) == 3
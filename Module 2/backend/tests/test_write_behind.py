@@ -0,0 +1,206 @@
+"""Tests for write-behind score submission."""
+import json
+import os
+
+import pytest
+from sqlalchemy import select
+
+from app.exceptions import ServiceUnavailableError
+from app.models import GameMode, ScoreSubmission
+from app.models_db import Score
+from app.repository_db import DatabaseLeaderboardRepository
+from app.services import create_leaderboard_service
+from app.write_behind import SubmissionJournal, WriteBehindBuffer
+from tests.conftest import TestSessionLocal
+
+
+def make_service(session):
+    """Service factory used by the buffer's flush task."""
+    return create_leaderboard_service(DatabaseLeaderboardRepository(session))
+
+
+def make_buffer(path, queue_size: int = 100, max_attempts: int = 5) -> WriteBehindBuffer:
+    """Build a buffer journaling to the given path."""
+    return WriteBehindBuffer(
+        SubmissionJournal(str(path), fsync=False),
+        TestSessionLocal,
+        queue_size=queue_size,
+        batch_size=10,
+        flush_interval=0,
+        max_attempts=max_attempts,
+    )
+
+
+class TestSubmissionJournal:
+    """Tests for SubmissionJournal."""
+    
+    def test_replays_unacknowledged_records(self, tmp_path):
+        """Test that only records without an ack are replayed."""
+        from datetime import datetime, timezone
+        
+        path = tmp_path / "submissions.journal"
+        journal = SubmissionJournal(str(path), fsync=False)
+        assert journal.open() == []
+        
+        now = datetime.now(timezone.utc)
+        first = journal.append("PLAYER1", 100, GameMode.WALLS, now)
+        second = journal.append("PLAYER2", 200, GameMode.WALLS_THROUGH, now)
+        journal.ack([first["seq"]])
+        journal.close()
+        
+        reopened = SubmissionJournal(str(path), fsync=False)
+        assert reopened.open() == [second]
+        
+        reopened.ack([second["seq"]])
+        assert open(reopened.path).read() == ""
+        reopened.close()
+        assert not os.path.exists(reopened.path)
+    
+    def test_orphaned_journals_adopted(self, tmp_path):
+        """Test that journals of stopped processes are replayed once, live ones left alone."""
+        from app.write_behind import _lock_journal
+        
+        base = tmp_path / "submissions.journal"
+        record = {"op": "add", "seq": 1, "username": "P", "score": 1, "mode": "walls", "date": ""}
+        for pid in (1000001, 1000002):
+            path = tmp_path / f"submissions.journal.{pid}"
+            path.write_text(json.dumps({**record, "score": pid}) + "\n")
+        live_lock = _lock_journal(str(tmp_path / "submissions.journal.1000002"), blocking=True)
+        
+        journal = SubmissionJournal(str(base), fsync=False)
+        assert [(r["seq"], r["score"]) for r in journal.open()] == [(1, 1000001)]
+        assert not (tmp_path / "submissions.journal.1000001").exists()
+        assert (tmp_path / "submissions.journal.1000002").exists()
+        journal.close()
+        live_lock.close()
+        
+        # Records adopted into this process's journal are not adopted again
+        assert SubmissionJournal(str(base), fsync=False).open() == [
+            {**record, "score": 1000001}, {**record, "seq": 2, "score": 1000002}
+        ]
+    
+    def test_no_lock_file_left_for_removed_orphan(self, tmp_path, monkeypatch):
+        """Test that an orphan adopted by another process leaves no lock file behind."""
+        base = tmp_path / "submissions.journal"
+        orphan = tmp_path / "submissions.journal.1000001"
+        orphan.write_text("")
+        journal = SubmissionJournal(str(base), fsync=False)
+        # Another process adopts and removes the orphan right after it is listed
+        orphans = journal._orphans
+        
+        def listed_then_removed():
+            paths = orphans()
+            orphan.unlink()
+            return paths
+        monkeypatch.setattr(journal, "_orphans", listed_then_removed)
+        
+        assert journal.open() == []
+        assert not (tmp_path / "submissions.journal.1000001.lock").exists()
+        journal.close()
+
+
+@pytest.mark.asyncio
+class TestWriteBehindBuffer:
+    """Tests for WriteBehindBuffer."""
+    
+    async def test_submission_is_stored_in_background(self, db_session, tmp_path):
+        """Test that an acknowledged submission reaches the database."""
+        buffer = make_buffer(tmp_path / "submissions.journal")
+        await buffer.start(make_service)
+        repo = DatabaseLeaderboardRepository(db_session)
+        service = create_leaderboard_service(repo, buffer=buffer)
+        
+        entry = await service.submit_score(
+            ScoreSubmission(username="PLAYER1", score=300, mode="walls")
+        )
+        assert entry.id is None
+        assert buffer.is_pending("PLAYER1", 300, GameMode.WALLS)
+        
+        await buffer.drain()
+        await buffer.stop()
+        
+        result = await db_session.execute(select(Score.score))
+        assert result.scalars().all() == [300]
+        assert not buffer.is_pending("PLAYER1", 300, GameMode.WALLS)
+    
+    async def test_journal_replayed_on_start(self, db_session, tmp_path):
+        """Test that submissions journaled before a crash are stored on startup."""
+        from datetime import datetime, timezone
+        
+        path = tmp_path / "submissions.journal"
+        journal = SubmissionJournal(str(path), fsync=False)
+        journal.open()
+        journal.append("PLAYER1", 150, GameMode.WALLS, datetime.now(timezone.utc))
+        journal.close()
+        
+        buffer = make_buffer(path)
+        assert await buffer.start(make_service) == 1
+        await buffer.drain()
+        await buffer.stop()
+        
+        result = await db_session.execute(select(Score.score))
+        assert result.scalars().all() == [150]
+    
+    async def test_full_queue_rejected(self, db_session, tmp_path):
+        """Test backpressure when the queue is full."""
+        buffer = make_buffer(tmp_path / "submissions.journal", queue_size=0)
+        await buffer.start(make_service)
+        
+        with pytest.raises(ServiceUnavailableError):
+            await buffer.submit("PLAYER1", 100, GameMode.WALLS)
+        
+        await buffer.stop()
+    
+    async def test_failing_record_moved_aside(self, db_session, tmp_path):
+        """Test that a record failing every attempt is rejected without blocking the rest."""
+        def flaky_service(session):
+            service = make_service(session)
+            store_scores = service.store_scores
+            
+            async def _store_scores(keys, dates):
+                if any(username == "BROKEN" for username, _, _ in keys):
+                    raise RuntimeError("cannot store")
+                return await store_scores(keys, dates=dates)
+            service.store_scores = _store_scores
+            return service
+        
+        buffer = make_buffer(tmp_path / "submissions.journal", max_attempts=2)
+        await buffer.start(flaky_service)
+        await buffer.submit("BROKEN", 100, GameMode.WALLS)
+        await buffer.submit("PLAYER1", 200, GameMode.WALLS)
+        await buffer.drain()
+        await buffer.stop()
+        
+        result = await db_session.execute(select(Score.score))
+        assert result.scalars().all() == [200]
+        rejected = [
+            json.loads(line)
+            for line in (tmp_path / "submissions.journal.rejected").read_text().splitlines()
+        ]
+        assert [(r["username"], r["error"]) for r in rejected] == [
+            ("BROKEN", "RuntimeError: cannot store")
+        ]
+        assert not buffer.is_pending("BROKEN", 100, GameMode.WALLS)
+    
+    async def test_journal_error_keeps_flushing(self, db_session, tmp_path):
+        """Test that an error writing the journal doesn't stop the flush task."""
+        buffer = make_buffer(tmp_path / "submissions.journal")
+        await buffer.start(make_service)
+        ack = buffer.journal.ack
+        
+        def failing_ack(seqs):
+            buffer.journal.ack = ack
+            raise OSError("No space left on device")
+        buffer.journal.ack = failing_ack
+        
+        await buffer.submit("PLAYER1", 100, GameMode.WALLS)
+        await buffer.drain()
+        assert buffer.running
+        assert not buffer.is_pending("PLAYER1", 100, GameMode.WALLS)
+        
+        await buffer.submit("PLAYER2", 200, GameMode.WALLS)
+        await buffer.drain()
+        await buffer.stop()
+        
+        result = await db_session.execute(select(Score.score).order_by(Score.score))
+        assert result.scalars().all() == [100, 200]